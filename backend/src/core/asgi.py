@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# lets settings give web workers the read-only database connection (SALES_SQLITE_READONLY)
+os.environ.setdefault('SALES_WEB_WORKER', 'True')
 
 application = get_asgi_application()
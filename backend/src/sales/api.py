@@ -0,0 +1,101 @@
+"""
+Versioned JSON API (/api/v1/...) over the same services as sales_list.
+
+Responses carry a strong ETag derived from the dataset version and the
+normalized request, so an unchanged query on unchanged data is answered
+with 304 Not Modified before any query runs.
+"""
+import hashlib
+
+from django.conf import settings
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import Sale
+from .serializers import SALE_API_FIELDS, SaleSerializer
+from .services.dataset import get_dataset_version
+from .services.dimensions import attach_dimensions
+from .services.filters import _parse_int, _parse_multi, apply_filters
+from .services.pagination import keyset_page
+from .services.search import apply_search
+from .services.sorting import DEFAULT_SORT, apply_sorting, sort_keys
+
+API_VERSION = "v1"
+
+
+def _selected_fields(params):
+    """
+    ?fields=a,b (or repeated) -> list of fields in SALE_API_FIELDS order,
+    or None for all of them. Unknown names are a 400.
+    """
+    requested = _parse_multi(params, "fields")
+    if not requested:
+        return None
+    unknown = sorted(set(requested) - set(SALE_API_FIELDS))
+    if unknown:
+        raise ValidationError({"fields": [f"Unknown field(s): {', '.join(unknown)}"]})
+    return [name for name in SALE_API_FIELDS if name in requested]
+
+
+def _page_size(params):
+    default = getattr(settings, "SALES_API_PAGE_SIZE", 50)
+    limit = getattr(settings, "SALES_API_MAX_PAGE_SIZE", 500)
+    return min(max(_parse_int(params.get("page_size"), default), 1), limit)
+
+
+def _page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+
+def sales_etag(request, *args, **kwargs):
+    """
+    Strong validator for a sales API response: the same request against the
+    same dataset version always renders the same bytes.
+    """
+    # the full URL, not a normalized form of it: next/previous links echo the query string as sent
+    payload = f"{API_VERSION}|{get_dataset_version()}|{request.build_absolute_uri()}"
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+@etag(sales_etag)
+@cache_control(no_cache=True)
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@renderer_classes([JSONRenderer])
+def sales_api(request):
+    """
+    GET /api/v1/sales/ with the query parameters of sales_list (q, filters,
+    sort) plus fields=, page_size= and cursor= (keyset pagination).
+    """
+    params = request.query_params
+    fields = _selected_fields(params)
+
+    qs = Sale.objects.all()
+    search_query = params.get("q", "").strip()
+    qs = apply_search(qs, search_query)
+    qs = apply_filters(qs, params)
+    sort_by = params.get("sort", DEFAULT_SORT)
+    qs = apply_sorting(qs, sort_by, search_query)
+
+    ordering = sort_keys(sort_by, search_query)
+    if fields:
+        # load only what is rendered, plus the columns the cursor is built from
+        columns = {key.lstrip("-") for key in ordering} - {"exact_match_priority"}
+        qs = qs.only(*(columns | set(fields)))
+
+    page = keyset_page(qs, sort_by, ordering, params.get("cursor"), _page_size(params))
+    return Response({
+        "results": SaleSerializer(attach_dimensions(page.object_list), many=True, fields=fields).data,
+        "next": _page_link(request, page.next_cursor),
+        "previous": _page_link(request, page.previous_cursor),
+    })
@@ -0,0 +1,167 @@
+import datetime
+import json
+import os
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template import Engine, RequestContext, engines
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from sales.services.query_shapes import DEFAULT_SHAPES, sample_params
+
+from .benchmark_sales import BENCHMARK_CACHES, _git_commit, _time_ms
+
+TEMPLATE_NAME = "sales/sales_list.html"
+
+# the query shapes, checked tags, and a later offset page whose pager links carry the filters
+RENDER_SHAPES = DEFAULT_SHAPES + ["tags_any|date_desc", "region[n]+category[1]|date_desc page 3"]
+
+
+def _uncached_engine(engine):
+    """
+    The project's template engine without the cached loader: every
+    get_template() reads and compiles the template again.
+    """
+    return Engine(
+        dirs=engine.dirs,
+        loaders=["django.template.loaders.filesystem.Loader", "django.template.loaders.app_directories.Loader"],
+        context_processors=engine.context_processors,
+        libraries=engine.libraries,
+        builtins=engine.builtins,
+        autoescape=engine.autoescape,
+        string_if_invalid=engine.string_if_invalid,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering sales/sales_list.html per request for the default query shapes, with the "
+        "views' real contexts: template render alone (cached loader) and load + render without the "
+        "cached loader. Writes the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=200,
+            help="Timed renders per shape",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="render_benchmark.json",
+            help="JSON file for the results",
+        )
+        parser.add_argument(
+            "--compare",
+            type=str,
+            help="Earlier results JSON to compare against",
+        )
+
+    def handle(self, *args, **options):
+        if options["runs"] < 1:
+            raise CommandError("--runs must be at least 1")
+        engine = engines["django"].engine
+        uncached = _uncached_engine(engine)
+
+        report = {
+            "meta": {
+                "commit": _git_commit(),
+                "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "runs": options["runs"],
+            },
+            "shapes": {},
+        }
+
+        with override_settings(CACHES=BENCHMARK_CACHES, SALES_RECORD_QUERY_SHAPES=False):
+            captured = self.capture_contexts()
+
+        for shape, (url, request, context) in captured.items():
+            template = engine.get_template(TEMPLATE_NAME)
+            html = template.render(RequestContext(request, context))
+
+            def cached():
+                engine.get_template(TEMPLATE_NAME).render(RequestContext(request, context))
+
+            def not_cached():
+                uncached.get_template(TEMPLATE_NAME).render(RequestContext(request, context))
+
+            result = {
+                "url": url,
+                "html_bytes": len(html.encode()),
+                "render": _time_ms(cached, options["runs"]),
+                "uncached_loader": _time_ms(not_cached, options["runs"]),
+            }
+            report["shapes"][shape] = result
+            self.stdout.write(
+                f"{shape}: render {result['render']['median_ms']:.2f} ms, "
+                f"without the cached loader {result['uncached_loader']['median_ms']:.2f} ms "
+                f"({result['html_bytes']:,} bytes)"
+            )
+
+        with open(options["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\nResults written to {options['output']}"))
+
+        if options.get("compare"):
+            self.compare(options["compare"], report)
+
+    def capture_contexts(self):
+        """
+        {shape: (url, request, context dict)} from one sales_list request per
+        shape; the test environment's instrumented rendering hands out the
+        context the view rendered with.
+        """
+        setup_test_environment()
+        try:
+            captured = {}
+            client = Client()
+            for shape in RENDER_SHAPES:
+                shape_name, _, page = shape.partition(" page ")
+                params, _ = sample_params(shape_name)
+                if page:
+                    params["page"] = page
+                url = f"/?{params.urlencode()}"
+                response = client.get(url, HTTP_HOST="localhost")
+                if response.status_code != 200 or response.context is None:
+                    raise CommandError(f"{url} answered {response.status_code} without a rendered template")
+                context = response.context
+                # with {% extends %} every template rendered is listed, the page's own first
+                if isinstance(context, list):
+                    context = context[0]
+                captured[shape] = (url, response.wsgi_request, context.flatten())
+            return captured
+        finally:
+            teardown_test_environment()
+
+    # ------------------------------------------------------
+    # Comparison with an earlier run
+    # ------------------------------------------------------
+    def compare(self, path, report):
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\nCompared with {path} (commit {previous.get('meta', {}).get('commit')}):"
+        ))
+        for shape, timings in report["shapes"].items():
+            for metric in ("render", "uncached_loader"):
+                old = previous.get("shapes", {}).get(shape, {}).get(metric, {}).get("median_ms")
+                if not old:
+                    continue
+                new = timings[metric]["median_ms"]
+                ratio = new / old
+                line = f"  {shape} {metric}: {old:.2f} -> {new:.2f} ms (x{ratio:.2f})"
+                if ratio > 1.2:
+                    self.stdout.write(self.style.ERROR(line))
+                elif ratio < 0.8:
+                    self.stdout.write(self.style.SUCCESS(line))
+                else:
+                    self.stdout.write(line)
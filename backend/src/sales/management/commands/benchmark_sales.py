@@ -0,0 +1,303 @@
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from sales.models import Sale
+from sales.services.columnar import clear_snapshot, columnar_available, refresh_snapshot
+from sales.services.counts import count_results
+from sales.services.dimensions import clear_dimension_cache
+from sales.services.facets import build_facet_catalog, facet_counts, get_facet_catalog
+from sales.services.filters import apply_filters, filter_signature
+from sales.services.page_cache import clear_page_cache
+from sales.services.pagination import cursor_after, keyset_page
+from sales.services.query_shapes import DEFAULT_SHAPES, sample_params
+from sales.services.search import apply_search
+from sales.services.sorting import apply_sorting, sort_keys
+from sales.services.synthetic import write_csv
+
+BENCHMARK_SHAPES = DEFAULT_SHAPES + [
+    "q|date_desc",
+    "q+gender[1]|date_desc",
+    "age_range|date_desc",
+    "tags_any|date_desc",
+    "tags_all|date_desc",
+]
+
+# the benchmark never touches the configured cache (imports bump its dataset version)
+BENCHMARK_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def _time_ms(func, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextlib.contextmanager
+def _fresh_database(path):
+    """
+    Points the default connection at a new, fully migrated database for the
+    duration of the block (a SQLite file at path), then drops it again.
+    """
+    creation = connection.creation
+    if connection.vendor == "sqlite":
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = path
+    old_name = creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    clear_dimension_cache()
+    clear_snapshot()
+    try:
+        yield
+    finally:
+        creation.destroy_test_db(old_name, verbosity=0)
+        clear_dimension_cache()
+        clear_snapshot()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark loading, the search/filter/sort/paginate pipeline and facets on synthetic data "
+        "of several sizes, in a throwaway database. Writes the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=str,
+            default="100000",
+            help="Comma-separated dataset sizes, e.g. 100000,1000000,10000000",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="benchmark.json",
+            help="JSON file for the results",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=5,
+            help="Timed repetitions per query measurement",
+        )
+        parser.add_argument(
+            "--load-modes",
+            type=str,
+            default="fast",
+            help='Comma-separated load_sales_data modes to time: "orm" and/or "fast"',
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Seed for the synthetic data",
+        )
+        parser.add_argument(
+            "--workdir",
+            type=str,
+            default=os.path.join(tempfile.gettempdir(), "sales_benchmark"),
+            help="Where generated CSVs (reused between runs) and the scratch database live",
+        )
+        parser.add_argument(
+            "--compare",
+            type=str,
+            help="Earlier results JSON to compare against",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+        modes = [mode.strip() for mode in options["load_modes"].split(",") if mode.strip()]
+        if not modes or set(modes) - {"orm", "fast"}:
+            raise CommandError('--load-modes takes "orm", "fast" or both')
+        os.makedirs(options["workdir"], exist_ok=True)
+
+        report = {
+            "meta": {
+                "commit": _git_commit(),
+                "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "runs": options["runs"],
+                "seed": options["seed"],
+            },
+            "results": [],
+        }
+
+        # snapshots of the throwaway database stay in memory, never in SALES_COLUMNAR_DIR
+        with override_settings(CACHES=BENCHMARK_CACHES, SALES_RECORD_QUERY_SHAPES=False, SALES_COLUMNAR_DIR=""):
+            for size in sizes:
+                report["results"].append(self.benchmark_size(size, modes, options))
+
+        with open(options["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\nResults written to {options['output']}"))
+
+        if options.get("compare"):
+            self.compare(options["compare"], report)
+
+    # ------------------------------------------------------
+    # One dataset size
+    # ------------------------------------------------------
+    def benchmark_size(self, size, modes, options):
+        csv_path = os.path.join(options["workdir"], f"sales-{size}-seed{options['seed']}.csv")
+        if not os.path.exists(csv_path):
+            self.stdout.write(f"Generating {size} rows -> {csv_path}")
+            write_csv(csv_path, size, options["seed"])
+
+        db_path = os.path.join(options["workdir"], "benchmark.sqlite3")
+        result = {"rows": size, "load": {}, "queries": {}, "facets": {}, "columnar": None}
+        self.snapshot = None
+
+        for index, mode in enumerate(modes):
+            with _fresh_database(db_path):
+                started = time.perf_counter()
+                call_command("load_sales_data", file=csv_path, fast=mode == "fast", stdout=io.StringIO())
+                elapsed = time.perf_counter() - started
+                result["load"][mode] = {"seconds": round(elapsed, 3), "rows_per_sec": round(size / elapsed)}
+                self.stdout.write(f"[{size}] load {mode}: {elapsed:.1f}s ({size / elapsed:,.0f} rows/sec)")
+
+                # query benchmarks run once, against the last loaded database
+                if index == len(modes) - 1:
+                    result["facets"] = self.benchmark_facets(options["runs"])
+                    if columnar_available():
+                        result["columnar"] = self.build_columnar()
+                        self.stdout.write(
+                            f"[{size}] columnar snapshot: {result['columnar']['seconds']:.1f}s, "
+                            f"{result['columnar']['megabytes']:.1f} MB"
+                        )
+                    for shape in BENCHMARK_SHAPES:
+                        result["queries"][shape] = self.benchmark_shape(shape, options["runs"])
+                        timings = result["queries"][shape]
+                        self.stdout.write(
+                            f"[{size}] {shape}: page 1 {timings['first_page']['median_ms']:.2f} ms, "
+                            f"deep offset {timings['deep_offset']['median_ms']:.2f} ms, "
+                            f"deep keyset {timings['deep_keyset']['median_ms']:.2f} ms"
+                        )
+        return result
+
+    def benchmark_facets(self, runs):
+        cold = _time_ms(build_facet_catalog, runs)
+        get_facet_catalog()
+        warm = _time_ms(get_facet_catalog, runs)
+        return {"build": cold, "cached": warm}
+
+    def build_columnar(self):
+        started = time.perf_counter()
+        self.snapshot = refresh_snapshot()
+        elapsed = time.perf_counter() - started
+        return {"seconds": round(elapsed, 3), "megabytes": round(self.snapshot.nbytes() / 2**20, 1)}
+
+    def benchmark_shape(self, shape, runs):
+        params, search_query = sample_params(shape)
+        sort_by = params.get("sort")
+
+        def queryset():
+            qs = apply_search(Sale.objects.all(), search_query)
+            qs = apply_filters(qs, params)
+            return apply_sorting(qs, sort_by, search_query)
+
+        matches = queryset().order_by().count()
+        ordering = sort_keys(sort_by, search_query)
+        # the middle of the result set, as a "deep page"
+        offset = (matches // 2) // 10 * 10
+        cursor = None
+        if offset:
+            cursor = cursor_after(queryset()[offset - 1], sort_by, ordering)
+
+        def counted():
+            cache.clear()
+            count_results(queryset(), filter_signature(params, search_query))
+
+        def view():
+            cache.clear()
+            clear_page_cache()
+            Client().get(f"/?{params.urlencode()}", HTTP_HOST="localhost")
+
+        timings = {
+            "params": params.urlencode(),
+            "matches": matches,
+            "deep_offset_position": offset,
+            "first_page": _time_ms(lambda: list(queryset()[:10]), runs),
+            "count": _time_ms(lambda: queryset().order_by().count(), runs),
+            "count_results": _time_ms(counted, runs),
+            "deep_offset": _time_ms(lambda: list(queryset()[offset:offset + 10]), runs),
+            "deep_keyset": _time_ms(lambda: keyset_page(queryset(), sort_by, ordering, cursor, 10), runs),
+            # uncached (no signature)
+            "facet_counts": _time_ms(lambda: facet_counts(params, search_query), runs),
+            "view_cold": _time_ms(view, runs),
+        }
+
+        # the same pages from the columnar snapshot (searches always use the ORM)
+        snapshot = self.snapshot
+        if snapshot is not None and not search_query and snapshot.match(params) is not None:
+            def columnar_page(start):
+                return snapshot.match(params).sorted_by(sort_by)[start:start + 10]
+
+            timings["columnar_first_page"] = _time_ms(lambda: columnar_page(0), runs)
+            timings["columnar_count"] = _time_ms(lambda: len(snapshot.match(params)), runs)
+            timings["columnar_deep_offset"] = _time_ms(lambda: columnar_page(offset), runs)
+            timings["columnar_facet_counts"] = _time_ms(lambda: snapshot.facet_counts(params), runs)
+        return timings
+
+    # ------------------------------------------------------
+    # Comparison with an earlier run
+    # ------------------------------------------------------
+    def compare(self, path, report):
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+        before = {}
+        for result in previous.get("results", []):
+            for shape, timings in result.get("queries", {}).items():
+                for metric, value in timings.items():
+                    if isinstance(value, dict) and "median_ms" in value:
+                        before[(result["rows"], shape, metric)] = value["median_ms"]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\nCompared with {path} (commit {previous.get('meta', {}).get('commit')}):"
+        ))
+        for result in report["results"]:
+            for shape, timings in result["queries"].items():
+                for metric, value in timings.items():
+                    old = before.get((result["rows"], shape, metric))
+                    if not isinstance(value, dict) or not old:
+                        continue
+                    ratio = value["median_ms"] / old
+                    line = f"  [{result['rows']}] {shape} {metric}: {old:.2f} -> {value['median_ms']:.2f} ms (x{ratio:.2f})"
+                    if ratio > 1.2:
+                        self.stdout.write(self.style.ERROR(line))
+                    elif ratio < 0.8:
+                        self.stdout.write(self.style.SUCCESS(line))
+                    else:
+                        self.stdout.write(line)
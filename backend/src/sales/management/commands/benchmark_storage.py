@@ -0,0 +1,277 @@
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+from sales.models import Sale
+from sales.services.filters import apply_filters
+from sales.services.query_shapes import DEFAULT_SHAPES, sample_params
+from sales.services.sorting import apply_sorting
+from sales.services.storage import bulk_load
+
+from .benchmark_sales import _git_commit
+
+# the stock profile is SQLite's defaults: rollback journal, synchronous=FULL, 2 MB page cache, no mmap
+PROFILES = {
+    "stock": {"journal_mode": "DELETE", "tuning": False},
+    "tuned": {"journal_mode": "WAL", "tuning": True},
+}
+
+SCRATCH_TABLE = "storage_benchmark_rows"
+
+
+def _percentiles(timings):
+    if not timings:
+        return {"count": 0}
+    ordered = sorted(timings)
+    return {
+        "count": len(ordered),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95)], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+@contextlib.contextmanager
+def _database_copy(source, path, journal_mode):
+    """
+    Points the default connection (and every thread's) at a copy of the
+    SQLite database at source, in the given journal mode, for the block.
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    with contextlib.closing(sqlite3.connect(source)) as src, contextlib.closing(sqlite3.connect(path)) as dst:
+        src.backup(dst)
+        dst.execute(f"PRAGMA journal_mode = {journal_mode}").fetchall()
+        dst.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+        dst.execute(f"CREATE TABLE {SCRATCH_TABLE} AS SELECT * FROM {Sale._meta.db_table} WHERE 0")
+        dst.commit()
+
+    connection.close()
+    name = connection.settings_dict["NAME"]
+    connection.settings_dict["NAME"] = path
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict["NAME"] = name
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare SQLite's stock settings with the tuned storage profile (sales/services/storage.py) "
+        "on a copy of the database: sales_list queries on a new or a reused connection, and readers "
+        "running while an import-like writer commits batches. Writes the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            type=str,
+            help="SQLite file to copy (default: the configured default database)",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=5,
+            help="Passes over the query shapes per read measurement",
+        )
+        parser.add_argument(
+            "--readers",
+            type=int,
+            default=4,
+            help="Reader threads during the write test",
+        )
+        parser.add_argument(
+            "--seconds",
+            type=float,
+            default=5.0,
+            help="Length of the write test",
+        )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=5000,
+            help="Rows the writer inserts per transaction",
+        )
+        parser.add_argument(
+            "--workdir",
+            type=str,
+            default=os.path.join(tempfile.gettempdir(), "sales_benchmark"),
+            help="Where the database copy lives",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="storage_benchmark.json",
+            help="JSON file for the results",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The storage benchmark compares SQLite settings; the default database is not SQLite.")
+        source = options.get("database") or str(connection.settings_dict["NAME"])
+        if not os.path.exists(source):
+            raise CommandError(f"No database at {source}")
+        os.makedirs(options["workdir"], exist_ok=True)
+        path = os.path.join(options["workdir"], "storage.sqlite3")
+
+        report = {
+            "meta": {
+                "commit": _git_commit(),
+                "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "database": source,
+                "shapes": DEFAULT_SHAPES,
+                "runs": options["runs"],
+                "readers": options["readers"],
+                "seconds": options["seconds"],
+                "batch": options["batch"],
+                "mmap_mb": getattr(settings, "SALES_SQLITE_MMAP_MB", 256),
+                "cache_mb": getattr(settings, "SALES_SQLITE_CACHE_MB", 64),
+            },
+            "profiles": {},
+        }
+
+        self.workload = []
+        for name, profile in PROFILES.items():
+            with override_settings(SALES_SQLITE_TUNING=profile["tuning"]), \
+                    _database_copy(source, path, profile["journal_mode"]):
+                if not self.workload:
+                    # sampled once, so both profiles run the same queries
+                    self.workload = [(params, params.get("sort")) for params, _ in map(sample_params, DEFAULT_SHAPES)]
+                    report["meta"]["rows"] = Sale.objects.count()
+                result = {
+                    "new_connection": self.benchmark_reads(options["runs"], reconnect=True),
+                    "reused_connection": self.benchmark_reads(options["runs"], reconnect=False),
+                    "under_writes": self.benchmark_contention(options),
+                }
+            report["profiles"][name] = result
+            self.stdout.write(
+                f"[{name}] pass over {len(self.workload)} shapes: "
+                f"new connection {result['new_connection']['median_ms']:.1f} ms, "
+                f"reused {result['reused_connection']['median_ms']:.1f} ms; during writes: "
+                f"query p95 {result['under_writes']['queries'].get('p95_ms', 0):.1f} ms, "
+                f"max {result['under_writes']['queries'].get('max_ms', 0):.1f} ms, "
+                f"{result['under_writes']['errors']} errors, "
+                f"writer {result['under_writes']['rows_per_sec']:,} rows/sec"
+            )
+
+        with open(options["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\nResults written to {options['output']}"))
+
+    # ------------------------------------------------------
+    # sales_list's queries: first page + count per shape
+    # ------------------------------------------------------
+    def run_shape(self, params, sort_by):
+        queryset = apply_sorting(apply_filters(Sale.objects.all(), params), sort_by)
+        list(queryset[:10])
+        queryset.order_by().count()
+
+    def benchmark_reads(self, runs, reconnect):
+        """
+        Milliseconds per pass over all shapes. reconnect=True opens a new
+        connection per shape, as a request does with CONN_MAX_AGE=0.
+        """
+        self.run_pass(reconnect)
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            self.run_pass(reconnect)
+            timings.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3)}
+
+    def run_pass(self, reconnect):
+        for params, sort_by in self.workload:
+            if reconnect:
+                connection.close()
+            self.run_shape(params, sort_by)
+
+    # ------------------------------------------------------
+    # Readers while a writer commits import-sized batches
+    # ------------------------------------------------------
+    def benchmark_contention(self, options):
+        stop = threading.Event()
+        lock = threading.Lock()
+        timings, errors, written = [], [], [0]
+
+        def reader():
+            try:
+                while not stop.is_set():
+                    for params, sort_by in self.workload:
+                        connection.close()
+                        started = time.perf_counter()
+                        try:
+                            self.run_shape(params, sort_by)
+                        except OperationalError as exc:
+                            with lock:
+                                errors.append(str(exc))
+                            continue
+                        with lock:
+                            timings.append((time.perf_counter() - started) * 1000)
+                        if stop.is_set():
+                            break
+            finally:
+                connection.close()
+
+        def writer():
+            table = Sale._meta.db_table
+            offset = 0
+            try:
+                with bulk_load():
+                    while not stop.is_set():
+                        with connection.cursor() as cursor:
+                            cursor.execute("BEGIN IMMEDIATE")
+                            cursor.execute(
+                                f"INSERT INTO {SCRATCH_TABLE} SELECT * FROM {table} LIMIT %s OFFSET %s",
+                                [options["batch"], offset],
+                            )
+                            inserted = cursor.rowcount
+                            cursor.execute("COMMIT")
+                        if inserted < options["batch"]:
+                            offset = 0
+                        else:
+                            offset += inserted
+                        written[0] += inserted
+            except OperationalError as exc:
+                with lock:
+                    errors.append(f"writer: {exc}")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(options["readers"])]
+        threads.append(threading.Thread(target=writer))
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options["seconds"])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return {
+            "queries": _percentiles(timings),
+            "errors": len(errors),
+            "error_samples": sorted(set(errors))[:3],
+            "rows_written": written[0],
+            "rows_per_sec": round(written[0] / elapsed),
+        }
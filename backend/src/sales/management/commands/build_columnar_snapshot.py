@@ -0,0 +1,34 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from sales.services.columnar import columnar_available, publish_snapshot, snapshot_directory
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the on-disk columnar snapshot for the current dataset version, which every worker "
+        "memory-maps (a no-op if it is already there)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory",
+            type=str,
+            help="Snapshot directory (default: SALES_COLUMNAR_DIR)",
+        )
+
+    def handle(self, *args, **options):
+        if not columnar_available():
+            raise CommandError("The columnar engine needs numpy.")
+        directory = options.get("directory") or snapshot_directory()
+        if not directory:
+            raise CommandError("Set SALES_COLUMNAR_DIR or pass --directory.")
+
+        started = time.perf_counter()
+        snapshot = publish_snapshot(directory)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot of {snapshot.rows} rows ({snapshot.nbytes() / 2**20:.1f} MB) at "
+            f"{os.path.join(directory, snapshot.source)} ({elapsed:.1f}s)"
+        ))
@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from sales.models import Sale
+from sales.services.filters import apply_filters
+from sales.services.postgres import database_stats, prepared_statement_count
+from sales.services.query_shapes import DEFAULT_SHAPES, sample_params
+from sales.services.sorting import apply_sorting
+
+
+class Command(BaseCommand):
+    help = (
+        "Smoke-test a Postgres deployment (DATABASE_URL): runs each default query shape until psycopg "
+        "prepares it, compares the first and the prepared execution, and prints the pool counters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=5,
+            help="Executions of each shape's first page after it has been prepared",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The default database is not Postgres; set DATABASE_URL.")
+        db_options = connection.settings_dict["OPTIONS"]
+        prepared = db_options.get("server_side_binding", False)
+        threshold = db_options.get("prepare_threshold", 5)
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW server_version")
+            version = cursor.fetchone()[0]
+        self.stdout.write(
+            f"Postgres {version}; pool: {db_options.get('pool') or 'off'}; "
+            f"CONN_MAX_AGE: {connection.settings_dict['CONN_MAX_AGE']}; "
+            f"prepared statements: {f'after {threshold} runs' if prepared else 'off'}"
+        )
+
+        before = prepared_statement_count()
+        for shape in DEFAULT_SHAPES:
+            params, _ = sample_params(shape)
+            queryset = apply_sorting(apply_filters(Sale.objects.all(), params), params.get("sort"))
+            timings = []
+            # the first (threshold) executions run unprepared, the rest reuse the statement
+            for _ in range((threshold or 0) + options["runs"]):
+                started = time.perf_counter()
+                list(queryset[:10])
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"  {shape}: first {timings[0]:.2f} ms, "
+                f"last {options['runs']} median {statistics.median(timings[-options['runs']:]):.2f} ms"
+            )
+
+        after = prepared_statement_count()
+        self.stdout.write(f"Statements prepared on this connection: {before} -> {after}")
+        stats = database_stats().get("default", {}).get("pool")
+        if stats:
+            self.stdout.write("Pool: " + ", ".join(f"{key}={value}" for key, value in sorted(stats.items())))
+        if prepared and after <= before:
+            raise CommandError("Nothing was prepared although SALES_DB_PREPARED is on.")
+        self.stdout.write(self.style.SUCCESS("OK"))
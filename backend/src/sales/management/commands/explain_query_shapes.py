@@ -0,0 +1,133 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from sales.models import Sale
+from sales.services.filters import apply_filters
+from sales.services.query_shapes import (
+    DEFAULT_SHAPES,
+    recommended_index,
+    recorded_shapes,
+    reset_shapes,
+    sample_params,
+)
+from sales.services.search import apply_search
+from sales.services.sorting import apply_sorting
+
+# plan fragments meaning "all matches are sorted after being fetched"
+SORT_MARKERS = ("USE TEMP B-TREE FOR ORDER BY", "Sort Key:")
+
+
+def _full_scan(plan):
+    # an index-ordered SCAN ("SCAN sales_sale USING INDEX ...") stops at LIMIT, a bare one does not
+    return any(
+        ("SCAN sales_sale" in line and "USING" not in line) or "Seq Scan on sales_sale" in line
+        for line in plan.splitlines()
+    )
+
+
+def _covering_index(columns):
+    """
+    Name of a declared Sale index whose leading columns are exactly columns.
+    """
+    for index in Sale._meta.indexes:
+        fields = list(index.fields)
+        if fields[: len(columns)] == columns:
+            return index.name or ",".join(fields)
+    return None
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the recorded sales_list query shapes and recommend composite indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--shape",
+            action="append",
+            help='Shape to explain, e.g. "region[1]+date_range|date_desc" (repeatable)',
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=10,
+            help="How many of the most frequent recorded shapes to explain",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=5,
+            help="Timed executions of each first-page query (median is reported)",
+        )
+        parser.add_argument(
+            "--search",
+            type=str,
+            default="an",
+            help="Search term used for shapes that include q",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Clear the recorded shapes and exit",
+        )
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            reset_shapes()
+            self.stdout.write("Recorded query shapes cleared.")
+            return
+
+        if options.get("shape"):
+            shapes = [(shape, None) for shape in options["shape"]]
+        else:
+            shapes = recorded_shapes()[: options["top"]]
+            if not shapes:
+                self.stdout.write("No query shapes recorded yet; explaining the default set.")
+                shapes = [(shape, None) for shape in DEFAULT_SHAPES]
+
+        recommendations = {}
+        for shape, count in shapes:
+            params, search_query = sample_params(shape, options["search"])
+            qs = apply_search(Sale.objects.all(), search_query)
+            qs = apply_filters(qs, params)
+            qs = apply_sorting(qs, params.get("sort"), search_query)
+            page = qs[:10]
+
+            timings = []
+            for _ in range(max(1, options["runs"])):
+                started = time.perf_counter()
+                list(page.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            plan = page.explain()
+
+            seen = f", seen {count}x" if count is not None else ""
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{shape}{seen}"))
+            self.stdout.write(f"  params: {params.urlencode()}")
+            self.stdout.write(f"  first page: {statistics.median(timings):.2f} ms (median of {len(timings)})")
+            for line in plan.splitlines():
+                self.stdout.write(f"    {line}")
+
+            sorts = any(marker in plan for marker in SORT_MARKERS)
+            scans = _full_scan(plan)
+            if not sorts and not scans:
+                self.stdout.write(self.style.SUCCESS("  ok: index-ordered, no full scan"))
+                continue
+
+            columns = recommended_index(shape)
+            existing = _covering_index(columns)
+            problem = "sorts the matches" if sorts else "scans the table"
+            if existing:
+                self.stdout.write(self.style.WARNING(
+                    f"  plan {problem}; index {existing} matches, the planner prefers another path "
+                    f"(run ANALYZE, or the filter is not selective)"
+                ))
+            else:
+                self.stdout.write(self.style.WARNING(f"  plan {problem}; recommend index on ({', '.join(columns)})"))
+                recommendations.setdefault(tuple(columns), []).append(shape)
+
+        if recommendations:
+            self.stdout.write(self.style.MIGRATE_HEADING("\nRecommended indexes (Sale.Meta.indexes):"))
+            for columns, for_shapes in recommendations.items():
+                fields = ", ".join(f'"{c}"' for c in columns)
+                self.stdout.write(f"  models.Index(fields=[{fields}], name=...),  # {'; '.join(for_shapes)}")
+        self.stdout.write(f"\nDatabase: {connection.vendor}")
@@ -0,0 +1,48 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+from sales.services.export import EXPORT_FORMATS, FORMAT_CSV, stream_export
+
+
+class Command(BaseCommand):
+    help = "Export every sale matching a search/filter/sort query string as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--query",
+            type=str,
+            default="",
+            help='Same parameters as the sales page, e.g. "q=neha&region=North&sort=date_desc"',
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(EXPORT_FORMATS),
+            default=FORMAT_CSV,
+            help="Output format (default: csv)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="File to write (default: stdout)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Rows fetched from the database per round trip",
+        )
+
+    def handle(self, *args, **options):
+        params = QueryDict(options["query"])
+        chunks = stream_export(params, options["format"], options["chunk_size"])
+
+        started = time.perf_counter()
+        if options.get("output"):
+            with open(options["output"], "w", encoding="utf-8", newline="") as f:
+                f.writelines(chunks)
+            elapsed = time.perf_counter() - started
+            self.stderr.write(self.style.SUCCESS(f"Export written to {options['output']} ({elapsed:.1f}s)"))
+        else:
+            sys.stdout.writelines(chunks)
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from sales.services.synthetic import write_csv
+
+
+class Command(BaseCommand):
+    help = "Write a synthetic sales CSV (import format) with realistic value distributions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1_000_000,
+            help="Number of sales to generate (default: 1,000,000)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            required=True,
+            help="CSV file to write",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Random seed; the same seed always produces the same file",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        write_csv(options["output"], options["rows"], options["seed"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['rows']} rows to {options['output']} ({elapsed:.1f}s)"
+        ))
@@ -1,11 +1,46 @@
 import csv
-import io
 import os
 import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import requests
-from datetime import datetime
-from django.core.management.base import BaseCommand
-from sales.models import Sale
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+from sales.models import ImportManifest, Sale
+from sales.services.columnar import columnar_available, publish_snapshot, snapshot_directory
+from sales.services.dataset import bump_dataset_version
+from sales.services.facets import rebuild_facet_catalog
+from sales.services.ingest import (
+    NaturalKeys,
+    create_indexes,
+    drop_indexes,
+    file_fingerprint,
+    insert_rows,
+    parse_chunk,
+    read_header,
+    row_to_values,
+    rows_to_sales,
+    secondary_indexes,
+    split_file,
+    upsert_rows,
+)
+from sales.services.rollups import add_rollups_after, apply_rollup_deltas, upsert_deltas
+from sales.services.search_backends import index_search_after
+from sales.services.storage import bulk_load, optimize_database
+from sales.services.streaming import CsvStream, DownloadError, open_text
+from sales.services.tags import index_sale_tags, index_tags_after, reindex_sale_tags
+
+
+def _duplicate_rows(exc):
+    """
+    Whether an IntegrityError is the natural-key conflict of rows that are
+    already imported (Postgres names the constraint, SQLite the column).
+    """
+    message = str(exc)
+    return "sales_sale_natural_key_uniq" in message or "sales_sale.natural_key" in message
 
 
 class Command(BaseCommand):
@@ -22,6 +57,38 @@ class Command(BaseCommand):
             type=str,
             help="Direct download URL to CSV file",
         )
+        parser.add_argument(
+            "--fast",
+            action="store_true",
+            help="Parallel parse + raw executemany/COPY load, with secondary indexes rebuilt afterwards",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Parser processes for --fast (default: CPU count)",
+        )
+        parser.add_argument(
+            "--chunk-mb",
+            type=int,
+            default=8,
+            help="Size of each parse chunk for --fast, in MB",
+        )
+        parser.add_argument(
+            "--keep-indexes",
+            action="store_true",
+            help="With --fast, do not drop secondary indexes during the load",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Upsert by natural key: insert new rows, update changed ones, resume an interrupted run",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="With --incremental, re-process a file whose manifest says it was already imported",
+        )
 
     def handle(self, *args, **options):
         file_path = options.get("file")
@@ -30,113 +97,263 @@ class Command(BaseCommand):
         if not file_path and not url:
             self.stderr.write(self.style.ERROR("Provide --file or --url"))
             return
+        if file_path and url:
+            raise CommandError("Provide either --file or --url, not both")
 
         # ------------------------------------------------------
-        # Fetch CSV either from local file OR download from URL
+        # URL: stream download -> parse -> insert (no full copy in memory).
+        # --fast needs a seekable file, so there the download is spooled
+        # to a temp file first, still chunk by chunk.
         # ------------------------------------------------------
-        if url:
-            self.stdout.write(f"Downloading CSV from URL: {url}")
+        started = time.perf_counter()
+        csv_path = file_path
+        # only a download of ours is deleted afterwards, never a --file
+        temp_path = None
+        # rows committed so far: what the caches must learn about, even if the import fails later
+        self.committed = 0
+        try:
+            # relaxed fsync for the load only (SQLite; see sales/services/storage.py)
+            with bulk_load():
+                if url and not options.get("fast"):
+                    self.stdout.write(f"Streaming CSV from URL: {url}")
+                    stream = CsvStream(url)
+                    if options.get("incremental"):
+                        total = self.run_incremental(url, stream.fingerprint, stream, options)
+                    else:
+                        total = self.load_batches(stream)
+                else:
+                    if url:
+                        temp_path = csv_path = self.download_to_file(url)
+                    if options.get("incremental"):
+                        total = self.run_incremental(
+                            url or os.path.abspath(csv_path),
+                            file_fingerprint(csv_path),
+                            self.file_batches(csv_path),
+                            options,
+                        )
+                    elif options.get("fast"):
+                        total = self.load_fast(csv_path, options)
+                    else:
+                        total = self.load_orm(csv_path)
+        except DownloadError as exc:
+            raise CommandError(str(exc))
+        except IntegrityError as exc:
+            if _duplicate_rows(exc):
+                raise CommandError(
+                    f"Rows from this file are already imported ({exc}). Re-run with --incremental to upsert them."
+                )
+            raise CommandError(f"Import stopped on an invalid row ({exc}); {self.committed} earlier rows were kept.")
+        finally:
+            # Delete temp file if URL was used
+            if temp_path:
+                os.remove(temp_path)
+            if self.committed:
+                self.publish()
+        elapsed = time.perf_counter() - started
 
-            response = requests.get(url, allow_redirects=True, timeout=60)
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Import completed. Total rows processed: {total} ({elapsed:.1f}s, {rate:,.0f} rows/sec)"
+        ))
 
-            if response.status_code != 200:
-                raise Exception(f"Download failed. Status code: {response.status_code}")
+    def publish(self):
+        """
+        New data invalidates every version-keyed cache; warm the facet
+        catalog (and the shared snapshot) right away.
+        """
+        self.stdout.write("Analyzing...")
+        optimize_database(full=True)
+        version = bump_dataset_version()
+        rebuild_facet_catalog(version)
+        self.stdout.write("Facet catalog rebuilt.")
+        # workers map the new snapshot in on their next request instead of each building one
+        if columnar_available() and snapshot_directory():
+            publish_snapshot(snapshot_directory(), version)
+            self.stdout.write("Columnar snapshot written.")
 
-            # Check if Google/GitHub returned an HTML page instead of CSV
-            content_type = response.headers.get("Content-Type", "")
+    def download_to_file(self, url):
+        self.stdout.write(f"Downloading CSV from URL: {url}")
+        response = requests.get(url, allow_redirects=True, timeout=60, stream=True)
+        if response.status_code != 200:
+            raise DownloadError(f"Download failed. Status code: {response.status_code}")
 
-            if "text/html" in content_type.lower():
-                # Also detect HTML content even if Content-Type is wrong
-                if response.text.strip().startswith("<!DOCTYPE html") or "<html" in response.text.lower():
-                    raise Exception("ERROR: The downloaded content is HTML, not CSV. The link is NOT a direct CSV download URL.")
-
-            # Save temporary CSV file
-            temp = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-            temp.write(response.content)
-            temp.close()
-
-            csv_path = temp.name
-            self.stdout.write(f"Downloaded to temp file: {csv_path}")
+        # Save temporary CSV file (decompressed), one block at a time
+        with response, tempfile.NamedTemporaryFile(
+            "w", delete=False, suffix=".csv", encoding="utf-8", newline=""
+        ) as temp:
+            try:
+                text = open_text(response.iter_content(chunk_size=256 * 1024))
+                while block := text.read(1024 * 1024):
+                    temp.write(block)
+            except Exception:
+                temp.close()
+                os.remove(temp.name)
+                raise
 
-        else:
-            csv_path = file_path
+        self.stdout.write(f"Downloaded to temp file: {temp.name}")
+        return temp.name
 
-        # ------------------------------------------------------
-        # Utility parsing helpers
-        # ------------------------------------------------------
-        def parse_int(val):
-            try:
-                return int(val)
-            except:
-                return None
+    def file_batches(self, csv_path, batch_size=2000):
+        keys = NaturalKeys()
+        batch = []
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                batch.append(keys.finish(row_to_values(row)))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
 
-        def parse_float(val):
-            try:
-                return float(val)
-            except:
-                return 0.0
-
-        def parse_date(val):
-            if not val:
-                return None
-            for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%Y-%m-%d %H:%M:%S"):
-                try:
-                    return datetime.strptime(val, fmt).date()
-                except:
-                    continue
-            return None
+    # ------------------------------------------------------
+    # Streaming path: append pre-parsed batches as they arrive
+    # ------------------------------------------------------
+    def load_batches(self, batches):
+        last_id = Sale.objects.aggregate(last=Max("id"))["last"] or 0
+        try:
+            for batch in batches:
+                with transaction.atomic():
+                    self.committed += insert_rows(batch)
+                self.stdout.write(f"Inserted {self.committed} rows...")
+        finally:
+            self.catch_up(last_id)
+        return self.committed
 
-        # ------------------------------------------------------
-        # Insert into DB in batches
-        # ------------------------------------------------------
+    # ------------------------------------------------------
+    # Default path: model instances + bulk_create in batches
+    # ------------------------------------------------------
+    def load_orm(self, csv_path):
         batch = []
         batch_size = 8000
-        total = 0
+        keys = NaturalKeys()
+        last_id = Sale.objects.aggregate(last=Max("id"))["last"] or 0
 
-        with open(csv_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-
-            for row in reader:
-                batch.append(Sale(
-                    customer_id=row.get("Customer ID", ""),
-                    customer_name=row.get("Customer Name", ""),
-                    phone_number=row.get("Phone Number", ""),
-                    gender=row.get("Gender", ""),
-                    age=parse_int(row.get("Age")),
-                    customer_region=row.get("Customer Region", ""),
-                    customer_type=row.get("Customer Type", ""),
-                    product_id=row.get("Product ID", ""),
-                    product_name=row.get("Product Name", ""),
-                    brand=row.get("Brand", ""),
-                    product_category=row.get("Product Category", ""),
-                    tags=row.get("Tags", ""),
-                    quantity=parse_int(row.get("Quantity", 0)) or 0,
-                    price_per_unit=parse_float(row.get("Price per Unit")),
-                    discount_percentage=parse_float(row.get("Discount Percentage")),
-                    total_amount=parse_float(row.get("Total Amount")),
-                    final_amount=parse_float(row.get("Final Amount")),
-                    date=parse_date(row.get("Date")),
-                    payment_method=row.get("Payment Method", ""),
-                    order_status=row.get("Order Status", ""),
-                    delivery_type=row.get("Delivery Type", ""),
-                    store_id=row.get("Store ID", ""),
-                    store_location=row.get("Store Location", ""),
-                    salesperson_id=row.get("Salesperson ID", ""),
-                    employee_name=row.get("Employee Name", ""),
-                ))
+        try:
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
 
-                if len(batch) >= batch_size:
-                    Sale.objects.bulk_create(batch)
-                    total += len(batch)
-                    batch = []
-                    self.stdout.write(f"Inserted {total} rows...")
+                for row in reader:
+                    batch.append(keys.finish(row_to_values(row)))
 
-        if batch:
-            Sale.objects.bulk_create(batch)
-            total += len(batch)
+                    if len(batch) >= batch_size:
+                        self.create_sales(batch)
+                        batch = []
+                        self.stdout.write(f"Inserted {self.committed} rows...")
+
+            if batch:
+                self.create_sales(batch)
+        finally:
+            # the batches' tags are indexed as they go
+            if self.committed:
+                self.update_rollups(last_id)
+        return self.committed
+
+    def create_sales(self, batch):
+        with transaction.atomic():
+            sales = Sale.objects.bulk_create(rows_to_sales(batch))
+            index_sale_tags((s.pk, s.tags) for s in sales)
+        self.committed += len(sales)
+
+    # ------------------------------------------------------
+    # Fast path: chunks parsed in a process pool into plain tuples,
+    # loaded with executemany (SQLite) / COPY FROM STDIN (Postgres)
+    # ------------------------------------------------------
+    def load_fast(self, csv_path, options):
+        header = read_header(csv_path)
+        chunks = split_file(csv_path, options["chunk_mb"] * 1024 * 1024)
+        tasks = [(csv_path, header, start, end) for start, end in chunks]
+        workers = max(1, options["workers"])
+        self.stdout.write(f"Fast load: {len(tasks)} chunks across {workers} parser processes")
+
+        last_id = Sale.objects.aggregate(last=Max("id"))["last"] or 0
+        indexes = [] if options.get("keep_indexes") else secondary_indexes()
+        if indexes:
+            self.stdout.write(f"Dropping {len(indexes)} secondary indexes/triggers for the load")
+            drop_indexes(indexes)
+
+        keys = NaturalKeys()
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # map() yields chunks in file order while later ones are still parsing
+                for rows in pool.map(parse_chunk, tasks):
+                    rows = [keys.finish(row) for row in rows]
+                    with transaction.atomic():
+                        self.committed += insert_rows(rows)
+                    self.stdout.write(f"Inserted {self.committed} rows...")
+        finally:
+            if indexes:
+                self.stdout.write("Rebuilding secondary indexes...")
+                create_indexes(indexes)
+                index_search_after(last_id)
+            self.catch_up(last_id)
+        return self.committed
+
+    def catch_up(self, last_id):
+        """
+        Tag postings and rollups for the rows appended after last_id: run
+        after an append whether it finished or not, so rows committed
+        before a failure are never left out of the indexes.
+        """
+        if not self.committed:
+            return
+        self.stdout.write("Indexing tags...")
+        index_tags_after(last_id)
+        self.update_rollups(last_id)
+
+    def update_rollups(self, last_id):
+        self.stdout.write("Updating daily rollups...")
+        with transaction.atomic():
+            add_rollups_after(last_id)
+
+    # ------------------------------------------------------
+    # Incremental path: upsert by natural key, checkpointed per batch
+    # in an ImportManifest so a crashed run resumes where it stopped
+    # ------------------------------------------------------
+    def run_incremental(self, source, fingerprint, batches, options):
+        if fingerprint is None:
+            # nothing identifies this version of the source: start a fresh manifest
+            fingerprint = f"unversioned-{timezone.now().isoformat()}"
+        manifest, _ = ImportManifest.objects.get_or_create(source=source, fingerprint=fingerprint)
+
+        if manifest.status == ImportManifest.STATUS_COMPLETED:
+            if not options.get("force"):
+                self.stdout.write("This file was already imported; nothing to do (use --force to re-check it).")
+                return 0
+            manifest.status = ImportManifest.STATUS_RUNNING
+            manifest.rows_committed = 0
+            manifest.rows_changed = 0
+            manifest.finished_at = None
+            manifest.save()
+
+        resume_from = manifest.rows_committed
+        if resume_from:
+            self.stdout.write(f"Resuming after row {resume_from}")
+
+        position = 0
+
+        def commit(batch, position):
+            with transaction.atomic():
+                # deltas need the rows' previous values, so compute them before the upsert
+                apply_rollup_deltas(upsert_deltas(batch))
+                written = upsert_rows(batch)
+                reindex_sale_tags(written)
+                manifest.rows_committed = position
+                manifest.rows_changed += len(written)
+                manifest.save(update_fields=["rows_committed", "rows_changed", "updated_at"])
+            self.committed += len(written)
+            self.stdout.write(f"Processed {position} rows ({manifest.rows_changed} new or changed)...")
 
-        self.stdout.write(self.style.SUCCESS(f"Import completed. Total rows inserted: {total}"))
+        # batches always start from row 1 so natural keys (occurrence numbers) stay stable
+        for batch in batches:
+            start = position
+            position += len(batch)
+            if position <= resume_from:
+                continue
+            commit(batch[max(0, resume_from - start):], position)
 
-        # Delete temp file if URL was used
-        if url:
-            os.remove(csv_path)
+        manifest.status = ImportManifest.STATUS_COMPLETED
+        manifest.finished_at = timezone.now()
+        manifest.save(update_fields=["status", "finished_at", "updated_at"])
+        self.stdout.write(f"{manifest.rows_changed} rows inserted or updated, "
+                          f"{position - manifest.rows_changed} unchanged")
+        return position - resume_from
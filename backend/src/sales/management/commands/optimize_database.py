@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from sales.services.storage import optimize_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the query planner statistics (PRAGMA optimize, or a full ANALYZE with --full) and "
+        "checkpoint the SQLite WAL. Cheap enough to run from cron every few hours."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Run a full ANALYZE instead of PRAGMA optimize",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        statements = optimize_database(full=options["full"])
+        elapsed = time.perf_counter() - started
+        if not statements:
+            self.stdout.write("Nothing to do for this database backend.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"{'; '.join(statements)} ({elapsed:.1f}s)"))
@@ -0,0 +1,158 @@
+import gzip
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from .services.profiling import profile_request, record_request
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli to enable "br"
+    brotli = None
+
+MIN_COMPRESS_SIZE = 200
+
+# Only the JSON API and the exports are compressed. HTML pages echo the search
+# box next to the CSRF token, so compressing them would let a BREACH attack
+# recover the token byte by byte from response sizes.
+COMPRESSIBLE_TYPES = ("application/json", "text/csv", "application/x-ndjson")
+
+_ENCODING_SUFFIX = re.compile(r'-(gzip|br)"')
+
+
+def _accepted(request, streaming=False):
+    accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    encodings = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+    # streamed bodies are compressed chunk by chunk, which only gzip does here
+    if brotli is not None and "br" in encodings and not streaming:
+        return "br"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+
+def _compressible(response):
+    content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES
+
+
+def _tag_etag(response, encoding):
+    etag = response.get("ETag")
+    if etag and etag.endswith('"'):
+        response.headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+
+
+class CompressionMiddleware:
+    """
+    gzip (and brotli, when the brotli package is installed) compression of
+    the COMPRESSIBLE_TYPES responses that keeps strong ETags strong.
+
+    Django's GZipMiddleware weakens ETags because the compressed bytes
+    differ from the uncompressed ones. Instead this appends the encoding
+    to the tag ("abc" -> "abc-gzip"), so each representation keeps its own
+    strong validator, and strips the suffix from If-None-Match again before
+    the view compares it with the tag it computes. Works in sync and async
+    middleware chains.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sent_encoding = self.process_request(request)
+        return self.process_response(request, self.get_response(request), sent_encoding)
+
+    async def __acall__(self, request):
+        sent_encoding = self.process_request(request)
+        return self.process_response(request, await self.get_response(request), sent_encoding)
+
+    def process_request(self, request):
+        """
+        Strips the encoding suffix from If-None-Match; returns the encoding it named.
+        """
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        sent_encoding = None
+        if if_none_match:
+            found = _ENCODING_SUFFIX.search(if_none_match)
+            sent_encoding = found.group(1) if found else None
+            request.META["HTTP_IF_NONE_MATCH"] = _ENCODING_SUFFIX.sub('"', if_none_match)
+        return sent_encoding
+
+    def process_response(self, request, response, sent_encoding):
+        if response.status_code == 304:
+            # describe the representation the client already holds
+            if sent_encoding:
+                _tag_etag(response, sent_encoding)
+            return response
+
+        if not _compressible(response):
+            return response
+
+        encoding = _accepted(request, response.streaming)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if encoding is None or response.has_header("Content-Encoding"):
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            if len(response.content) < MIN_COMPRESS_SIZE:
+                return response
+            if encoding == "br":
+                compressed = brotli.compress(response.content, quality=5)
+            else:
+                compressed = gzip.compress(response.content, compresslevel=6, mtime=0)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        _tag_etag(response, encoding)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Per-request SQL count/time by phase, slow-query capture (with EXPLAIN)
+    and latency histograms, see sales/services/profiling.py.
+
+    Only installed when SALES_PROFILING is on; otherwise Django drops it
+    at startup and requests never pass through it. SALES_SERVER_TIMING adds
+    a Server-Timing header, which browser dev tools show per phase.
+    Queries run while a streaming response is consumed happen after the
+    middleware has returned and are not counted. It stays sync-only under
+    ASGI too: a sync view then runs in the same thread (and so on the same
+    connections) as the middleware, and an async view's query threads pick
+    the profile up from the request context (profile_connections()).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SALES_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, "SALES_SERVER_TIMING", False)
+
+    def __call__(self, request):
+        with profile_request() as profile:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        record_request(match.view_name if match else "unresolved", profile)
+        if self.server_timing:
+            response.headers["Server-Timing"] = profile.server_timing()
+        return response
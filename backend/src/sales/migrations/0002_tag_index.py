@@ -0,0 +1,63 @@
+# Generated by Django 5.1.3 on 2026-10-18 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_tag_index(apps, schema_editor):
+    """
+    Builds the posting list for rows imported before the tag index existed.
+    """
+    Sale = apps.get_model("sales", "Sale")
+    Tag = apps.get_model("sales", "Tag")
+    SaleTag = apps.get_model("sales", "SaleTag")
+
+    tag_ids = {}
+    last_id = 0
+    while True:
+        chunk = list(
+            Sale.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "tags")[:20000]
+        )
+        if not chunk:
+            break
+        links = []
+        for sale_id, tag_string in chunk:
+            for label in {p.strip() for p in (tag_string or "").split(",")}:
+                if not label:
+                    continue
+                if label not in tag_ids:
+                    tag_ids[label] = Tag.objects.get_or_create(name=label)[0].id
+                links.append(SaleTag(sale_id=sale_id, tag_id=tag_ids[label]))
+        SaleTag.objects.bulk_create(links, batch_size=5000, ignore_conflicts=True)
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SaleTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='sales.sale')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_links', to='sales.tag')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tag', 'sale'), name='sales_saletag_tag_sale_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_tag_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:02
+
+from django.db import migrations
+
+# digits-only phone number; SQLite has no regexp_replace
+SQLITE_DIGITS = (
+    "replace(replace(replace(replace(replace(replace("
+    "{col}, ' ', ''), '-', ''), '+', ''), '(', ''), ')', ''), '.', '')"
+)
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS sales_sale_fts USING fts5(
+        customer_name, phone_number, phone_digits, tokenize = 'trigram'
+    )
+    """,
+    f"""
+    INSERT INTO sales_sale_fts (rowid, customer_name, phone_number, phone_digits)
+    SELECT id, customer_name, phone_number, {SQLITE_DIGITS.format(col="phone_number")}
+    FROM sales_sale
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS sales_sale_fts_ai AFTER INSERT ON sales_sale BEGIN
+        INSERT INTO sales_sale_fts (rowid, customer_name, phone_number, phone_digits)
+        VALUES (new.id, new.customer_name, new.phone_number, {SQLITE_DIGITS.format(col="new.phone_number")});
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sales_sale_fts_ad AFTER DELETE ON sales_sale BEGIN
+        DELETE FROM sales_sale_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS sales_sale_fts_au
+    AFTER UPDATE OF customer_name, phone_number ON sales_sale BEGIN
+        DELETE FROM sales_sale_fts WHERE rowid = old.id;
+        INSERT INTO sales_sale_fts (rowid, customer_name, phone_number, phone_digits)
+        VALUES (new.id, new.customer_name, new.phone_number, {SQLITE_DIGITS.format(col="new.phone_number")});
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS sales_sale_fts_au",
+    "DROP TRIGGER IF EXISTS sales_sale_fts_ad",
+    "DROP TRIGGER IF EXISTS sales_sale_fts_ai",
+    "DROP TABLE IF EXISTS sales_sale_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS sales_sale_name_trgm "
+    "ON sales_sale USING gin (UPPER(customer_name::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS sales_sale_phone_trgm "
+    "ON sales_sale USING gin (UPPER(phone_number::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS sales_sale_phone_digits_trgm "
+    "ON sales_sale USING gin (regexp_replace(phone_number, '\\D', '', 'g') gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS sales_sale_phone_digits_trgm",
+    "DROP INDEX IF EXISTS sales_sale_phone_trgm",
+    "DROP INDEX IF EXISTS sales_sale_name_trgm",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_tag_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            _run({"sqlite": SQLITE_REVERSE, "postgresql": POSTGRES_REVERSE}),
+        ),
+    ]
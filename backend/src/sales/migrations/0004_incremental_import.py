@@ -0,0 +1,82 @@
+# Generated by Django 5.1.3 on 2026-10-18 03:39
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_natural_keys(apps, schema_editor):
+    """
+    Gives rows imported before natural keys existed the same keys a
+    re-import of their file would produce: sha1 of the key columns plus
+    the occurrence number, in id (= file) order. row_hash stays NULL, so
+    the first incremental run refreshes those rows once.
+    """
+    Sale = apps.get_model("sales", "Sale")
+    connection = schema_editor.connection
+    seen = {}
+    last_id = 0
+    while True:
+        chunk = list(
+            Sale.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "customer_id", "product_id", "date", "store_id", "salesperson_id")[:20000]
+        )
+        if not chunk:
+            break
+        updates = []
+        for sale_id, *key_values in chunk:
+            canonical = "\x1f".join(
+                "" if v is None else v.isoformat() if hasattr(v, "isoformat") else str(v)
+                for v in key_values
+            )
+            digest = hashlib.sha1(canonical.encode()).hexdigest()
+            n = seen.get(digest, 0)
+            seen[digest] = n + 1
+            updates.append((f"{digest}:{n}", sale_id))
+        with connection.cursor() as cursor:
+            cursor.executemany("UPDATE sales_sale SET natural_key = %s WHERE id = %s", updates)
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=1024)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('status', models.CharField(default='running', max_length=16)),
+                ('rows_committed', models.PositiveBigIntegerField(default=0)),
+                ('rows_changed', models.PositiveBigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='natural_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='row_hash',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.RunPython(backfill_natural_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sale',
+            constraint=models.UniqueConstraint(condition=models.Q(('natural_key__isnull', False)), fields=('natural_key',), name='sales_sale_natural_key_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='importmanifest',
+            constraint=models.UniqueConstraint(fields=('source', 'fingerprint'), name='sales_importmanifest_source_uniq'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-18 03:45
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_rollups(apps, schema_editor):
+    """
+    Fills the rollup table for data imported before rollups existed.
+    """
+    Sale = apps.get_model("sales", "Sale")
+    DailySalesRollup = apps.get_model("sales", "DailySalesRollup")
+    groups = (
+        Sale.objects.order_by()
+        .values("date", "customer_region", "product_category", "payment_method", "store_id")
+        .annotate(
+            row_count=Count("id"),
+            quantity_sum=Sum("quantity"),
+            total_amount_sum=Sum("total_amount"),
+            final_amount_sum=Sum("final_amount"),
+            discount_sum=Sum("discount_percentage"),
+        )
+    )
+    DailySalesRollup.objects.bulk_create(
+        (DailySalesRollup(**group) for group in groups.iterator(chunk_size=5000)), batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_incremental_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('customer_region', models.CharField(max_length=128)),
+                ('product_category', models.CharField(max_length=128)),
+                ('payment_method', models.CharField(max_length=64)),
+                ('store_id', models.CharField(max_length=64)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('quantity_sum', models.BigIntegerField(default=0)),
+                ('total_amount_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('final_amount_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('discount_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'customer_region', 'product_category', 'payment_method', 'store_id'), name='sales_dailyrollup_key_uniq')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
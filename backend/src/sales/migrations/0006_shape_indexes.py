@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+
+def analyze(apps, schema_editor):
+    # fresh planner statistics, so the new composite indexes are actually picked
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute("ANALYZE sales_sale")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='sale',
+            name='sales_sale_date_ca4177_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='sale',
+            name='sales_sale_custome_474960_idx',
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['-date', 'id'], name='sales_sale_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer_region', '-date', 'id'], name='sales_sale_region_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['product_category', '-date', 'id'], name='sales_sale_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer_region', 'product_category', '-date', 'id'], name='sales_sale_region_cat_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['gender', '-date', 'id'], name='sales_sale_gender_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['payment_method', '-date', 'id'], name='sales_sale_payment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['-quantity', 'id'], name='sales_sale_quantity_id_idx'),
+        ),
+        migrations.RunPython(analyze, migrations.RunPython.noop),
+    ]
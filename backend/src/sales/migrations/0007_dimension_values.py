@@ -0,0 +1,183 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+DIMENSIONS = [
+    "gender",
+    "customer_region",
+    "customer_type",
+    "product_category",
+    "payment_method",
+    "order_status",
+    "delivery_type",
+]
+
+# (fields, name) of the composite indexes that lead with a dimension column
+DIMENSION_INDEXES = [
+    (["customer_region", "-date", "id"], "sales_sale_region_date_idx"),
+    (["product_category", "-date", "id"], "sales_sale_category_date_idx"),
+    (["customer_region", "product_category", "-date", "id"], "sales_sale_region_cat_date_idx"),
+    (["gender", "-date", "id"], "sales_sale_gender_date_idx"),
+    (["payment_method", "-date", "id"], "sales_sale_payment_date_idx"),
+]
+
+# digits-only phone number; SQLite has no regexp_replace (same as 0003_search_index)
+SQLITE_DIGITS = (
+    "replace(replace(replace(replace(replace(replace("
+    "{col}, ' ', ''), '-', ''), '+', ''), '(', ''), ')', ''), '.', '')"
+)
+
+# SQLite drops a table's triggers when Django remakes it to alter a column
+SQLITE_SEARCH_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS sales_sale_fts_ai AFTER INSERT ON sales_sale BEGIN
+        INSERT INTO sales_sale_fts (rowid, customer_name, phone_number, phone_digits)
+        VALUES (new.id, new.customer_name, new.phone_number, {SQLITE_DIGITS.format(col="new.phone_number")});
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sales_sale_fts_ad AFTER DELETE ON sales_sale BEGIN
+        DELETE FROM sales_sale_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS sales_sale_fts_au
+    AFTER UPDATE OF customer_name, phone_number ON sales_sale BEGIN
+        DELETE FROM sales_sale_fts WHERE rowid = old.id;
+        INSERT INTO sales_sale_fts (rowid, customer_name, phone_number, phone_digits)
+        VALUES (new.id, new.customer_name, new.phone_number, {SQLITE_DIGITS.format(col="new.phone_number")});
+    END
+    """,
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in SQLITE_SEARCH_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+def encode_dimensions(apps, schema_editor):
+    """
+    One DimensionValue per distinct label, then every sale's label columns
+    translated to ids in a single UPDATE.
+    """
+    Sale = apps.get_model("sales", "Sale")
+    DimensionValue = apps.get_model("sales", "DimensionValue")
+    for dimension in DIMENSIONS:
+        labels = Sale.objects.order_by().values_list(f"{dimension}_label", flat=True).distinct()
+        DimensionValue.objects.bulk_create(DimensionValue(dimension=dimension, label=label) for label in labels)
+
+    quote = schema_editor.quote_name
+    assignments = ", ".join(
+        f"{quote(dimension + '_id')} = (SELECT v.id FROM sales_dimensionvalue v "
+        f"WHERE v.dimension = %s AND v.label = sales_sale.{quote(dimension + '_label')})"
+        for dimension in DIMENSIONS
+    )
+    schema_editor.execute(f"UPDATE sales_sale SET {assignments}", DIMENSIONS)
+
+
+def decode_dimensions(apps, schema_editor):
+    quote = schema_editor.quote_name
+    assignments = ", ".join(
+        f"{quote(dimension + '_label')} = (SELECT v.label FROM sales_dimensionvalue v "
+        f"WHERE v.id = sales_sale.{quote(dimension + '_id')})"
+        for dimension in DIMENSIONS
+    )
+    schema_editor.execute(f"UPDATE sales_sale SET {assignments}")
+
+
+def build_rollups(apps, schema_editor):
+    Sale = apps.get_model("sales", "Sale")
+    DailySalesRollup = apps.get_model("sales", "DailySalesRollup")
+    groups = (
+        Sale.objects.order_by()
+        .values("date", "customer_region_id", "product_category_id", "payment_method_id", "store_id")
+        .annotate(
+            row_count=Count("id"),
+            quantity_sum=Sum("quantity"),
+            total_amount_sum=Sum("total_amount"),
+            final_amount_sum=Sum("final_amount"),
+            discount_sum=Sum("discount_percentage"),
+        )
+    )
+    DailySalesRollup.objects.bulk_create(
+        (DailySalesRollup(**group) for group in groups.iterator(chunk_size=5000)), batch_size=5000
+    )
+
+
+def analyze(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute("ANALYZE sales_sale")
+
+
+def _dimension_fk(null):
+    return models.ForeignKey(
+        db_index=False,
+        null=null,
+        on_delete=django.db.models.deletion.PROTECT,
+        related_name='+',
+        to='sales.dimensionvalue',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_shape_indexes'),
+    ]
+
+    operations = [
+        # on the way back the column remakes below drop the triggers again
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.CreateModel(
+            name='DimensionValue',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('dimension', models.CharField(max_length=32)),
+                ('label', models.CharField(max_length=128)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'label'), name='sales_dimensionvalue_uniq')],
+            },
+        ),
+        *[migrations.RemoveIndex(model_name='sale', name=name) for _, name in DIMENSION_INDEXES],
+        *[
+            migrations.RenameField(model_name='sale', old_name=dimension, new_name=f'{dimension}_label')
+            for dimension in DIMENSIONS
+        ],
+        *[migrations.AddField(model_name='sale', name=dimension, field=_dimension_fk(True)) for dimension in DIMENSIONS],
+        migrations.RunPython(encode_dimensions, decode_dimensions),
+        *[migrations.RemoveField(model_name='sale', name=f'{dimension}_label') for dimension in DIMENSIONS],
+        *[migrations.AlterField(model_name='sale', name=dimension, field=_dimension_fk(False)) for dimension in DIMENSIONS],
+        *[
+            migrations.AddIndex(model_name='sale', index=models.Index(fields=fields, name=name))
+            for fields, name in DIMENSION_INDEXES
+        ],
+        # rollups are derived data: recreated with id columns and rebuilt
+        migrations.DeleteModel(name='DailySalesRollup'),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('customer_region', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sales.dimensionvalue')),
+                ('product_category', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sales.dimensionvalue')),
+                ('payment_method', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='sales.dimensionvalue')),
+                ('store_id', models.CharField(max_length=64)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('quantity_sum', models.BigIntegerField(default=0)),
+                ('total_amount_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('final_amount_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('discount_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'customer_region', 'product_category', 'payment_method', 'store_id'), name='sales_dailyrollup_key_uniq')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(analyze, migrations.RunPython.noop),
+    ]
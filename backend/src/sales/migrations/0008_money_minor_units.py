@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:18
+
+from django.db import migrations, models
+
+# Sale columns moving from DecimalField to integer minor units
+SALE_MONEY_FIELDS = ["price_per_unit", "discount_percentage", "total_amount", "final_amount"]
+ROLLUP_MONEY_FIELDS = ["total_amount_sum", "final_amount_sum", "discount_sum"]
+
+
+def _to_minor(table, fields):
+    def convert(apps, schema_editor):
+        quote = schema_editor.quote_name
+        assignments = ", ".join(
+            f"{quote(field + '_minor')} = CAST(ROUND({quote(field)} * 100) AS BIGINT)" for field in fields
+        )
+        schema_editor.execute(f"UPDATE {table} SET {assignments}")
+    return convert
+
+
+def _replace(model_name, fields, field_factory, convert):
+    """
+    AddField <f>_minor, fill it from <f>, drop <f> and take over its name.
+    Nullable ADD COLUMN, DROP COLUMN and RENAME COLUMN are all in-place on
+    SQLite, so the sales table is never remade (and keeps its FTS triggers).
+    """
+    return [
+        *[migrations.AddField(model_name=model_name, name=f'{field}_minor', field=field_factory()) for field in fields],
+        migrations.RunPython(convert),
+        *[migrations.RemoveField(model_name=model_name, name=field) for field in fields],
+        *[
+            migrations.RenameField(model_name=model_name, old_name=f'{field}_minor', new_name=field)
+            for field in fields
+        ],
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0007_dimension_values'),
+    ]
+
+    operations = [
+        *_replace(
+            'sale',
+            SALE_MONEY_FIELDS,
+            lambda: models.BigIntegerField(blank=True, null=True),
+            _to_minor('sales_sale', SALE_MONEY_FIELDS),
+        ),
+        *_replace(
+            'dailysalesrollup',
+            ROLLUP_MONEY_FIELDS,
+            lambda: models.BigIntegerField(default=0),
+            _to_minor('sales_dailysalesrollup', ROLLUP_MONEY_FIELDS),
+        ),
+    ]
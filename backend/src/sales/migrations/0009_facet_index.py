@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0008_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer_region', 'gender', 'product_category', 'payment_method', 'date'], name='sales_sale_facet_idx'),
+        ),
+    ]
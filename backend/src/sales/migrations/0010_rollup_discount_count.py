@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-18 05:21
+
+from django.db import migrations, models
+
+ROLLUP_KEY = ["date", "customer_region_id", "product_category_id", "payment_method_id", "store_id"]
+
+
+def count_discounts(apps, schema_editor):
+    """
+    Fills discount_count for the existing rollup groups: the rows of each
+    group whose discount is not NULL.
+    """
+    quote = schema_editor.quote_name
+    rollups = quote("sales_dailysalesrollup")
+    matches = " AND ".join(f"s.{quote(column)} = {rollups}.{quote(column)}" for column in ROLLUP_KEY)
+    schema_editor.execute(
+        f"UPDATE {rollups} SET {quote('discount_count')} = "
+        f"(SELECT COUNT(s.discount_percentage) FROM {quote('sales_sale')} s WHERE {matches})"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0009_facet_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysalesrollup',
+            name='discount_count',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(count_discounts, migrations.RunPython.noop),
+    ]
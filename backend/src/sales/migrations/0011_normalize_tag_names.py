@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:40
+
+from django.db import migrations
+
+
+def normalize_tag_names(apps, schema_editor):
+    """
+    Tags are case-insensitive from here on (services/tags.normalize_tag):
+    merges "VIP" and "vip" into one lower-case Tag, moving the postings of
+    the others onto it.
+    """
+    Tag = apps.get_model("sales", "Tag")
+    SaleTag = apps.get_model("sales", "SaleTag")
+
+    spellings = {}
+    for tag in Tag.objects.order_by("id"):
+        spellings.setdefault(tag.name.strip().lower(), []).append(tag)
+
+    # facet catalogs, page caches and columnar snapshots listing the old names are
+    # dropped by migration 0012, which starts a new dataset version
+    for name, tags in spellings.items():
+        if len(tags) == 1 and tags[0].name == name:
+            continue
+        keep = next((tag for tag in tags if tag.name == name), tags[0])
+        for other in tags:
+            if other.id == keep.id:
+                continue
+            tagged = SaleTag.objects.filter(tag_id=keep.id).values("sale_id")
+            SaleTag.objects.filter(tag_id=other.id).exclude(sale_id__in=tagged).update(tag_id=keep.id)
+            # the rest were postings keep already has
+            other.delete()
+        if keep.name != name:
+            keep.name = name
+            keep.save(update_fields=["name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0010_rollup_discount_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_tag_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-18 05:38
+
+import time
+
+from django.core.cache import cache
+from django.db import migrations, models
+
+
+def start_version(apps, schema_editor):
+    """
+    Stores a new dataset version and mirrors it into the cache (as
+    services/dataset.bump_dataset_version does): everything cached under
+    the old cache-only version, e.g. tag names before 0011, is dropped.
+    """
+    DatasetVersion = apps.get_model("sales", "DatasetVersion")
+    version = time.time_ns()
+    DatasetVersion.objects.create(id=1, version=version)
+    cache.set("sales:dataset_version", version, timeout=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0011_normalize_tag_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(start_version, migrations.RunPython.noop),
+    ]
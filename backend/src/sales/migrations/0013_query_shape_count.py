@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-18 05:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0012_dataset_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryShapeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shape', models.CharField(max_length=255, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,48 +1,208 @@
 from django.db import models
 
 
+class DimensionValue(models.Model):
+    """
+    Lookup table for Sale's low-cardinality text columns (gender, region,
+    category, payment method, ...): each distinct (dimension, label) gets a
+    small integer id, which is what Sale and its indexes store.
+    See services/dimensions.py.
+    """
+    id = models.SmallAutoField(primary_key=True)
+    dimension = models.CharField(max_length=32)
+    label = models.CharField(max_length=128)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "label"], name="sales_dimensionvalue_uniq"),
+        ]
+
+    def __str__(self):
+        return self.label
+
+
 class Sale(models.Model):
+    # Low-cardinality columns are DimensionValue ids (no single-column indexes:
+    # the filtered ones lead the composite indexes in Meta)
+
     # Customer fields
     customer_id = models.CharField(max_length=64, db_index=True)
     customer_name = models.CharField(max_length=255, db_index=True)
     phone_number = models.CharField(max_length=32, db_index=True)
-    gender = models.CharField(max_length=16, db_index=True)
+    gender = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+", db_index=False)
     age = models.PositiveIntegerField(null=True, blank=True, db_index=True)
-    customer_region = models.CharField(max_length=128, db_index=True)
-    customer_type = models.CharField(max_length=128, blank=True)
+    customer_region = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+", db_index=False)
+    customer_type = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+", db_index=False)
 
     # Product fields
     product_id = models.CharField(max_length=64)
     product_name = models.CharField(max_length=255)
     brand = models.CharField(max_length=128, blank=True)
-    product_category = models.CharField(max_length=128, db_index=True)
+    product_category = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+", db_index=False)
     tags = models.TextField(blank=True)
 
-    # Sales fields
+    # Sales fields: amounts in minor units (paise), the discount in hundredths
+    # of a percent; NULL when the source value was missing or malformed
+    # (see services/money.py)
     quantity = models.PositiveIntegerField()
-    price_per_unit = models.DecimalField(max_digits=12, decimal_places=2)
-    discount_percentage = models.DecimalField(max_digits=5, decimal_places=2)
-    total_amount = models.DecimalField(max_digits=14, decimal_places=2)
-    final_amount = models.DecimalField(max_digits=14, decimal_places=2)
+    price_per_unit = models.BigIntegerField(null=True, blank=True)
+    discount_percentage = models.BigIntegerField(null=True, blank=True)
+    total_amount = models.BigIntegerField(null=True, blank=True)
+    final_amount = models.BigIntegerField(null=True, blank=True)
 
     # Operational fields
     date = models.DateField(db_index=True)
-    payment_method = models.CharField(max_length=64, db_index=True)
-    order_status = models.CharField(max_length=64, blank=True)
-    delivery_type = models.CharField(max_length=64, blank=True)
+    payment_method = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+", db_index=False)
+    order_status = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+", db_index=False)
+    delivery_type = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+", db_index=False)
     store_id = models.CharField(max_length=64, db_index=True)
     store_location = models.CharField(max_length=128, db_index=True)
     salesperson_id = models.CharField(max_length=64, blank=True)
     employee_name = models.CharField(max_length=255, blank=True)
 
+    # Import bookkeeping (see services/ingest.py)
+    natural_key = models.CharField(max_length=64, null=True, blank=True)
+    row_hash = models.CharField(max_length=40, null=True, blank=True)
+
     class Meta:
         indexes = [
             models.Index(fields=["customer_name"]),
             models.Index(fields=["phone_number"]),
-            models.Index(fields=["date"]),
-            models.Index(fields=["customer_region", "product_category"]),
+            # filter columns followed by the sort_keys() ordering, so the first
+            # page of the common shapes (see explain_query_shapes) is read in
+            # index order and stops after LIMIT rows instead of sorting all matches
+            models.Index(fields=["-date", "id"], name="sales_sale_date_id_idx"),
+            models.Index(fields=["customer_region", "-date", "id"], name="sales_sale_region_date_idx"),
+            models.Index(fields=["product_category", "-date", "id"], name="sales_sale_category_date_idx"),
+            models.Index(
+                fields=["customer_region", "product_category", "-date", "id"],
+                name="sales_sale_region_cat_date_idx",
+            ),
+            models.Index(fields=["gender", "-date", "id"], name="sales_sale_gender_date_idx"),
+            models.Index(fields=["payment_method", "-date", "id"], name="sales_sale_payment_date_idx"),
+            models.Index(fields=["-quantity", "id"], name="sales_sale_quantity_id_idx"),
+            # covers the facet counts' single GROUP BY over the four facet dimensions
+            # (date included, so date-filtered counts never touch the table)
+            models.Index(
+                fields=["customer_region", "gender", "product_category", "payment_method", "date"],
+                name="sales_sale_facet_idx",
+            ),
+        ]
+        constraints = [
+            # partial, so rows without a key never collide; upserts target it with
+            # ON CONFLICT (natural_key) WHERE natural_key IS NOT NULL
+            models.UniqueConstraint(
+                fields=["natural_key"],
+                condition=models.Q(natural_key__isnull=False),
+                name="sales_sale_natural_key_uniq",
+            ),
         ]
         ordering = ["-date", "id"]
 
     def __str__(self):
         return f"{self.customer_name} - {self.product_name} ({self.date})"
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=128, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class SaleTag(models.Model):
+    """
+    Inverted posting list: one row per (tag, sale) pair.
+    The unique (tag, sale) index doubles as the lookup index for tag filters.
+    """
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="sale_links")
+    sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name="tag_links")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tag", "sale"], name="sales_saletag_tag_sale_uniq"),
+        ]
+
+
+class ImportManifest(models.Model):
+    """
+    Checkpoint for one source file: how many of its rows are committed,
+    so an interrupted incremental import resumes where it stopped.
+    """
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+
+    source = models.CharField(max_length=1024)
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=16, default=STATUS_RUNNING)
+    rows_committed = models.PositiveBigIntegerField(default=0)
+    rows_changed = models.PositiveBigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["source", "fingerprint"], name="sales_importmanifest_source_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.source} ({self.status}, {self.rows_committed} rows)"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Materialized GROUP BY of Sale over ROLLUP_DIMENSIONS (services/rollups.py):
+    one row per (day, region, category, payment method, store) with the
+    summed measures, kept in step with every import.
+    """
+    date = models.DateField()
+    customer_region = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+")
+    product_category = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+")
+    payment_method = models.ForeignKey(DimensionValue, on_delete=models.PROTECT, related_name="+")
+    store_id = models.CharField(max_length=64)
+
+    row_count = models.BigIntegerField(default=0)
+    quantity_sum = models.BigIntegerField(default=0)
+    # minor units, like the Sale columns they sum
+    total_amount_sum = models.BigIntegerField(default=0)
+    final_amount_sum = models.BigIntegerField(default=0)
+    discount_sum = models.BigIntegerField(default=0)
+    # rows with a discount; the average discount divides by this, not row_count
+    discount_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "customer_region", "product_category", "payment_method", "store_id"],
+                name="sales_dailyrollup_key_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.customer_region}/{self.product_category} ({self.row_count} sales)"
+
+
+class DatasetVersion(models.Model):
+    """
+    The single row holding the current dataset version (services/dataset.py).
+    The cache only mirrors it, so a culled or cleared cache does not
+    invalidate everything keyed by the version.
+    """
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return str(self.version)
+
+
+class QueryShapeCount(models.Model):
+    """
+    How often sales_list ran a filter/sort shape (services/query_shapes.py).
+    Workers buffer their counts and add them with count = count + n, so
+    concurrent flushes do not lose increments.
+    """
+    shape = models.CharField(max_length=255, unique=True)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.shape} ({self.count})"
@@ -0,0 +1,27 @@
+"""
+Database router for web workers with SALES_SQLITE_READONLY on (see
+core/settings.py): reads of the sales app's models go to the "readonly"
+alias, a mode=ro connection to the same SQLite file that can never take a
+write lock. Writes, migrations and the other apps (auth, sessions, admin)
+stay on "default".
+"""
+READ_ONLY_ALIAS = "readonly"
+
+
+class ReadOnlyRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "sales":
+            return READ_ONLY_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # instances read through the read-only alias still save to default
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == READ_ONLY_ALIAS:
+            return False
+        return None
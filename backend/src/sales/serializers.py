@@ -0,0 +1,57 @@
+from rest_framework import serializers
+
+from .models import Sale
+from .services.money import format_minor
+
+# every Sale column the API exposes (import bookkeeping stays internal)
+SALE_API_FIELDS = [
+    "id",
+    "customer_id", "customer_name", "phone_number", "gender", "age", "customer_region", "customer_type",
+    "product_id", "product_name", "brand", "product_category", "tags",
+    "quantity", "price_per_unit", "discount_percentage", "total_amount", "final_amount",
+    "date", "payment_method", "order_status", "delivery_type", "store_id", "store_location",
+    "salesperson_id", "employee_name",
+]
+
+
+class MinorUnitsField(serializers.ReadOnlyField):
+    """
+    Integer minor units (59484) rendered as the "594.84" string the API has
+    always returned; null stays null.
+    """
+
+    def to_representation(self, value):
+        return None if value is None else format_minor(value)
+
+
+class SaleSerializer(serializers.ModelSerializer):
+    """
+    Sale rows for the JSON API. fields= restricts the output to a subset
+    of SALE_API_FIELDS (sparse fieldsets, ?fields=date,final_amount).
+    Dimension columns are rendered as their labels; attach_dimensions()
+    the rows first so that needs no queries. Money columns are rendered
+    from minor units as decimal strings.
+    """
+
+    gender = serializers.StringRelatedField()
+    customer_region = serializers.StringRelatedField()
+    customer_type = serializers.StringRelatedField()
+    product_category = serializers.StringRelatedField()
+    payment_method = serializers.StringRelatedField()
+    order_status = serializers.StringRelatedField()
+    delivery_type = serializers.StringRelatedField()
+
+    price_per_unit = MinorUnitsField()
+    discount_percentage = MinorUnitsField()
+    total_amount = MinorUnitsField()
+    final_amount = MinorUnitsField()
+
+    class Meta:
+        model = Sale
+        fields = SALE_API_FIELDS
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
@@ -0,0 +1,762 @@
+"""
+Optional columnar engine for the sales_list read path.
+
+With SALES_COLUMNAR on, requests are answered from a ColumnarSnapshot of
+Sale held as NumPy arrays: ids, dates as day numbers, age, quantity, the
+filterable dimension ids (already dictionary-encoded by DimensionValue),
+minor-unit money, one bitmap per tag and, per sort option, the full
+sort_keys() order and every row's rank in it. apply_filters() predicates
+become boolean masks, a page is the next k matches along a precomputed
+sort order (dense matches) or the k lowest ranks among the matches
+(argpartition, then a sort of just those k), and only the page's ids go
+back to the database. Each row's facet cube cell (facet_codes) and the tag
+bitmaps also answer the filter panels' per-option counts.
+
+A snapshot lives in one of two places:
+  - in memory, built by each process for itself (SALES_COLUMNAR_DIR unset)
+  - on disk under SALES_COLUMNAR_DIR, written once (by load_sales_data,
+    build_columnar_snapshot or the first worker to need it) and opened by
+    every worker with numpy.load(mmap_mode="r"): the arrays are shared
+    through the page cache instead of copied per worker, and opening one
+    takes milliseconds
+
+Either way a snapshot is tied to the dataset version it was built from.
+When an import bumps the version, requests fall back to the ORM path
+while one background thread per process builds (or waits for) the next
+snapshot, which then replaces the old one in a single assignment; a
+request never sees a half-built or stale snapshot. Searches (q=) and
+anything the engine cannot answer exactly (malformed dates, stale
+cursors) also take the ORM path, so results are always the ones the ORM
+path would return.
+
+On-disk layout (FORMAT_VERSION 3):
+    <dir>/CURRENT              name of the current snapshot, replaced atomically
+    <dir>/v<dataset version>/  meta.json, dictionary.json, one <array>.npy each
+    <dir>/.lock                serializes writers across processes
+"""
+import contextlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils.dateparse import parse_date
+
+from ..models import DimensionValue, Sale, SaleTag, Tag
+from .counts import ResultCount
+from .dataset import get_dataset_version
+from .filters import DIMENSION_FILTERS, parse_filters
+from .pagination import DIRECTION_NEXT, build_keyset_page, decode_cursor
+from .sorting import DEFAULT_SORT, SORT_FIELDS, sort_keys
+from .tags import TAG_MODE_ALL
+
+try:
+    import numpy as np
+except ImportError:  # optional: installed with pandas
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: writers are then not serialized across processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 3
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+FETCH_CHUNK = 50000
+
+# (array name, SELECT expression, dtype); NULL ages become -1 (age is unsigned)
+_COLUMNS = [
+    ("ids", "id", "int64"),
+    ("days", "date", "datetime64[D]"),
+    ("ages", "COALESCE(age, -1)", "int32"),
+    ("quantities", "quantity", "int64"),
+    *[(field, f"{field}_id", "int16") for field in DIMENSION_FILTERS.values()],
+    ("total_amounts", "COALESCE(total_amount, 0)", "int64"),
+    ("final_amounts", "COALESCE(final_amount, 0)", "int64"),
+    ("discounts", "COALESCE(discount_percentage, 0)", "int64"),
+    ("discounted", "discount_percentage IS NOT NULL", "bool"),
+]
+
+# set bits per byte value, for counting rows in packed bitmaps
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype="uint8") if np is not None else None
+
+_lock = threading.Lock()
+_snapshot = None
+_building = None  # dataset version a background build is running for
+
+
+# ------------------------------------------------------
+# Snapshot
+# ------------------------------------------------------
+def _ranks(order):
+    """
+    Row positions in sort order -> each row's rank in that order.
+    """
+    ranks = np.empty(len(order), dtype="int32")
+    ranks[order] = np.arange(len(order), dtype="int32")
+    return ranks
+
+
+def _day(value):
+    return np.datetime64(value, "D").astype("int64")
+
+
+def _date(day):
+    return str(np.datetime64(int(day), "D"))
+
+
+def _smallest(values, stop, start=0):
+    """
+    Indices of the values ranked start .. stop - 1 (ascending), found with
+    argpartition so only that slice is ever fully sorted.
+    """
+    stop = min(stop, len(values))
+    if start >= stop:
+        return np.empty(0, dtype="int64")
+    part = np.argpartition(values, [start, stop - 1] if start else stop - 1)[start:stop]
+    return part[np.argsort(values[part], kind="stable")]
+
+
+def _scan(order, mask, k, step):
+    """
+    The first k positions of order that mask selects, reading order in
+    doubling blocks so a dense mask stops after a few thousand rows.
+    """
+    found = []
+    have = 0
+    start = 0
+    while have < k and start < len(order):
+        block = order[start:start + step]
+        hits = block[mask[block]]
+        found.append(hits)
+        have += len(hits)
+        start += step
+        step *= 2
+    return np.concatenate(found)[:k] if found else np.empty(0, dtype="int32")
+
+
+class ColumnarSnapshot:
+    """
+    Sale as per-column arrays, rows in id order, for one dataset version.
+    The arrays are in memory (build_snapshot) or memory-mapped from a
+    snapshot directory (open_snapshot); nothing below cares which.
+
+    dictionary holds what the arrays are coded against: {"dimensions":
+    {field: {label: id}}, "tags": [tag names, in tag_bitmaps row order]}.
+    """
+
+    def __init__(self, version, arrays, dictionary, source=None):
+        self.version = version
+        self.arrays = arrays
+        self.dictionary = dictionary
+        self.source = source
+        for name, values in arrays.items():
+            setattr(self, name, values)
+        self.rows = len(self.ids)
+        # sort option -> row positions in its full (primary, id) order, and each row's rank in it
+        self.orders = {sort_by: arrays[f"order_{sort_by}"] for sort_by in SORT_FIELDS}
+        self.ranks = {sort_by: arrays[f"rank_{sort_by}"] for sort_by in SORT_FIELDS}
+        self.tag_rows = {name: index for index, name in enumerate(dictionary["tags"])}
+        # lookup-table sizes for the dimension masks (ids are small and dense)
+        self.dimension_sizes = {
+            field: max(labels.values(), default=0) + 1 for field, labels in dictionary["dimensions"].items()
+        }
+        # facet -> its labels in facet_codes order (ascending id), and the cube facet_codes index
+        self.facet_labels = {
+            key: [label for label, _ in sorted(dictionary["dimensions"][field].items(), key=lambda item: item[1])]
+            for key, field in DIMENSION_FILTERS.items()
+        }
+        self.facet_shape = tuple(max(len(labels), 1) for labels in self.facet_labels.values())
+
+    def nbytes(self):
+        return sum(values.nbytes for values in self.arrays.values())
+
+    def sort_option(self, sort_by):
+        # unknown options sort like the default, as in sort_keys()
+        return sort_by if sort_by in self.orders else DEFAULT_SORT
+
+    def _dimension_mask(self, field, ids):
+        wanted = np.zeros(self.dimension_sizes[field], dtype=bool)
+        wanted[ids] = True
+        return wanted[getattr(self, field)]
+
+    def _tag_mask(self, tag_values, mode):
+        wanted = set(tag_values)
+        rows = [self.tag_rows[name] for name in wanted if name in self.tag_rows]
+        if not rows or (mode == TAG_MODE_ALL and len(rows) < len(wanted)):
+            return None
+        bitmaps = self.tag_bitmaps[rows]
+        combined = np.bitwise_and.reduce(bitmaps) if mode == TAG_MODE_ALL else np.bitwise_or.reduce(bitmaps)
+        return np.unpackbits(combined, count=self.rows).view(bool)
+
+    def _filter_masks(self, filters):
+        """
+        parse_filters() key (or "ages" / "dates") -> boolean mask of the
+        rows that filter keeps, for every active filter; None when one
+        cannot be evaluated exactly here.
+        """
+        masks = {}
+        for key, field in DIMENSION_FILTERS.items():
+            if filters[key]:
+                labels = self.dictionary["dimensions"][field]
+                ids = [labels[label] for label in set(filters[key]) if label in labels]
+                masks[key] = self._dimension_mask(field, ids)
+
+        if filters["age_min"] is not None or filters["age_max"] is not None:
+            mask = self.ages >= 0
+            if filters["age_min"] is not None:
+                mask &= self.ages >= filters["age_min"]
+            if filters["age_max"] is not None:
+                mask &= self.ages <= filters["age_max"]
+            masks["ages"] = mask
+
+        for key, compare in (("date_from", np.greater_equal), ("date_to", np.less_equal)):
+            if filters[key]:
+                try:
+                    day = parse_date(filters[key])
+                except ValueError:
+                    return None
+                if day is None:
+                    return None
+                mask = compare(self.days, _day(day))
+                masks["dates"] = masks["dates"] & mask if "dates" in masks else mask
+
+        if filters["tags"]:
+            tagged = self._tag_mask(filters["tags"], filters["tags_mode"])
+            masks["tags"] = tagged if tagged is not None else np.zeros(self.rows, dtype=bool)
+        return masks
+
+    def _combine(self, masks):
+        combined = np.ones(self.rows, dtype=bool)
+        for mask in masks:
+            combined &= mask
+        return combined
+
+    def match(self, params):
+        """
+        ColumnarMatches for apply_filters(params), or None when the
+        predicates cannot be evaluated exactly here (the ORM decides then).
+        """
+        masks = self._filter_masks(parse_filters(params))
+        if masks is None:
+            return None
+        return ColumnarMatches(self, self._combine(masks.values()))
+
+    def facet_counts(self, params):
+        """
+        facets.facet_counts() from the arrays. Dimension facets: one
+        bincount of facet_codes under the non-dimension filters gives the
+        (region, gender, category, payment method) cube, and each facet sums
+        the cells inside the other facets' selections. Tags: the popcount of
+        each bitmap ANDed with the packed mask of the other filters.
+        None when the filters cannot be evaluated exactly here.
+        """
+        filters = parse_filters(params)
+        masks = self._filter_masks(filters)
+        if masks is None:
+            return None
+
+        rest = [mask for key, mask in masks.items() if key not in DIMENSION_FILTERS]
+        codes = self.facet_codes[self._combine(rest)] if rest else self.facet_codes
+        cube = np.bincount(codes, minlength=int(np.prod(self.facet_shape))).reshape(self.facet_shape)
+        selected = {}
+        for key, labels in self.facet_labels.items():
+            if filters[key]:
+                wanted = set(filters[key])
+                selected[key] = [index for index, label in enumerate(labels) if label in wanted]
+        counts = {}
+        for axis, key in enumerate(DIMENSION_FILTERS):
+            cells = cube
+            for other_axis, other in enumerate(DIMENSION_FILTERS):
+                if other != key and other in selected:
+                    cells = np.take(cells, selected[other], axis=other_axis)
+            per_label = cells.sum(axis=tuple(a for a in range(cube.ndim) if a != axis))
+            counts[key] = {label: int(n) for label, n in zip(self.facet_labels[key], per_label)}
+
+        # "all" narrows with every tag added, so those counts stay within the current selection
+        if filters["tags_mode"] == TAG_MODE_ALL:
+            others = list(masks.values())
+        else:
+            others = [mask for other, mask in masks.items() if other != "tags"]
+        bitmaps = np.asarray(self.tag_bitmaps)
+        if others:
+            bitmaps = bitmaps & np.packbits(self._combine(others))
+        per_tag = _POPCOUNT[bitmaps].sum(axis=1, dtype="int64") if len(bitmaps) else []
+        counts["tags"] = {name: int(n) for name, n in zip(self.dictionary["tags"], per_tag)}
+        return counts
+
+    def totals(self, matches):
+        """
+        summarize()'s aggregate row (agg_<rollup measure>) for the matches.
+        """
+        positions = matches.positions
+        return {
+            "agg_row_count": len(positions),
+            "agg_quantity_sum": int(self.quantities[positions].sum()),
+            "agg_total_amount_sum": int(self.total_amounts[positions].sum()),
+            "agg_final_amount_sum": int(self.final_amounts[positions].sum()),
+            "agg_discount_sum": int(self.discounts[positions].sum()),
+            "agg_discount_count": int(self.discounted[positions].sum()),
+        }
+
+
+def _fetch_sales(positions, snapshot):
+    """
+    Sale rows at snapshot positions, in that order (rows deleted since the
+    snapshot was built are skipped).
+    """
+    ids = snapshot.ids[positions].tolist()
+    by_id = Sale.objects.in_bulk(ids)
+    return [by_id[i] for i in ids if i in by_id]
+
+
+class ColumnarMatches:
+    """
+    Rows of a snapshot matching one set of filters (a boolean mask).
+    """
+
+    def __init__(self, snapshot, mask):
+        self.snapshot = snapshot
+        self.mask = mask
+        self.size = int(np.count_nonzero(mask))
+        self._positions = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def positions(self):
+        if self._positions is None:
+            self._positions = np.flatnonzero(self.mask)
+        return self._positions
+
+    def count(self):
+        return ResultCount(self.size)
+
+    def first(self, sort_by, stop, start=0, after=None, forward=True):
+        """
+        Positions of the matches ranked start .. stop - 1 in sort order;
+        with `after` (a rank) counting only those ranked after it, or
+        before it going backward. When the walk is short (dense matches,
+        early pages) the precomputed order is scanned until enough turn
+        up; otherwise the matches' ranks go through argpartition.
+        """
+        snapshot = self.snapshot
+        sort_by = snapshot.sort_option(sort_by)
+        if stop <= start or not self.size:
+            return np.empty(0, dtype="int32")
+
+        # rows of the order walked, at this density, to reach `stop` matches
+        expected = stop * snapshot.rows // self.size
+        if expected <= 2 * self.size:
+            order = snapshot.orders[sort_by]
+            if after is not None:
+                order = order[after + 1:] if forward else order[:after][::-1]
+            return _scan(order, self.mask, stop, max(1024, 2 * expected))[start:]
+
+        positions = self.positions
+        ranks = snapshot.ranks[sort_by][positions]
+        if after is not None:
+            keep = ranks > after if forward else ranks < after
+            positions, ranks = positions[keep], ranks[keep]
+        return positions[_smallest(ranks if forward else -ranks.astype("int64"), stop, start)]
+
+    def sorted_by(self, sort_by):
+        return SortedMatches(self, sort_by)
+
+    def keyset_page(self, sort_by, cursor, per_page):
+        """
+        Same page and cursors as pagination.keyset_page() over the ORM
+        queryset, or None when the cursor row is not in the snapshot.
+        """
+        ordering = sort_keys(sort_by)
+        decoded = decode_cursor(cursor, sort_by)
+        direction, values = decoded if decoded else (DIRECTION_NEXT, None)
+        if values is not None and len(values) != len(ordering):
+            direction, values = DIRECTION_NEXT, None
+        forward = direction == DIRECTION_NEXT
+
+        after = None
+        if values is not None:
+            position = self._cursor_position(ordering, values)
+            if position is None:
+                return None
+            after = int(self.snapshot.ranks[self.snapshot.sort_option(sort_by)][position])
+
+        rows = _fetch_sales(self.first(sort_by, per_page + 1, after=after, forward=forward), self.snapshot)
+        return build_keyset_page(rows, sort_by, ordering, per_page, forward, values is not None)
+
+    def _cursor_position(self, ordering, values):
+        """
+        Snapshot position of the row a cursor points at, if it is still
+        there with the same sort value (else the ORM seeks by value).
+        """
+        snapshot = self.snapshot
+        *primary, row_id = values
+        if not isinstance(row_id, int):
+            return None
+        position = int(np.searchsorted(snapshot.ids, row_id))
+        if position >= snapshot.rows or snapshot.ids[position] != row_id:
+            return None
+        field = ordering[0].lstrip("-")
+        if field == "date":
+            current = _date(snapshot.days[position])
+        elif field == "quantity":
+            current = int(snapshot.quantities[position])
+        else:
+            current = Sale.objects.filter(id=row_id).values_list(field, flat=True).first()
+        return position if [current] == primary else None
+
+
+class SortedMatches:
+    """
+    Matches in sort_keys() order, sliceable like a queryset (so Paginator
+    can page it): a slice only ever orders the rows up to its end.
+    """
+
+    def __init__(self, matches, sort_by):
+        self.matches = matches
+        self.sort_by = sort_by
+
+    def __len__(self):
+        return len(self.matches)
+
+    def count(self):
+        return len(self.matches)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step not in (None, 1):
+            raise TypeError("SortedMatches only supports contiguous slices")
+        start, stop, _ = item.indices(len(self.matches))
+        if stop <= start:
+            return []
+        return _fetch_sales(self.matches.first(self.sort_by, stop, start), self.matches.snapshot)
+
+
+def _facet_codes(columns, dictionary):
+    """
+    Each row's cell in the facet cube: the four facet dimensions' positions
+    among their ids (ascending), mixed-radix in DIMENSION_FILTERS order.
+    """
+    codes = np.zeros(len(columns["ids"]), dtype="int64")
+    for field in DIMENSION_FILTERS.values():
+        ids = sorted(dictionary["dimensions"][field].values())
+        position = np.zeros(max(ids, default=0) + 1, dtype="int64")
+        position[ids] = np.arange(len(ids))
+        codes = codes * max(len(ids), 1) + position[columns[field]]
+    return codes.astype("int32")
+
+
+def _derive(columns, name_order, links, tag_ids, dictionary):
+    """
+    Adds the sort orders, ranks, facet codes and tag bitmaps to the column
+    arrays. tag_ids lists Tag ids in bitmap row order.
+    """
+    arrays = dict(columns)
+    arrays["facet_codes"] = _facet_codes(columns, dictionary)
+    ids = arrays["ids"]
+    orders = {
+        "date_desc": np.lexsort((ids, -arrays["days"])),
+        "quantity_desc": np.lexsort((ids, -arrays["quantities"])),
+        # names are ordered by the database, so its collation decides
+        "name_asc": np.searchsorted(ids, name_order),
+    }
+    for sort_by, order in orders.items():
+        arrays[f"order_{sort_by}"] = order.astype("int32")
+        arrays[f"rank_{sort_by}"] = _ranks(order)
+
+    # one packed bitmap (a bit per row) per tag
+    tag_column, sale_column = links
+    bitmaps = np.zeros((len(tag_ids), (len(ids) + 7) // 8), dtype="uint8")
+    if len(tag_column):
+        order = np.argsort(tag_column, kind="stable")
+        keys, starts = np.unique(tag_column[order], return_index=True)
+        positions = np.searchsorted(ids, sale_column[order])
+        bounds = np.append(starts, len(order))
+        row_of = {tag_id: index for index, tag_id in enumerate(tag_ids)}
+        bits = np.zeros(len(ids), dtype=bool)
+        for key, begin, end in zip(keys.tolist(), bounds[:-1], bounds[1:]):
+            bits[:] = False
+            bits[positions[begin:end]] = True
+            bitmaps[row_of[key]] = np.packbits(bits)
+    arrays["tag_bitmaps"] = bitmaps
+    return arrays
+
+
+def build_snapshot(version=None):
+    """
+    Reads Sale, the dimension lookup and the tag index into a new in-memory
+    ColumnarSnapshot (one read transaction, so the columns agree).
+    """
+    if version is None:
+        version = get_dataset_version()
+    table = Sale._meta.db_table
+    expressions = ", ".join(expression for _, expression, _ in _COLUMNS)
+    chunks = {name: [] for name, _, _ in _COLUMNS}
+    # the read alias (see sales/routers.py), so the ORM reads below share the transaction
+    alias = router.db_for_read(Sale)
+
+    with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+        cursor.execute(f"SELECT {expressions} FROM {table} ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(FETCH_CHUNK)
+            if not rows:
+                break
+            for (name, _, dtype), values in zip(_COLUMNS, zip(*rows)):
+                chunks[name].append(np.array(values, dtype=dtype))
+        cursor.execute(f"SELECT id FROM {table} ORDER BY customer_name, id")
+        name_order = np.array([row[0] for row in cursor.fetchall()], dtype="int64")
+        cursor.execute(f"SELECT tag_id, sale_id FROM {SaleTag._meta.db_table}")
+        links = cursor.fetchall()
+        tags = list(Tag.objects.using(alias).order_by("name").values_list("id", "name"))
+        dimensions = {field: {} for field in DIMENSION_FILTERS.values()}
+        for value in DimensionValue.objects.using(alias).filter(dimension__in=list(dimensions)):
+            dimensions[value.dimension][value.label] = value.id
+
+    columns = {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        for (name, _, dtype), parts in zip(_COLUMNS, chunks.values())
+    }
+    columns["days"] = columns["days"].astype("int32")
+    links = (
+        np.array([tag for tag, _ in links], dtype="int64"),
+        np.array([sale for _, sale in links], dtype="int64"),
+    )
+    dictionary = {"dimensions": dimensions, "tags": [name for _, name in tags]}
+    arrays = _derive(columns, name_order, links, [tag_id for tag_id, _ in tags], dictionary)
+    return ColumnarSnapshot(version, arrays, dictionary)
+
+
+# ------------------------------------------------------
+# On-disk snapshots
+# ------------------------------------------------------
+def _read_current(directory):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def open_snapshot(directory):
+    """
+    Memory-maps the current snapshot in directory; None if there is none
+    or it was written in another format.
+    """
+    name = _read_current(directory)
+    if name is None:
+        return None
+    path = os.path.join(directory, name)
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            return None
+        with open(os.path.join(path, "dictionary.json"), encoding="utf-8") as f:
+            dictionary = json.load(f)
+        arrays = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r") for key in meta["arrays"]}
+    except (OSError, ValueError, KeyError):
+        # CURRENT moved on and this version was pruned between the reads
+        return None
+    return ColumnarSnapshot(meta["dataset_version"], arrays, dictionary, source=name)
+
+
+def write_snapshot(snapshot, directory):
+    """
+    Writes the snapshot to directory/v<version>/ and makes it current:
+    files go to a staging directory first, which is renamed into place, and
+    CURRENT is swapped with os.replace, so readers see the old snapshot or
+    the new one and never a partial write. Keeps the previous snapshot
+    (readers may still be opening it) and removes older ones.
+    """
+    name = f"v{snapshot.version}"
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=directory)
+    # mkdtemp makes it owner-only; workers may run as another user
+    os.chmod(staging, 0o755)
+    for key, values in snapshot.arrays.items():
+        np.save(os.path.join(staging, f"{key}.npy"), values)
+    meta = {
+        "format": FORMAT_VERSION,
+        "dataset_version": snapshot.version,
+        "rows": snapshot.rows,
+        "arrays": sorted(snapshot.arrays),
+    }
+    with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    with open(os.path.join(staging, "dictionary.json"), "w", encoding="utf-8") as f:
+        json.dump(snapshot.dictionary, f)
+
+    target = os.path.join(directory, name)
+    previous = _read_current(directory)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.rename(staging, target)
+    pointer = os.path.join(directory, f".{CURRENT_FILE}.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    for entry in os.listdir(directory):
+        stale = entry.startswith(".staging-") or (entry.startswith("v") and entry not in (name, previous))
+        if stale:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    return name
+
+
+@contextlib.contextmanager
+def _writer_lock(directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def publish_snapshot(directory, version=None):
+    """
+    Makes sure directory holds the snapshot for a dataset version (default:
+    the current one) and returns it, memory-mapped. One process writes;
+    others wait on the lock and then simply open what it wrote.
+    """
+    if version is None:
+        version = get_dataset_version()
+    with _writer_lock(directory):
+        snapshot = open_snapshot(directory)
+        if snapshot is None or snapshot.version != version:
+            write_snapshot(build_snapshot(version), directory)
+            snapshot = open_snapshot(directory)
+    return snapshot
+
+
+# ------------------------------------------------------
+# Process-wide snapshot
+# ------------------------------------------------------
+def columnar_available():
+    return np is not None
+
+
+def columnar_enabled():
+    return columnar_available() and getattr(settings, "SALES_COLUMNAR", False)
+
+
+def snapshot_directory():
+    """
+    SALES_COLUMNAR_DIR, or None when each process keeps its own in-memory snapshot.
+    """
+    return getattr(settings, "SALES_COLUMNAR_DIR", "") or None
+
+
+def _load(version):
+    directory = snapshot_directory()
+    if directory:
+        return publish_snapshot(directory, version)
+    return build_snapshot(version)
+
+
+def _install(snapshot):
+    global _snapshot
+    with _lock:
+        _snapshot = snapshot
+
+
+def _refresh(version):
+    global _building
+    try:
+        while True:
+            snapshot = _load(version)
+            current = get_dataset_version()
+            if current == version:
+                break
+            # an import finished while this one was being read: load again
+            version = current
+        _install(snapshot)
+        logger.info("columnar snapshot: %d rows, %.1f MB", snapshot.rows, snapshot.nbytes() / 2**20)
+    except Exception:
+        logger.exception("columnar snapshot build failed")
+    finally:
+        with _lock:
+            _building = None
+        connections.close_all()
+
+
+def get_snapshot():
+    """
+    This process's snapshot if it matches the current dataset version.
+    Otherwise a newer on-disk snapshot is mapped in if there is one, or a
+    background thread starts building (or waiting for) it, and the caller
+    gets None.
+    """
+    global _building
+    if not columnar_enabled():
+        return None
+    version = get_dataset_version()
+    with _lock:
+        snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    directory = snapshot_directory()
+    if directory and _read_current(directory) not in (None, getattr(snapshot, "source", None)):
+        opened = open_snapshot(directory)
+        if opened is not None and opened.version == version:
+            _install(opened)
+            return opened
+
+    with _lock:
+        if _building is not None:
+            return None
+        _building = version
+    threading.Thread(target=_refresh, args=(version,), name="columnar-snapshot", daemon=True).start()
+    return None
+
+
+def refresh_snapshot():
+    """
+    Loads and installs a snapshot for the current version synchronously
+    (benchmarks, warm-up); returns it.
+    """
+    snapshot = _load(get_dataset_version())
+    _install(snapshot)
+    return snapshot
+
+
+def clear_snapshot():
+    _install(None)
+
+
+def columnar_facet_counts(params, search_query=""):
+    """
+    ColumnarSnapshot.facet_counts() from the current snapshot, or None to
+    count with the ORM (same conditions as columnar_matches()).
+    """
+    if search_query:
+        return None
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    return snapshot.facet_counts(params)
+
+
+def columnar_matches(params, search_query=""):
+    """
+    ColumnarMatches for request params from the current snapshot, or None
+    to use the ORM (engine off, snapshot stale or building, search active,
+    or filters the snapshot cannot evaluate exactly).
+    """
+    if search_query:
+        return None
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    return snapshot.match(params)
@@ -0,0 +1,71 @@
+"""
+Bounded concurrency for the async sales_list.
+
+The parts of a listing page that do not depend on each other (page rows,
+result count, summary panel, facet counts) are plain synchronous ORM code.
+run_sync() runs one of them on a process-wide pool of SALES_ASYNC_WORKERS
+threads, each with its own database connections, so at most that many
+queries are in flight however many requests are waiting; run_optional()
+additionally gives up waiting after a timeout. Python cannot interrupt a
+query that is already running: a part that misses its deadline keeps its
+thread until the database returns, the request simply stops waiting for it.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.db import close_old_connections
+
+from .profiling import phase, profile_connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "SALES_ASYNC_WORKERS", 4),
+                thread_name_prefix="sales-query",
+            )
+        return _executor
+
+
+def _in_worker(name, func):
+    def run(*args):
+        # connections outlive a task only as long as CONN_MAX_AGE allows, as after a request
+        close_old_connections()
+        try:
+            with profile_connections(), phase(name):
+                return func(*args)
+        finally:
+            close_old_connections()
+    return run
+
+
+async def run_sync(name, func, *args, timeout=None):
+    """
+    func(*args) on the pool, profiled as phase `name`. Raises TimeoutError
+    when it takes longer than timeout seconds (None: no limit).
+    """
+    call = SyncToAsync(_in_worker(name, func), thread_sensitive=False, executor=get_executor())
+    return await asyncio.wait_for(call(*args), timeout)
+
+
+async def run_optional(name, func, *args, timeout=None):
+    """
+    run_sync() for a part the page can do without: None when it misses
+    its deadline.
+    """
+    try:
+        return await run_sync(name, func, *args, timeout=timeout)
+    except TimeoutError:
+        logger.warning("%s missed its %.0f ms deadline; rendering without it", name, timeout * 1000)
+        return None
@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models import Max, Min
+
+from ..models import Sale
+from .dataset import get_dataset_version
+
+COUNT_MODE_EXACT = "exact"
+COUNT_MODE_ESTIMATE = "estimate"
+COUNT_MODE_CAP = "cap"
+
+
+@dataclass(frozen=True)
+class ResultCount:
+    """
+    value is exact when exact=True; otherwise it is an estimate, or
+    (capped=True) a lower bound meaning "more than value - 1 results".
+    """
+    value: int
+    exact: bool = True
+    capped: bool = False
+
+
+def capped_count(queryset, limit):
+    """
+    COUNT over at most `limit` rows (SELECT COUNT(*) FROM (... LIMIT n)),
+    so the database stops scanning once the cap is reached.
+    """
+    return queryset.order_by().values("id")[:limit].count()
+
+
+def table_row_estimate():
+    """
+    Row count of sales_sale from planner statistics where available
+    (pg_class.reltuples / sqlite_stat1), else from the id range.
+    """
+    table = Sale._meta.db_table
+    connection = connections[router.db_for_read(Sale)]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+            row = cursor.fetchone()
+            if row and row[0] and row[0] > 0:
+                return int(row[0])
+        elif connection.vendor == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                # the table's own row (idx IS NULL) when there is one, else its largest
+                # index: a partial index (the natural_key one) only counts some rows
+                cursor.execute(
+                    "SELECT CAST(s.stat AS INTEGER) FROM sqlite_stat1 s"
+                    " LEFT JOIN sqlite_master m ON m.type = 'index' AND m.name = s.idx"
+                    " WHERE s.tbl = %s AND (m.sql IS NULL OR m.sql NOT LIKE '%% WHERE %%')"
+                    " ORDER BY s.idx IS NOT NULL, CAST(s.stat AS INTEGER) DESC LIMIT 1",
+                    [table],
+                )
+                row = cursor.fetchone()
+                if row and row[0]:
+                    return int(row[0])
+
+    bounds = Sale.objects.aggregate(lo=Min("id"), hi=Max("id"))
+    if bounds["lo"] is None:
+        return 0
+    return bounds["hi"] - bounds["lo"] + 1
+
+
+def sampled_count(queryset, sample_size=None, windows=4):
+    """
+    Estimates COUNT(*) by counting matches inside a few evenly spaced
+    primary-key windows and scaling by the table size. Each window is a
+    cheap index range scan, however broad the filter is.
+    """
+    if sample_size is None:
+        sample_size = getattr(settings, "SALES_COUNT_SAMPLE_SIZE", 20000)
+
+    bounds = Sale.objects.aggregate(lo=Min("id"), hi=Max("id"))
+    lo, hi = bounds["lo"], bounds["hi"]
+    if lo is None:
+        return 0
+
+    span = max(1, sample_size // windows)
+    stride = max(span, (hi - lo + 1) // windows)
+    matched = 0
+    sampled = 0
+    for i in range(windows):
+        start = lo + i * stride
+        if start > hi:
+            break
+        window = {"id__gte": start, "id__lt": start + span}
+        matched += queryset.order_by().filter(**window).count()
+        sampled += Sale.objects.filter(**window).count()
+
+    if not sampled:
+        return 0
+    return round(table_row_estimate() * matched / sampled)
+
+
+def count_results(queryset, signature):
+    """
+    Counts results for the filtered queryset, picking a strategy by cost:
+      - cached result for (dataset version, filter signature) if present
+      - exact count when it fits under SALES_EXACT_COUNT_THRESHOLD rows
+        (found with a capped COUNT, so the probe itself is bounded)
+      - otherwise SALES_LARGE_COUNT_MODE: "estimate" (sampled), "cap"
+        ("more than N results") or "exact"
+    """
+    key = f"sales:count:{get_dataset_version()}:{signature}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    threshold = getattr(settings, "SALES_EXACT_COUNT_THRESHOLD", 10000)
+    probe = capped_count(queryset, threshold + 1)
+    if probe <= threshold:
+        result = ResultCount(probe)
+    else:
+        mode = getattr(settings, "SALES_LARGE_COUNT_MODE", COUNT_MODE_ESTIMATE)
+        if mode == COUNT_MODE_CAP:
+            result = ResultCount(probe, exact=False, capped=True)
+        elif mode == COUNT_MODE_EXACT:
+            result = ResultCount(queryset.order_by().count())
+        else:
+            # never report fewer rows than the probe already proved exist
+            result = ResultCount(max(probe, sampled_count(queryset)), exact=False)
+
+    cache.set(key, result, getattr(settings, "SALES_COUNT_CACHE_TTL", 600))
+    return result
@@ -0,0 +1,40 @@
+import time
+
+from django.core.cache import cache
+
+from ..models import DatasetVersion
+
+DATASET_VERSION_KEY = "sales:dataset_version"
+# the DatasetVersion row
+DATASET_VERSION_ID = 1
+
+
+def _stored_version():
+    row, _ = DatasetVersion.objects.get_or_create(id=DATASET_VERSION_ID, defaults={"version": time.time_ns()})
+    return row.version
+
+
+def get_dataset_version():
+    """
+    Returns the current dataset version: from the shared cache, or from the
+    DatasetVersion row when the cache has lost the key (culled, cleared,
+    restarted), which leaves every version-keyed cache valid.
+    """
+    version = cache.get(DATASET_VERSION_KEY)
+    if version is None:
+        version = _stored_version()
+        # add, not set: a bump racing with this read has already stored the newer version
+        if not cache.add(DATASET_VERSION_KEY, version, timeout=None):
+            version = cache.get(DATASET_VERSION_KEY, version)
+    return version
+
+
+def bump_dataset_version():
+    """
+    Marks the dataset as changed (called after every import).
+    All version-keyed caches are invalidated by this.
+    """
+    version = time.time_ns()
+    DatasetVersion.objects.update_or_create(id=DATASET_VERSION_ID, defaults={"version": version})
+    cache.set(DATASET_VERSION_KEY, version, timeout=None)
+    return version
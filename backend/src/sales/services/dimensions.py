@@ -0,0 +1,148 @@
+"""
+Integer codes for Sale's low-cardinality text columns.
+
+Sale stores DimensionValue ids for gender, region, category, payment
+method, order status, delivery type and customer type; the labels live
+only in the lookup table. An id <-> label pair never changes once created,
+so every process keeps the pairs it has seen in a dict and only asks the
+database about labels or ids it does not know yet (new values from an
+import, possibly run by another process).
+"""
+import threading
+
+from django.db import transaction
+
+from ..models import DimensionValue, Sale
+
+# Sale fields stored as DimensionValue ids; the field name is the dimension name
+DIMENSION_FIELDS = [
+    "gender",
+    "customer_region",
+    "customer_type",
+    "product_category",
+    "payment_method",
+    "order_status",
+    "delivery_type",
+]
+
+_lock = threading.Lock()
+_ids = {}  # (dimension, label) -> id
+_values = {}  # id -> DimensionValue
+
+
+def _remember(values):
+    with _lock:
+        for value in values:
+            _ids[(value.dimension, value.label)] = value.id
+            _values[value.id] = value
+
+
+def _fetch(**lookup):
+    values = list(DimensionValue.objects.filter(**lookup))
+    # rows read inside a transaction may be its own uncommitted inserts: only
+    # cache them once they are committed (immediately outside a transaction)
+    transaction.on_commit(lambda: _remember(values))
+    return values
+
+
+def dimension_ids(dimension, labels, create=False):
+    """
+    {label: id} for labels of one dimension. Unknown labels are left out,
+    or inserted first with create=True.
+    """
+    labels = set(labels)
+    with _lock:
+        found = {label: _ids[(dimension, label)] for label in labels if (dimension, label) in _ids}
+    missing = labels - found.keys()
+    if missing:
+        found.update((v.label, v.id) for v in _fetch(dimension=dimension, label__in=missing))
+        missing -= found.keys()
+        if create and missing:
+            DimensionValue.objects.bulk_create(
+                [DimensionValue(dimension=dimension, label=label) for label in missing],
+                ignore_conflicts=True,
+            )
+            found.update((v.label, v.id) for v in _fetch(dimension=dimension, label__in=missing))
+    return found
+
+
+def dimension_values(ids):
+    """
+    {id: DimensionValue} for the given ids.
+    """
+    ids = set(ids)
+    with _lock:
+        found = {i: _values[i] for i in ids if i in _values}
+    missing = ids - found.keys()
+    if missing:
+        found.update((v.id, v) for v in _fetch(id__in=missing))
+    return found
+
+
+def dimension_labels(ids):
+    """
+    {id: label} for the given ids.
+    """
+    return {i: value.label for i, value in dimension_values(ids).items()}
+
+
+def clear_dimension_cache():
+    """
+    Forgets every cached pair. Only needed when the database itself is
+    swapped out (benchmarks, test databases): ids are never reused otherwise.
+    """
+    with _lock:
+        _ids.clear()
+        _values.clear()
+
+
+def dimension_choices(dimension):
+    """
+    Sorted non-empty labels of a dimension, straight from the lookup table.
+    """
+    return sorted(
+        DimensionValue.objects.filter(dimension=dimension).exclude(label="").values_list("label", flat=True)
+    )
+
+
+def encode_rows(rows, positions):
+    """
+    Replaces the labels at positions ({tuple index: dimension}) of each row
+    tuple with DimensionValue ids, creating ids for new labels.
+    """
+    if not rows:
+        return rows
+    codes = {
+        index: dimension_ids(dimension, {row[index] for row in rows}, create=True)
+        for index, dimension in positions.items()
+    }
+    encoded = []
+    for row in rows:
+        row = list(row)
+        for index, ids in codes.items():
+            row[index] = ids[row[index]]
+        encoded.append(tuple(row))
+    return encoded
+
+
+def attach_dimensions(sales):
+    """
+    Fills each sale's dimension relations (sale.gender, sale.customer_region,
+    ...) from the in-process lookup, so rendering labels costs no joins and
+    no per-row queries. Fields deferred by .only() are skipped.
+    """
+    sales = list(sales)
+    fields = [Sale._meta.get_field(name) for name in DIMENSION_FIELDS]
+    ids = {
+        sale.__dict__[field.attname]
+        for sale in sales
+        for field in fields
+        if sale.__dict__.get(field.attname) is not None
+    }
+    values = dimension_values(ids)
+    for sale in sales:
+        for field in fields:
+            value_id = sale.__dict__.get(field.attname)
+            if value_id in values:
+                field.set_cached_value(sale, values[value_id])
+    return sales
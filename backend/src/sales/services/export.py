@@ -0,0 +1,105 @@
+"""
+Streaming export of every sale matching a search + filter + sort state.
+
+Rows are read as values_list tuples through iterator(chunk_size=...)
+(a server-side cursor on Postgres), so memory stays flat however many
+rows match. CSV uses the import headers, so an export can be fed straight
+back into load_sales_data; dimension ids are written as their labels and
+minor-unit amounts as "594.84" text.
+"""
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..models import Sale
+from .dimensions import DIMENSION_FIELDS, dimension_labels
+from .filters import apply_filters
+from .ingest import SALE_COLUMNS
+from .money import MONEY_FIELDS, format_minor
+from .search import apply_search
+from .sorting import DEFAULT_SORT, apply_sorting
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+
+EXPORT_FORMATS = {
+    FORMAT_CSV: "text/csv; charset=utf-8",
+    FORMAT_NDJSON: "application/x-ndjson",
+}
+
+# (field, CSV header) in export order
+EXPORT_COLUMNS = [("id", "ID")] + [(field, header) for field, header, _ in SALE_COLUMNS]
+EXPORT_FIELDS = [field for field, _ in EXPORT_COLUMNS]
+_DIMENSION_POSITIONS = [EXPORT_FIELDS.index(f) for f in DIMENSION_FIELDS]
+_MONEY_POSITIONS = [EXPORT_FIELDS.index(f) for f in MONEY_FIELDS]
+
+
+def export_queryset(params):
+    """
+    The sales_list pipeline (search -> filters -> sorting) for request params.
+    """
+    search_query = params.get("q", "").strip()
+    qs = apply_search(Sale.objects.all(), search_query)
+    qs = apply_filters(qs, params)
+    return apply_sorting(qs, params.get("sort", DEFAULT_SORT), search_query)
+
+
+def export_rows(queryset, chunk_size=5000):
+    labels = {}
+    for row in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        row = list(row)
+        for index in _DIMENSION_POSITIONS:
+            value_id = row[index]
+            if value_id not in labels:
+                labels.update(dimension_labels([value_id]))
+            row[index] = labels.get(value_id)
+        for index in _MONEY_POSITIONS:
+            if row[index] is not None:
+                row[index] = format_minor(row[index])
+        yield row
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(rows, batch_size=1000):
+    """
+    Header line, then CSV text in blocks of batch_size rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for _, header in EXPORT_COLUMNS])
+    yield buffer.getvalue()
+    for batch in _batched(rows, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows, batch_size=1000):
+    """
+    One JSON object per line, in blocks of batch_size rows.
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for batch in _batched(rows, batch_size):
+        yield "".join(encoder.encode(dict(zip(EXPORT_FIELDS, row))) + "\n" for row in batch)
+
+
+def stream_export(params, export_format=FORMAT_CSV, chunk_size=5000):
+    """
+    Text chunks of the export for request params in the given format.
+    """
+    rows = export_rows(export_queryset(params), chunk_size)
+    if export_format == FORMAT_NDJSON:
+        return iter_ndjson(rows)
+    return iter_csv(rows)
@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from ..models import Sale, SaleTag, Tag
+from .columnar import columnar_facet_counts
+from .dataset import get_dataset_version
+from .dimensions import dimension_choices, dimension_ids, dimension_labels
+from .filters import DIMENSION_FILTERS, DIMENSION_PARAMS, apply_filters, parse_filters
+from .search import apply_search
+from .tags import TAG_MODE_ALL
+
+_local_lock = threading.Lock()
+_local = {"version": None, "expires_at": 0.0, "catalog": None}
+
+
+def _catalog_key(version):
+    return f"sales:facet_catalog:{version}"
+
+
+def build_facet_catalog():
+    """
+    Returns {"regions": [...], ..., "tags": [...]}. Dimension facets come
+    straight from the DimensionValue lookup table and tags from the tag
+    index, so no query touches sales_sale.
+    """
+    catalog = {name: dimension_choices(field) for name, field in DIMENSION_FILTERS.items()}
+    catalog["tags"] = list(Tag.objects.order_by("name").values_list("name", flat=True))
+    return catalog
+
+
+def rebuild_facet_catalog(version=None):
+    """
+    Precomputes the catalog for a dataset version and stores it in the
+    shared cache. Called by load_sales_data once an import finishes.
+    """
+    if version is None:
+        version = get_dataset_version()
+    catalog = build_facet_catalog()
+    cache.set(_catalog_key(version), catalog, timeout=None)
+    _remember(version, catalog)
+    return catalog
+
+
+def _remember(version, catalog):
+    ttl = getattr(settings, "SALES_FACET_CACHE_TTL", 60)
+    with _local_lock:
+        _local["version"] = version
+        _local["catalog"] = catalog
+        _local["expires_at"] = time.monotonic() + ttl
+
+
+def get_facet_catalog():
+    """
+    Returns the facet catalog for the filter dropdowns.
+
+    Lookup order:
+      1. in-process copy (until its TTL runs out)
+      2. shared cache, keyed by dataset version
+      3. rebuild from the database (cold start / evicted entry)
+    """
+    now = time.monotonic()
+    with _local_lock:
+        if _local["catalog"] is not None and now < _local["expires_at"]:
+            return _local["catalog"]
+
+    version = get_dataset_version()
+    with _local_lock:
+        if _local["catalog"] is not None and _local["version"] == version:
+            catalog = _local["catalog"]
+        else:
+            catalog = None
+    if catalog is not None:
+        _remember(version, catalog)
+        return catalog
+
+    catalog = cache.get(_catalog_key(version))
+    if catalog is None:
+        return rebuild_facet_catalog(version)
+
+    _remember(version, catalog)
+    return catalog
+
+
+# ------------------------------------------------------
+# Per-option counts
+# ------------------------------------------------------
+def _without(params, *keys):
+    params = params.copy()
+    for key in keys:
+        params.pop(key, None)
+    return params
+
+
+def _dimension_counts(params, search_query):
+    """
+    Dimension facet counts from one grouped pass: every other filter is
+    applied in SQL, the (region, gender, category, payment method) groups
+    come back with their row counts, and each facet then sums the groups
+    that satisfy the other facets' selections. A facet's own selection
+    never narrows its own counts.
+    """
+    filters = parse_filters(params)
+    fields = list(DIMENSION_FILTERS.values())
+    columns = [Sale._meta.get_field(field).attname for field in fields]
+    base = apply_filters(
+        apply_search(Sale.objects.all(), search_query), _without(params, *DIMENSION_PARAMS.values())
+    )
+    groups = list(base.order_by().values_list(*columns).annotate(n=Count("id")))
+
+    # facet -> selected ids (None: nothing selected)
+    selected = {
+        key: set(dimension_ids(field, filters[key]).values()) if filters[key] else None
+        for key, field in DIMENSION_FILTERS.items()
+    }
+    counts = {key: Counter() for key in DIMENSION_FILTERS}
+    for *ids, n in groups:
+        outside = [
+            key for key, value in zip(DIMENSION_FILTERS, ids)
+            if selected[key] is not None and value not in selected[key]
+        ]
+        # a group outside one facet's selection still counts for that facet's options
+        for index, key in enumerate(DIMENSION_FILTERS):
+            if not outside or outside == [key]:
+                counts[key][ids[index]] += n
+
+    labels = dimension_labels({i for counter in counts.values() for i in counter})
+    return {
+        key: {labels[i]: n for i, n in counter.items() if i in labels}
+        for key, counter in counts.items()
+    }
+
+
+def _tag_counts(params, search_query):
+    """
+    {tag name: matching sales} with every filter but the tag selection
+    applied (in "all" mode with it too: adding a tag there narrows the
+    current results), as one GROUP BY over the tag index.
+    """
+    filters = parse_filters(params)
+    if filters["tags_mode"] != TAG_MODE_ALL:
+        params = _without(params, "tags", "tags_mode")
+    base = apply_filters(apply_search(Sale.objects.all(), search_query), params)
+    postings = SaleTag.objects.all()
+    if search_query or any(value not in (None, []) for value in parse_filters(params).values()):
+        postings = postings.filter(sale_id__in=base.order_by().values("id"))
+    grouped = dict(postings.order_by().values_list("tag_id").annotate(n=Count("sale_id")))
+    names = dict(Tag.objects.filter(id__in=grouped).values_list("id", "name"))
+    return {names[i]: n for i, n in grouped.items() if i in names}
+
+
+def facet_counts(params, search_query="", signature=None):
+    """
+    {facet: {option: rows}} for the filter panels, under the current search
+    and filters, each facet ignoring its own selection (standard faceting).
+    Answered from the columnar snapshot when it is available, else with two
+    grouped queries; cached per (dataset version, filter signature).
+    Options with no matching rows are left out.
+    """
+    key = None
+    if signature is not None:
+        key = f"sales:facet_counts:{get_dataset_version()}:{signature}"
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    counts = columnar_facet_counts(params, search_query)
+    if counts is None:
+        counts = _dimension_counts(params, search_query)
+        counts["tags"] = _tag_counts(params, search_query)
+    counts = {facet: {option: n for option, n in options.items() if n} for facet, options in counts.items()}
+
+    if key is not None:
+        cache.set(key, counts, getattr(settings, "SALES_FACET_COUNT_CACHE_TTL", 600))
+    return counts
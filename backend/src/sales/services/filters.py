@@ -1,4 +1,26 @@
-from django.db.models import Q
+import hashlib
+import json
+
+from .dimensions import dimension_ids
+from .postgres import in_lookup
+from .tags import TAG_MODE_ALL, TAG_MODE_ANY, filter_by_tags, normalize_tag
+
+# parse_filters() key -> Sale dimension field it restricts
+DIMENSION_FILTERS = {
+    "regions": "customer_region",
+    "genders": "gender",
+    "categories": "product_category",
+    "payment_methods": "payment_method",
+}
+
+# parse_filters() key -> request.GET parameter it is read from; facet counts, query
+# shapes, rollups and the filter panels all take their mappings from these two
+DIMENSION_PARAMS = {
+    "regions": "region",
+    "genders": "gender",
+    "categories": "category",
+    "payment_methods": "payment_method",
+}
 
 
 def _parse_int(value, default=None):
@@ -27,12 +49,13 @@ def _parse_multi(params, key):
     return result
 
 
-def apply_filters(queryset, params):
-    # multi-select fields
-    regions = _parse_multi(params, "region")
-    genders = _parse_multi(params, "gender")
-    categories = _parse_multi(params, "category")
-    payment_methods = _parse_multi(params, "payment_method")
+def parse_filters(params):
+    """
+    Reads every supported filter from request.GET into a plain dict.
+    Missing / invalid values come back as [] or None.
+    """
+    # multi-select dimension fields
+    dimensions = {key: _parse_multi(params, name) for key, name in DIMENSION_PARAMS.items()}
 
     # age
     age_min = _parse_int(params.get("age_min"))
@@ -43,24 +66,58 @@ def apply_filters(queryset, params):
         age_min, age_max = age_max, age_min
 
     # dates
-    date_from = params.get("date_from")
-    date_to = params.get("date_to")
+    date_from = params.get("date_from") or None
+    date_to = params.get("date_to") or None
 
-    # tags from multi-select / chips => name="tags"
-    tag_values = _parse_multi(params, "tags")
+    # tags from multi-select / chips => name="tags" (case-insensitive, as stored)
+    tag_values = [normalize_tag(value) for value in _parse_multi(params, "tags")]
+    tags_mode = TAG_MODE_ALL if params.get("tags_mode") == TAG_MODE_ALL else TAG_MODE_ANY
+
+    return {
+        **dimensions,
+        "age_min": age_min,
+        "age_max": age_max,
+        "date_from": date_from,
+        "date_to": date_to,
+        "tags": tag_values,
+        "tags_mode": tags_mode if tag_values else None,
+    }
 
-    # apply filters
-    if regions:
-        queryset = queryset.filter(customer_region__in=regions)
 
-    if genders:
-        queryset = queryset.filter(gender__in=genders)
+def filter_signature(params, search_query=""):
+    """
+    Stable hash of the search + filter state. Parameter order, duplicates and
+    comma-vs-repeated encoding don't change it, so it can key caches.
+    """
+    canonical = {}
+    for key, value in parse_filters(params).items():
+        if isinstance(value, list):
+            value = sorted(set(value))
+        if value not in (None, []):
+            canonical[key] = value
+    if search_query:
+        canonical["q"] = search_query
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
 
-    if categories:
-        queryset = queryset.filter(product_category__in=categories)
 
-    if payment_methods:
-        queryset = queryset.filter(payment_method__in=payment_methods)
+def apply_filters(queryset, params):
+    filters = parse_filters(params)
+    age_min = filters["age_min"]
+    age_max = filters["age_max"]
+    date_from = filters["date_from"]
+    date_to = filters["date_to"]
+    tag_values = filters["tags"]
+    tags_mode = filters["tags_mode"]
+
+    # apply filters
+    # dimension labels -> DimensionValue ids once, so the indexes compare small integers
+    for key, field in DIMENSION_FILTERS.items():
+        if filters[key]:
+            ids = dimension_ids(field, filters[key])
+            if not ids:
+                return queryset.none()
+            queryset = queryset.filter(**{in_lookup(field): sorted(ids.values())})
 
     if age_min is not None:
         queryset = queryset.filter(age__gte=age_min)
@@ -75,9 +132,6 @@ def apply_filters(queryset, params):
         queryset = queryset.filter(date__lte=date_to)
 
     if tag_values:
-        q = Q()
-        for t in tag_values:
-            q |= Q(tags__icontains=t)
-        queryset = queryset.filter(q)
+        queryset = filter_by_tags(queryset, tag_values, tags_mode)
 
     return queryset
@@ -0,0 +1,80 @@
+"""
+Pre-built filter-panel fragments for sales_list.
+
+The checkbox rows of the filter panels only change with the facet catalog,
+yet the template used to rebuild every row on every request (a {% for %}
+per panel, an `in` test against a list and a localized count per option).
+compiled_panels() escapes and assembles each row once per catalog, i.e. once
+per dataset version and process (get_facet_catalog() hands out the same
+catalog object until the version changes); render_options() then only
+splices in " checked" from a set lookup and the option's count.
+"""
+import threading
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .filters import DIMENSION_PARAMS
+
+# catalog key -> (checkbox name, text when the catalog has no options)
+FILTER_PANELS = {
+    **{key: (name, f"No {name.replace('_', ' ')} data available.") for key, name in DIMENSION_PARAMS.items()},
+    "tags": ("tags", "No tags available."),
+}
+
+_lock = threading.Lock()
+_compiled = {"catalog": None, "panels": None}
+
+
+def _option(facet, name, value):
+    """
+    (value, markup up to the checked attribute, markup after it up to the count).
+    """
+    label = escape(value)
+    if facet == "tags":
+        # data-label feeds the tag search box
+        opening = f'<label class="flex items-center gap-2 text-xs text-slate-200" data-tag-option data-label="{escape(value.lower())}">'
+    else:
+        opening = '<label class="flex items-center gap-2 text-xs text-slate-200">'
+    head = (
+        f'{opening}<input type="checkbox" name="{name}" value="{label}" '
+        f'class="rounded border-slate-600 bg-slate-900"'
+    )
+    return value, head, f" /><span>{label}</span>"
+
+
+def compiled_panels(catalog):
+    """
+    {facet: [(value, head, tail), ...]} for this catalog, built on first use.
+    """
+    with _lock:
+        if _compiled["catalog"] is catalog:
+            return _compiled["panels"]
+    panels = {
+        facet: [_option(facet, name, value) for value in catalog.get(facet, [])]
+        for facet, (name, _) in FILTER_PANELS.items()
+    }
+    with _lock:
+        _compiled["catalog"] = catalog
+        _compiled["panels"] = panels
+    return panels
+
+
+def render_options(catalog, facet, selected, counts):
+    """
+    The rows of one filter panel: selected is a set of checked values,
+    counts {value: rows} or None to leave the counts out.
+    """
+    options = compiled_panels(catalog)[facet]
+    if not options:
+        return mark_safe(f'<p class="text-xs text-slate-500">{FILTER_PANELS[facet][1]}</p>')
+    parts = []
+    for value, head, tail in options:
+        parts.append(head)
+        if value in selected:
+            parts.append(" checked")
+        parts.append(tail)
+        if counts is not None:
+            parts.append(f'<span class="text-slate-500">{counts.get(value, 0)}</span>')
+        parts.append("</label>")
+    return mark_safe("".join(parts))
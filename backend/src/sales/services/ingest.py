@@ -0,0 +1,348 @@
+"""
+CSV -> sales_sale ingestion helpers shared by load_sales_data.
+
+Rows are converted straight into tuples in SALE_COLUMNS order, so the fast
+path never builds model instances or runs ORM SQL generation. Tuples carry
+the CSV labels throughout (natural keys and row hashes are computed from
+them); dimension labels become DimensionValue ids only when rows are written.
+"""
+import csv
+import hashlib
+import io
+import os
+from datetime import date, datetime
+
+from django.db import connection
+
+try:
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+except ImportError:  # no Postgres driver installed: only the SQLite paths run
+    is_psycopg3 = False
+
+from ..models import Sale
+from .dimensions import DIMENSION_FIELDS, encode_rows
+from .money import MINOR_PER_UNIT, MONEY_FIELDS, parse_minor
+
+
+# ------------------------------------------------------
+# Utility parsing helpers
+# ------------------------------------------------------
+def parse_text(val):
+    return val if val is not None else ""
+
+
+def parse_int(val):
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_quantity(val):
+    return parse_int(val) or 0
+
+
+def parse_date(val):
+    if not val:
+        return None
+    # fast path for the ISO dates the exports actually use
+    if len(val) == 10 and val[4] == "-":
+        try:
+            return date.fromisoformat(val)
+        except ValueError:
+            pass
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(val, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+# (model field, CSV header, parser) in insert order
+SALE_COLUMNS = [
+    ("customer_id", "Customer ID", parse_text),
+    ("customer_name", "Customer Name", parse_text),
+    ("phone_number", "Phone Number", parse_text),
+    ("gender", "Gender", parse_text),
+    ("age", "Age", parse_int),
+    ("customer_region", "Customer Region", parse_text),
+    ("customer_type", "Customer Type", parse_text),
+    ("product_id", "Product ID", parse_text),
+    ("product_name", "Product Name", parse_text),
+    ("brand", "Brand", parse_text),
+    ("product_category", "Product Category", parse_text),
+    ("tags", "Tags", parse_text),
+    ("quantity", "Quantity", parse_quantity),
+    ("price_per_unit", "Price per Unit", parse_minor),
+    ("discount_percentage", "Discount Percentage", parse_minor),
+    ("total_amount", "Total Amount", parse_minor),
+    ("final_amount", "Final Amount", parse_minor),
+    ("date", "Date", parse_date),
+    ("payment_method", "Payment Method", parse_text),
+    ("order_status", "Order Status", parse_text),
+    ("delivery_type", "Delivery Type", parse_text),
+    ("store_id", "Store ID", parse_text),
+    ("store_location", "Store Location", parse_text),
+    ("salesperson_id", "Salesperson ID", parse_text),
+    ("employee_name", "Employee Name", parse_text),
+]
+
+SALE_FIELDS = [field for field, _, _ in SALE_COLUMNS]
+
+# columns that identify a sale across exports; see NaturalKeys
+KEY_FIELDS = ["customer_id", "product_id", "date", "store_id", "salesperson_id"]
+_KEY_POSITIONS = [SALE_FIELDS.index(f) for f in KEY_FIELDS]
+_MONEY_POSITIONS = frozenset(SALE_FIELDS.index(f) for f in MONEY_FIELDS)
+
+# what actually gets written: the CSV columns plus import bookkeeping
+INSERT_FIELDS = SALE_FIELDS + ["natural_key", "row_hash"]
+# their database columns (dimension fields are stored in <field>_id)
+INSERT_COLUMNS = [Sale._meta.get_field(f).column for f in INSERT_FIELDS]
+_DIMENSION_POSITIONS = {INSERT_FIELDS.index(f): f for f in DIMENSION_FIELDS}
+
+
+def _canonical(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def key_digest(values):
+    return hashlib.sha1("\x1f".join(_canonical(values[i]) for i in _KEY_POSITIONS).encode()).hexdigest()
+
+
+def _canonical_money(value):
+    # hashed as the float the column used to be parsed into, so row hashes
+    # written before amounts became minor units still match unchanged rows
+    return "" if value is None else repr(value / MINOR_PER_UNIT)
+
+
+def row_hash(values):
+    return hashlib.sha1(
+        "\x1f".join(
+            _canonical_money(v) if i in _MONEY_POSITIONS else _canonical(v) for i, v in enumerate(values)
+        ).encode()
+    ).hexdigest()
+
+
+class NaturalKeys:
+    """
+    Turns key digests into natural keys in file order: "<digest>:<n>" where n
+    counts earlier rows of the same file with identical key columns, so
+    genuine repeats stay distinct while re-imports map onto the same keys.
+    """
+
+    def __init__(self):
+        self.seen = {}
+
+    def assign(self, digest):
+        n = self.seen.get(digest, 0)
+        self.seen[digest] = n + 1
+        return f"{digest}:{n}"
+
+    def finish(self, row):
+        """
+        (values..., digest, row_hash) -> (values..., natural_key, row_hash)
+        """
+        return row[:-2] + (self.assign(row[-2]), row[-1])
+
+
+def row_to_values(row):
+    """
+    csv.DictReader row -> tuple in SALE_COLUMNS order, followed by the
+    key digest and row hash (see NaturalKeys.finish).
+    """
+    values = tuple(parser(row.get(header)) for _, header, parser in SALE_COLUMNS)
+    return values + (key_digest(values), row_hash(values))
+
+
+def encode_dimensions(rows):
+    """
+    INSERT_FIELDS tuples with dimension labels -> the same tuples with
+    DimensionValue ids (new labels get new ids).
+    """
+    return encode_rows(rows, _DIMENSION_POSITIONS)
+
+
+def rows_to_sales(rows):
+    """
+    INSERT_FIELDS tuples -> unsaved Sale instances.
+    """
+    return [Sale(**dict(zip(INSERT_COLUMNS, row))) for row in encode_dimensions(rows)]
+
+
+# ------------------------------------------------------
+# Parallel chunked parsing (fast mode)
+# ------------------------------------------------------
+def read_header(csv_path):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f))
+
+
+def split_file(csv_path, chunk_bytes):
+    """
+    Splits the file (after the header line) into (start, end) byte ranges
+    that begin and end on line boundaries. Assumes no quoted newlines
+    inside fields, which holds for the sales exports.
+    """
+    size = os.path.getsize(csv_path)
+    ranges = []
+    with open(csv_path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_chunk(task):
+    """
+    Worker entry point: parses one byte range into value tuples.
+    Runs in a separate process, so it only uses plain Python.
+    """
+    csv_path, header, start, end = task
+    positions = {name: i for i, name in enumerate(header)}
+    plan = [(positions.get(h), parser) for _, h, parser in SALE_COLUMNS]
+
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).decode("utf-8")
+
+    rows = []
+    for record in csv.reader(io.StringIO(data, newline="")):
+        if not record:
+            continue
+        width = len(record)
+        values = tuple(
+            parser(record[i] if i is not None and i < width else None)
+            for i, parser in plan
+        )
+        rows.append(values + (key_digest(values), row_hash(values)))
+    return rows
+
+
+# ------------------------------------------------------
+# Raw loading
+# ------------------------------------------------------
+def _adapt(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def insert_rows(rows):
+    """
+    Loads INSERT_FIELDS tuples with as little per-row overhead as the backend
+    allows: COPY FROM STDIN on Postgres (psycopg 3's copy.write_row(), or a
+    CSV buffer with psycopg2), executemany with raw parameters elsewhere.
+    """
+    table = Sale._meta.db_table
+    columns = ", ".join(connection.ops.quote_name(c) for c in INSERT_COLUMNS)
+    rows = encode_dimensions(rows)
+
+    # the driver's own COPY calls bypass Django's error translation; wrap them so
+    # a failed batch raises django.db.IntegrityError on every backend
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        if connection.vendor == "postgresql" and is_psycopg3:
+            with cursor.cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+        elif connection.vendor == "postgresql":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                tuple("\\N" if v is None else v for v in row) for row in rows
+            )
+            buffer.seek(0)
+            cursor.cursor.copy_expert(
+                f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+            )
+        else:
+            placeholders = ", ".join(["%s"] * len(INSERT_FIELDS))
+            cursor.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                [tuple(_adapt(v) for v in row) for row in rows],
+            )
+    return len(rows)
+
+
+def upsert_rows(rows):
+    """
+    Inserts new rows and updates changed ones, matched on natural_key and
+    compared by row_hash, with INSERT ... ON CONFLICT DO UPDATE (SQLite and
+    Postgres). Unchanged rows are not touched at all.
+    Returns (id, tags) for every row that was actually written.
+    """
+    table = Sale._meta.db_table
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(c) for c in INSERT_COLUMNS)
+    updates = ", ".join(f"{quote(c)} = excluded.{quote(c)}" for c in INSERT_COLUMNS if c != "natural_key")
+    differs = "IS NOT" if connection.vendor == "sqlite" else "IS DISTINCT FROM"
+    placeholders = "(" + ", ".join(["%s"] * len(INSERT_FIELDS)) + ")"
+    per_statement = max(1, (connection.features.max_query_params or 32766) // len(INSERT_FIELDS))
+
+    rows = encode_dimensions(rows)
+    written = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), per_statement):
+            chunk = rows[start:start + per_statement]
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {', '.join([placeholders] * len(chunk))} "
+                f"ON CONFLICT (natural_key) WHERE natural_key IS NOT NULL DO UPDATE SET {updates} "
+                f"WHERE {table}.row_hash {differs} excluded.row_hash "
+                "RETURNING id, tags",
+                [_adapt(v) for row in chunk for v in row],
+            )
+            written.extend(cursor.fetchall())
+    return written
+
+
+def file_fingerprint(csv_path):
+    with open(csv_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def secondary_indexes():
+    """
+    (kind, name, CREATE sql) for every plain secondary index on sales_sale,
+    plus, on sqlite, the triggers that feed the FTS search table.
+    Primary keys, unique indexes and constraint-backed indexes are left alone.
+    """
+    table = Sale._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                """
+                SELECT 'index', i.relname, pg_get_indexdef(i.oid)
+                FROM pg_index x
+                JOIN pg_class i ON i.oid = x.indexrelid
+                JOIN pg_class t ON t.oid = x.indrelid
+                WHERE t.relname = %s AND NOT x.indisprimary AND NOT x.indisunique
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+                """,
+                [table],
+            )
+        else:
+            cursor.execute(
+                "SELECT type, name, sql FROM sqlite_master "
+                "WHERE type IN ('index', 'trigger') AND tbl_name = %s AND sql IS NOT NULL "
+                "AND sql NOT LIKE 'CREATE UNIQUE%%'",
+                [table],
+            )
+        return cursor.fetchall()
+
+
+def drop_indexes(indexes):
+    with connection.cursor() as cursor:
+        for kind, name, _ in indexes:
+            cursor.execute(f"DROP {kind.upper()} IF EXISTS {connection.ops.quote_name(name)}")
+
+
+def create_indexes(indexes):
+    with connection.cursor() as cursor:
+        for _, _, sql in indexes:
+            cursor.execute(sql)
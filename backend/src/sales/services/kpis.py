@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .dataset import get_dataset_version
+from .rollups import summarize
+
+
+def sales_kpis(queryset, params, search_query, signature):
+    """
+    Summary panel for the current search + filters: order count, units,
+    final amount and average discount, from one aggregate query.
+
+    queryset is the searched + filtered (unsorted) queryset the page is
+    built from, or None when the page came from the page cache; the rollups
+    are used instead whenever the filters allow it.
+    Results are cached per (dataset version, filter signature).
+    """
+    key = f"sales:kpis:{get_dataset_version()}:{signature}"
+    kpis = cache.get(key)
+    if kpis is None:
+        summary = summarize(params, search_query, queryset=queryset)
+        kpis = {**summary["totals"], "source": summary["source"]}
+        cache.set(key, kpis, getattr(settings, "SALES_KPI_CACHE_TTL", 600))
+    return kpis
@@ -0,0 +1,63 @@
+"""
+Money as integer minor units.
+
+price_per_unit, total_amount and final_amount are stored in paise
+(hundredths of the currency unit) and discount_percentage in hundredths of
+a percent, all as BigIntegerFields. Sums, sorts and range comparisons are
+integer work in SQL and Python, and no row is turned into a Decimal on the
+way out of the database; values only become text (format_minor) or
+Decimal (minor_to_decimal) where they are presented.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+MINOR_PER_UNIT = 100
+
+# what the BigIntegerField columns hold
+MAX_MINOR = 2**63 - 1
+
+# Sale fields stored in minor units
+MONEY_FIELDS = ["price_per_unit", "discount_percentage", "total_amount", "final_amount"]
+
+
+def parse_minor(val):
+    """
+    "594.84" -> 59484, exactly (no float on the way). More than two decimals
+    round half-up (away from zero, so "-1.005" -> -101); blank, malformed
+    or out-of-range (beyond MAX_MINOR) values give None rather than 0.
+    """
+    if val is None:
+        return None
+    text = val.strip()
+    # fast path for the plain "123.45" / "123" the exports use
+    whole, dot, fraction = text.partition(".")
+    if whole.isdigit() and (not dot or (len(fraction) == 2 and fraction.isdigit())):
+        minor = int(whole) * MINOR_PER_UNIT + (int(fraction) if dot else 0)
+    else:
+        try:
+            amount = Decimal(text)
+        except InvalidOperation:
+            return None
+        if not amount.is_finite():
+            return None
+        minor = int((amount * MINOR_PER_UNIT).to_integral_value(ROUND_HALF_UP))
+    return minor if -MAX_MINOR - 1 <= minor <= MAX_MINOR else None
+
+
+def format_minor(value):
+    """
+    59484 -> "594.84"; None -> "".
+    """
+    if value is None:
+        return ""
+    if value < 0:
+        return "-" + format_minor(-value)
+    return f"{value // MINOR_PER_UNIT}.{value % MINOR_PER_UNIT:02d}"
+
+
+def minor_to_decimal(value):
+    """
+    59484 -> Decimal("594.84"), exactly; None stays None.
+    """
+    if value is None:
+        return None
+    return Decimal(value).scaleb(-2)
@@ -0,0 +1,134 @@
+"""
+In-process LRU of rendered sales_list pages.
+
+Entries are keyed by the canonical filter signature (see filter_signature:
+parameter order, duplicates and comma-vs-repeated encoding don't matter),
+the sort, the page position and the page size, and hold the page's row
+ids plus its count or cursors. A hit costs one primary-key lookup for those
+ids (cached_rows) instead of the search, filter, sort and count queries;
+ids rather than Sale instances keep entries small and never hand one
+request's model objects to another.
+
+The cache is bounded by an approximate byte budget (SALES_PAGE_CACHE_BYTES,
+measured as the pickled entry size) and is emptied whenever the dataset
+version changes, i.e. after every import.
+"""
+import pickle
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from ..models import Sale
+from .dataset import get_dataset_version
+from .dimensions import attach_dimensions
+
+
+class PageCache:
+    """
+    Thread-safe LRU mapping key -> entry with a total size budget in bytes.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            self._entries.clear()
+            self.size = 0
+            self.version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+            found = self._entries.get(key)
+            if found is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return found[0]
+
+    def set(self, key, entry, version):
+        size = len(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            self._check_version(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (entry, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_page_cache = PageCache(getattr(settings, "SALES_PAGE_CACHE_BYTES", 32 * 1024 * 1024))
+
+
+def page_cache_key(signature, sort_by, position, per_page):
+    """
+    position is ("page", n) in offset mode or ("cursor", token) in keyset mode.
+    """
+    return (signature, sort_by, position, per_page)
+
+
+def get_cached_page(key):
+    if _page_cache.max_bytes <= 0:
+        return None
+    return _page_cache.get(key, get_dataset_version())
+
+
+def cache_page(key, entry):
+    if _page_cache.max_bytes <= 0:
+        return False
+    return _page_cache.set(key, entry, get_dataset_version())
+
+
+def page_entry(rows, **fields):
+    """
+    Cache entry for a page: its row ids plus fields such as the count or
+    cursors.
+    """
+    return {"ids": [row.id for row in rows], **fields}
+
+
+def cached_rows(entry):
+    """
+    A cached page's Sale rows in page order, dimensions attached (rows
+    deleted since are skipped).
+    """
+    by_id = Sale.objects.in_bulk(entry["ids"])
+    return attach_dimensions(by_id[i] for i in entry["ids"] if i in by_id)
+
+
+def clear_page_cache():
+    _page_cache.clear()
+
+
+def page_cache_stats():
+    return _page_cache.stats()
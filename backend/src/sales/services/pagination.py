@@ -0,0 +1,203 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+DIRECTION_NEXT = "n"
+DIRECTION_PREV = "p"
+
+
+def encode_cursor(sort_by, direction, values):
+    payload = json.dumps([sort_by, direction, values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort_by):
+    """
+    Returns (direction, values) or None if the cursor is malformed or was
+    issued for a different sort order (the caller then starts at page 1).
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        cursor_sort, direction, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        return None
+    if cursor_sort != sort_by or direction not in (DIRECTION_NEXT, DIRECTION_PREV):
+        return None
+    if not isinstance(values, list):
+        return None
+    return direction, values
+
+
+def _row_values(obj, ordering):
+    values = []
+    for key in ordering:
+        value = getattr(obj, key.lstrip("-"))
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            value = value.isoformat()
+        values.append(value)
+    return values
+
+
+def _clean_values(model, ordering, values):
+    """
+    Cursor values converted to the ordering columns' types, or None if one
+    does not fit (a hand-edited cursor then starts at page 1 like any
+    other malformed one, instead of failing in the query).
+    """
+    cleaned = []
+    for key, value in zip(ordering, values):
+        # _row_values() only writes scalars
+        if value is None or isinstance(value, (list, dict)):
+            return None
+        try:
+            field = model._meta.get_field(key.lstrip("-"))
+        except FieldDoesNotExist:
+            # annotations in sort_keys() (exact_match_priority) are integers
+            if not isinstance(value, int):
+                return None
+            cleaned.append(value)
+            continue
+        try:
+            cleaned.append(field.to_python(value))
+        except (ValidationError, TypeError, ValueError):
+            return None
+    return cleaned
+
+
+def _seek_filter(ordering, values, forward):
+    """
+    Builds the row-value comparison "(k1, k2, ...) after (v1, v2, ...)"
+    as an OR of prefix equalities, which also works for mixed ASC/DESC keys:
+      k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...
+    """
+    condition = Q()
+    equal_prefix = Q()
+    for key, value in zip(ordering, values):
+        name = key.lstrip("-")
+        descending = key.startswith("-")
+        lookup = "lt" if descending == forward else "gt"
+        condition |= equal_prefix & Q(**{f"{name}__{lookup}": value})
+        equal_prefix &= Q(**{name: value})
+    return condition
+
+
+def _reverse(ordering):
+    return tuple(key[1:] if key.startswith("-") else f"-{key}" for key in ordering)
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset. Mirrors the bits of Django's
+    Page that the template uses (object_list, has_next, has_previous).
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_page(queryset, sort_by, ordering, cursor, per_page):
+    """
+    Seeks directly to the page after/before the cursor position using the
+    ordering columns, so page 50,000 costs the same as page 1: no COUNT(*)
+    and no OFFSET. ordering must end with a unique key (see sort_keys).
+    """
+    decoded = decode_cursor(cursor, sort_by)
+    direction, values = decoded if decoded else (DIRECTION_NEXT, None)
+    if values is not None and len(values) != len(ordering):
+        direction, values = DIRECTION_NEXT, None
+    if values is not None:
+        values = _clean_values(queryset.model, ordering, values)
+        if values is None:
+            direction = DIRECTION_NEXT
+
+    forward = direction == DIRECTION_NEXT
+    qs = queryset.order_by(*(ordering if forward else _reverse(ordering)))
+    if values is not None:
+        qs = qs.filter(_seek_filter(ordering, values, forward))
+
+    return build_keyset_page(list(qs[:per_page + 1]), sort_by, ordering, per_page, forward, values is not None)
+
+
+def build_keyset_page(rows, sort_by, ordering, per_page, forward, seeking):
+    """
+    KeysetPage from up to per_page + 1 rows read in seek direction (the
+    extra row only says whether there is more); seeking is whether a
+    cursor position was applied.
+    """
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage(rows)
+
+    first = encode_cursor(sort_by, DIRECTION_PREV, _row_values(rows[0], ordering))
+    last = encode_cursor(sort_by, DIRECTION_NEXT, _row_values(rows[-1], ordering))
+    if forward:
+        return KeysetPage(rows, last if has_more else None, first if seeking else None)
+    return KeysetPage(rows, last, first if has_more else None)
+
+
+def cursor_after(row, sort_by, ordering):
+    """
+    Cursor for the page that starts right after row, e.g. to jump into
+    the middle of a result set without walking the pages before it.
+    """
+    return encode_cursor(sort_by, DIRECTION_NEXT, _row_values(row, ordering))
+
+
+class CountedPaginator(Paginator):
+    """
+    Offset paginator that trusts a precomputed (possibly cached or
+    estimated) count instead of running COUNT(*) itself.
+
+    A capped count (open_ended=True) is only a lower bound: asked for a
+    page at or past it, the paginator looks up to one row past that page
+    and raises the count to what it finds, so pages go on for as long as
+    rows do and the last one reached still links to the next.
+    """
+
+    def __init__(self, object_list, per_page, count, open_ended=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+        self.open_ended = open_ended
+
+    @property
+    def count(self):
+        return self._known_count
+
+    def validate_number(self, number):
+        if self.open_ended:
+            self._extend_to(number)
+        return super().validate_number(number)
+
+    def _extend_to(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return
+        if number < 1 or number * self.per_page < self._known_count:
+            return
+        bottom = (number - 1) * self.per_page
+        found = len(self.object_list[bottom:bottom + self.per_page + 1])
+        if found:
+            self._known_count = max(self._known_count, bottom + found)
+            self.__dict__.pop("num_pages", None)
@@ -0,0 +1,62 @@
+"""
+Postgres deployment helpers.
+
+With SALES_DB_PREPARED, psycopg binds parameters on the server and prepares
+a statement after it has run SALES_DB_PREPARE_THRESHOLD times on a
+connection; pooled connections keep their prepared statements between
+requests. That only pays off when a query shape always produces the same
+SQL text, so in_lookup() turns "field IN (%s, %s, ...)", whose text changes
+with the number of values, into "field = ANY(%s)" with one array parameter.
+database_stats() reports the pool and prepared-statement counters for
+/metrics/.
+"""
+from django.db import connection, connections
+from django.db.models import ForeignKey, IntegerField, Lookup
+
+
+@ForeignKey.register_lookup
+@IntegerField.register_lookup
+class AnyOf(Lookup):
+    """
+    field__any=[1, 2, 3] -> field = ANY(%s), Postgres only.
+    """
+    lookup_name = "any"
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return f"{lhs} = ANY(%s)", [*lhs_params, list(self.rhs)]
+
+
+def in_lookup(field):
+    """
+    "<field>__any" on Postgres, "<field>__in" elsewhere.
+    """
+    return f"{field}__any" if connection.vendor == "postgresql" else f"{field}__in"
+
+
+def prepared_statement_count(alias="default"):
+    """
+    Statements prepared on this thread's connection to alias.
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM pg_prepared_statements")
+        return cursor.fetchone()[0]
+
+
+def database_stats():
+    """
+    Per Postgres alias: psycopg_pool's counters (pool size, idle connections,
+    waiting requests, wait times, errors...) when it is pooled, and the
+    prepared statements on this request's connection. {} on other databases.
+    """
+    stats = {}
+    for alias in connections:
+        wrapper = connections[alias]
+        if wrapper.vendor != "postgresql":
+            continue
+        entry = {"prepared_statements": prepared_statement_count(alias)}
+        if wrapper.settings_dict["OPTIONS"].get("pool"):
+            entry["pool"] = wrapper.pool.get_stats()
+        stats[alias] = entry
+    return stats
@@ -0,0 +1,329 @@
+"""
+Per-request profiling: SQL count and time per phase, slow-query capture
+and in-process latency histograms.
+
+ProfilingMiddleware (sales/middleware.py) opens a RequestProfile for each
+request and wraps every database connection with a query timer; views mark
+their hot path with `with phase("search"): ...`. Queries are attributed to
+the phase that is active when they run, so a lazy queryset built under
+"filters" but evaluated under "paginate" counts as paginate time. Anything
+outside a phase lands in "other". The active phase is a context
+variable, so the worker threads of an async view (which run in copies of
+the request's context) each attribute their own queries; they add the
+profile's query timer to their connections with profile_connections().
+
+With SALES_PROFILING off the middleware is not installed and phase() only
+reads an unset context variable.
+"""
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+OTHER_PHASE = "other"
+SLOW_QUERY_LOG_SIZE = 50
+MAX_EXPLAINS_PER_REQUEST = 3
+
+_current = contextvars.ContextVar("sales_request_profile", default=None)
+_current_phase = contextvars.ContextVar("sales_request_phase", default=OTHER_PHASE)
+
+
+# ------------------------------------------------------
+# One request
+# ------------------------------------------------------
+class RequestProfile:
+    """
+    Wall time, SQL count and SQL time per phase for one request, plus the
+    queries slower than slow_ms.
+    """
+
+    def __init__(self, slow_ms):
+        self.slow_ms = slow_ms
+        self.started = time.perf_counter()
+        self.total_ms = None
+        # name -> [wall ms, sql count, sql ms], in the order phases first ran
+        self.phases = {}
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.slow_queries = []
+        # async views record from several threads at once
+        self._lock = threading.Lock()
+
+    def _phase(self, name):
+        entry = self.phases.get(name)
+        if entry is None:
+            entry = self.phases[name] = [0.0, 0, 0.0]
+        return entry
+
+    def add_query(self, alias, sql, params, many, elapsed_ms):
+        name = _current_phase.get()
+        with self._lock:
+            entry = self._phase(name)
+            entry[1] += 1
+            entry[2] += elapsed_ms
+            self.sql_count += 1
+            self.sql_ms += elapsed_ms
+            if elapsed_ms >= self.slow_ms:
+                self.slow_queries.append({
+                    "alias": alias,
+                    "phase": name,
+                    "ms": round(elapsed_ms, 3),
+                    "sql": sql,
+                    # only for the EXPLAIN in record_request(), which drops them
+                    "params": None if many else params,
+                })
+
+    def add_wall_time(self, name, wall_ms):
+        with self._lock:
+            self._phase(name)[0] += wall_ms
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        if OTHER_PHASE in self.phases:
+            # "other" has no block of its own: it is whatever the named phases don't cover
+            # (concurrent phases of an async view can overlap, hence the floor at 0)
+            named = sum(wall_ms for name, (wall_ms, _, _) in self.phases.items() if name != OTHER_PHASE)
+            self.phases[OTHER_PHASE][0] = max(0.0, self.total_ms - named)
+        return self.total_ms
+
+    def server_timing(self):
+        """
+        Server-Timing header value: one metric per phase (dur = wall time,
+        desc = its SQL), then the SQL and request totals.
+        """
+        parts = [
+            f'{name};desc="{count} sql, {sql_ms:.1f} ms";dur={wall_ms:.2f}'
+            for name, (wall_ms, count, sql_ms) in self.phases.items()
+        ]
+        parts.append(f'sql;desc="{self.sql_count} queries";dur={self.sql_ms:.2f}')
+        parts.append(f"total;dur={self.total_ms:.2f}")
+        return ", ".join(parts)
+
+
+class _QueryTimer:
+    """
+    connection.execute_wrapper callable feeding a RequestProfile.
+    """
+
+    def __init__(self, profile, alias):
+        self.profile = profile
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.profile.add_query(self.alias, sql, params, many, (time.perf_counter() - started) * 1000)
+
+
+@contextlib.contextmanager
+def profile_request():
+    """
+    Profiles everything run inside the block; yields the RequestProfile.
+    """
+    profile = RequestProfile(getattr(settings, "SALES_SLOW_QUERY_MS", 100))
+    token = _current.set(profile)
+    try:
+        with profile_connections():
+            yield profile
+    finally:
+        _current.reset(token)
+        profile.finish()
+
+
+@contextlib.contextmanager
+def profile_connections():
+    """
+    Times this thread's database connections into the current request
+    profile for the duration of the block (connections are per thread);
+    a no-op when nothing is being profiled.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    with contextlib.ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_QueryTimer(profile, connection.alias)))
+        yield
+
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    Attributes the block's wall time and SQL to `name` in the current
+    request profile; a no-op when nothing is being profiled.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    token = _current_phase.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_wall_time(name, (time.perf_counter() - started) * 1000)
+        _current_phase.reset(token)
+
+
+def _redact(plan, params):
+    """
+    Postgres plans quote the bound values ('%asha%'::text); search terms are
+    customer names and phone numbers, so string values are replaced by '?'.
+    """
+    for value in params or ():
+        if isinstance(value, str) and value:
+            plan = plan.replace("'" + value.replace("'", "''") + "'", "'?'")
+    return plan
+
+
+def explain_query(alias, sql, params):
+    """
+    The database's plan for a captured SELECT, or None for other statements.
+    Bound string values are redacted from it.
+    """
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return _redact("\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall()), params)
+    except DatabaseError as exc:
+        return f"EXPLAIN failed: {exc}"
+
+
+# ------------------------------------------------------
+# Process-wide metrics
+# ------------------------------------------------------
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (cumulative counts, Prometheus style).
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms):
+        index = 0
+        while index < len(BUCKETS_MS) and ms > BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-quantile (None past the last bound).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class _ViewMetrics:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.sql_time = LatencyHistogram()
+        self.sql_queries = 0
+        self.phases = {}
+
+    def record(self, profile):
+        self.latency.observe(profile.total_ms)
+        self.sql_time.observe(profile.sql_ms)
+        self.sql_queries += profile.sql_count
+        for name, (wall_ms, _, _) in profile.phases.items():
+            histogram = self.phases.get(name)
+            if histogram is None:
+                histogram = self.phases[name] = LatencyHistogram()
+            histogram.observe(wall_ms)
+
+    def snapshot(self):
+        return {
+            "latency": self.latency.snapshot(),
+            "sql_time": self.sql_time.snapshot(),
+            "sql_queries": self.sql_queries,
+            "phases": {name: histogram.snapshot() for name, histogram in self.phases.items()},
+        }
+
+
+_metrics_lock = threading.Lock()
+_views = {}
+_slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def record_request(view_name, profile):
+    """
+    Adds a finished profile to this process's histograms, EXPLAINs (a few
+    of) its slow queries and logs them. The queries' parameters (search
+    terms) are used for the EXPLAIN only, never logged or kept.
+    """
+    slow = []
+    for query in profile.slow_queries:
+        params = query.pop("params", None)
+        if len(slow) < MAX_EXPLAINS_PER_REQUEST:
+            query["plan"] = explain_query(query["alias"], query["sql"], params)
+        query["view"] = view_name
+        slow.append(query)
+        logger.warning(
+            "slow query (%.1f ms, %s/%s): %s\n%s",
+            query["ms"], view_name, query["phase"], query["sql"], query.get("plan") or "",
+        )
+
+    with _metrics_lock:
+        metrics = _views.get(view_name)
+        if metrics is None:
+            metrics = _views[view_name] = _ViewMetrics()
+        metrics.record(profile)
+        _slow_queries.extend(slow)
+
+
+def metrics_snapshot():
+    with _metrics_lock:
+        return {
+            "buckets_ms": list(BUCKETS_MS),
+            "slow_query_ms": getattr(settings, "SALES_SLOW_QUERY_MS", 100),
+            "views": {name: metrics.snapshot() for name, metrics in _views.items()},
+            "slow_queries": list(_slow_queries),
+        }
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _views.clear()
+        _slow_queries.clear()
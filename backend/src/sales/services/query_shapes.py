@@ -0,0 +1,167 @@
+"""
+Query-shape recorder: which filter/sort combinations sales_list actually runs.
+
+A shape abstracts away the values ("region[1]+date_range|date_desc") so
+requests that would use the same index land on the same counter. Each
+process counts in memory and adds its counts to the QueryShapeCount table
+every SALES_QUERY_SHAPE_FLUSH_EVERY requests; the explain_query_shapes
+command reads them, runs EXPLAIN for each shape and recommends composite
+indexes.
+"""
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import F, Max
+from django.http import QueryDict
+
+from ..models import QueryShapeCount, Sale
+from .facets import get_facet_catalog
+from .filters import DIMENSION_FILTERS, DIMENSION_PARAMS, parse_filters
+from .sorting import DEFAULT_SORT, SORT_FIELDS, sort_keys
+
+logger = logging.getLogger(__name__)
+
+# shape -> requests not yet added to QueryShapeCount, for this process
+_pending = Counter()
+_pending_lock = threading.Lock()
+
+# parse_filters() key -> (query parameter, Sale column)
+SHAPE_FILTERS = {key: (DIMENSION_PARAMS[key], field) for key, field in DIMENSION_FILTERS.items()}
+
+# looked at by explain_query_shapes when nothing has been recorded yet
+DEFAULT_SHAPES = [
+    "all|date_desc",
+    "region[1]|date_desc",
+    "region[n]|date_desc",
+    "category[1]|date_desc",
+    "region[1]+category[1]|date_desc",
+    "gender[1]|date_desc",
+    "payment_method[1]|date_desc",
+    "date_range|date_desc",
+    "region[1]+date_range|date_desc",
+    "all|quantity_desc",
+    "all|name_asc",
+]
+
+
+def query_shape(params, search_query, sort_by):
+    """
+    "<filter parts joined by +>|<sort>", e.g. "q+region[n]+date_range|date_desc".
+    [1] / [n] tell single-value filters (an equality) from IN lists.
+    """
+    filters = parse_filters(params)
+    parts = ["q"] if search_query else []
+    for key, (name, _) in SHAPE_FILTERS.items():
+        if filters[key]:
+            parts.append(f"{name}[{'1' if len(set(filters[key])) == 1 else 'n'}]")
+    if filters["age_min"] is not None or filters["age_max"] is not None:
+        parts.append("age_range")
+    if filters["date_from"] or filters["date_to"]:
+        parts.append("date_range")
+    if filters["tags"]:
+        parts.append(f"tags_{filters['tags_mode']}")
+    if sort_by not in SORT_FIELDS:
+        sort_by = DEFAULT_SORT
+    return f"{'+'.join(parts) or 'all'}|{sort_by}"
+
+
+def record_query_shape(params, search_query, sort_by):
+    """
+    Counts one execution of the request's shape (SALES_RECORD_QUERY_SHAPES,
+    off by default). The count is buffered in process; every
+    SALES_QUERY_SHAPE_FLUSH_EVERY requests the buffer is flushed to the
+    database, so at most that many counts per process are lost on exit.
+    """
+    if not getattr(settings, "SALES_RECORD_QUERY_SHAPES", False):
+        return None
+    shape = query_shape(params, search_query, sort_by)
+    with _pending_lock:
+        _pending[shape] += 1
+        due = _pending.total() >= getattr(settings, "SALES_QUERY_SHAPE_FLUSH_EVERY", 100)
+    if due:
+        flush_shapes()
+    logger.debug("sales_list query shape %s", shape)
+    return shape
+
+
+def flush_shapes():
+    """
+    Adds this process's buffered counts to QueryShapeCount.
+    """
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    for shape, count in pending.items():
+        row, created = QueryShapeCount.objects.get_or_create(shape=shape, defaults={"count": count})
+        if not created:
+            QueryShapeCount.objects.filter(pk=row.pk).update(count=F("count") + count)
+
+
+def recorded_shapes():
+    """
+    [(shape, count)] most frequent first.
+    """
+    flush_shapes()
+    return list(QueryShapeCount.objects.order_by("-count", "shape").values_list("shape", "count"))
+
+
+def reset_shapes():
+    with _pending_lock:
+        _pending.clear()
+    QueryShapeCount.objects.all().delete()
+
+
+# ------------------------------------------------------
+# Turning a shape back into a representative query
+# ------------------------------------------------------
+def _parse_shape(shape):
+    filters, _, sort_by = shape.partition("|")
+    parts = [] if filters in ("", "all") else filters.split("+")
+    return parts, sort_by or DEFAULT_SORT
+
+
+def sample_params(shape, search_query="an"):
+    """
+    Request parameters with real values from the data for a shape, plus
+    the search query it implies ("" when the shape has no q).
+    """
+    parts, sort_by = _parse_shape(shape)
+    catalog = get_facet_catalog()
+    names = {name: facet for facet, (name, _) in SHAPE_FILTERS.items()}
+    params = QueryDict(mutable=True)
+    params["sort"] = sort_by
+    q = ""
+    for part in parts:
+        name, _, arity = part.partition("[")
+        if name == "q":
+            q = search_query
+            params["q"] = q
+        elif name in names:
+            values = catalog[names[name]][: 1 if arity.startswith("1") else 2]
+            params.setlist(name, values)
+        elif name == "age_range":
+            params["age_min"], params["age_max"] = "25", "40"
+        elif name == "date_range":
+            latest = Sale.objects.aggregate(latest=Max("date"))["latest"]
+            if latest is not None:
+                params["date_from"] = latest.replace(day=1).isoformat()
+                params["date_to"] = latest.isoformat()
+        elif name.startswith("tags_"):
+            params.setlist("tags", catalog["tags"][:2])
+            params["tags_mode"] = name[len("tags_"):]
+    return params, q
+
+
+def recommended_index(shape):
+    """
+    Columns of a composite index that serves the shape without a sort:
+    single-value equality columns first, then the ordering columns
+    (exact_match_priority is computed, so it cannot be indexed).
+    """
+    parts, sort_by = _parse_shape(shape)
+    columns = {name: column for name, column in SHAPE_FILTERS.values()}
+    equality = [columns[p.partition("[")[0]] for p in parts if p.endswith("[1]") and p.partition("[")[0] in columns]
+    ordering = [key for key in sort_keys(sort_by) if key != "exact_match_priority"]
+    return equality + ordering
@@ -0,0 +1,280 @@
+"""
+Daily rollups: Sale pre-aggregated per (date, region, category, payment
+method, store) in DailySalesRollup.
+
+The rollup table is rebuilt from scratch with rebuild_rollups() and kept
+current by load_sales_data through additive INSERT ... ON CONFLICT DO
+UPDATE deltas, so an import only touches the groups its rows fall into. summarize() answers totals and
+averages from the rollups whenever the filters only use rollup
+dimensions, from the columnar snapshot (when enabled) for other filters,
+and falls back to aggregating Sale otherwise.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+from ..models import DailySalesRollup, Sale
+from .columnar import columnar_matches
+from .dimensions import DIMENSION_FIELDS, dimension_ids, dimension_labels
+from .filters import DIMENSION_FILTERS, apply_filters, parse_filters
+from .ingest import INSERT_FIELDS, encode_dimensions
+from .money import minor_to_decimal
+from .postgres import in_lookup
+from .search import apply_search
+
+ROLLUP_DIMENSIONS = ["date", "customer_region", "product_category", "payment_method", "store_id"]
+# their columns, the same in sales_sale and the rollup table (region etc. are DimensionValue ids)
+ROLLUP_COLUMNS = [DailySalesRollup._meta.get_field(f).column for f in ROLLUP_DIMENSIONS]
+
+# rollup column -> aggregate over Sale that produces it (sums of NULL-only groups are 0)
+ROLLUP_MEASURES = {
+    "row_count": Count("id"),
+    "quantity_sum": Sum("quantity"),
+    "total_amount_sum": Coalesce(Sum("total_amount"), 0),
+    "final_amount_sum": Coalesce(Sum("final_amount"), 0),
+    "discount_sum": Coalesce(Sum("discount_percentage"), 0),
+    "discount_count": Count("discount_percentage"),
+}
+
+# parse_filters() keys the rollups can answer (their dimension is a rollup column), and that dimension
+ROLLUP_FILTERS = {key: field for key, field in DIMENSION_FILTERS.items() if field in ROLLUP_DIMENSIONS}
+
+_DIMENSION_POSITIONS = [INSERT_FIELDS.index(f) for f in ROLLUP_DIMENSIONS]
+_MEASURE_POSITIONS = [
+    INSERT_FIELDS.index(f) for f in ("quantity", "total_amount", "final_amount", "discount_percentage")
+]
+_NATURAL_KEY = INSERT_FIELDS.index("natural_key")
+_ROW_HASH = INSERT_FIELDS.index("row_hash")
+_CENT = Decimal("0.01")
+
+
+# ------------------------------------------------------
+# Building and maintenance
+# ------------------------------------------------------
+def _grouped(queryset):
+    return (
+        queryset.order_by()
+        .values(*ROLLUP_COLUMNS)
+        .annotate(**ROLLUP_MEASURES)
+    )
+
+
+def rebuild_rollups(batch_size=5000):
+    """
+    Recomputes the whole rollup table with one GROUP BY over Sale.
+    """
+    with transaction.atomic():
+        DailySalesRollup.objects.all().delete()
+        batch = []
+        total = 0
+        for group in _grouped(Sale.objects.all()).iterator(chunk_size=batch_size):
+            batch.append(DailySalesRollup(**group))
+            if len(batch) >= batch_size:
+                total += len(DailySalesRollup.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            total += len(DailySalesRollup.objects.bulk_create(batch))
+    return total
+
+
+def _new_delta():
+    # count, quantity, the three minor-unit sums and the discounted rows: all plain integers
+    return [0, 0, 0, 0, 0, 0]
+
+
+def _add_row(deltas, key, measures, sign):
+    quantity, total_amount, final_amount, discount = measures
+    delta = deltas[key]
+    delta[0] += sign
+    delta[1] += sign * (quantity or 0)
+    delta[2] += sign * (total_amount or 0)
+    delta[3] += sign * (final_amount or 0)
+    delta[4] += sign * (discount or 0)
+    if discount is not None:
+        delta[5] += sign
+
+
+def _upsert_sql(source):
+    """
+    INSERT ... <source> ON CONFLICT (dimensions) DO UPDATE that adds the
+    incoming measures onto an existing group (SQLite and Postgres).
+    """
+    table = DailySalesRollup._meta.db_table
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(c) for c in ROLLUP_COLUMNS + list(ROLLUP_MEASURES))
+    conflict = ", ".join(quote(c) for c in ROLLUP_COLUMNS)
+    updates = ", ".join(f"{quote(f)} = {table}.{quote(f)} + excluded.{quote(f)}" for f in ROLLUP_MEASURES)
+    return f"INSERT INTO {table} ({columns}) {source} ON CONFLICT ({conflict}) DO UPDATE SET {updates}"
+
+
+def add_rollups_after(last_id):
+    """
+    Adds every sale with id > last_id (the rows an append-only load just
+    inserted) onto the rollups: one INSERT ... SELECT ... GROUP BY over a
+    primary-key range, so the existing rows are never rescanned.
+    """
+    quote = connection.ops.quote_name
+    dimensions = ", ".join(quote(c) for c in ROLLUP_COLUMNS)
+    source = (
+        f"SELECT {dimensions}, COUNT(*), SUM(quantity), COALESCE(SUM(total_amount), 0), "
+        f"COALESCE(SUM(final_amount), 0), COALESCE(SUM(discount_percentage), 0), COUNT(discount_percentage) "
+        f"FROM {Sale._meta.db_table} WHERE id > %s GROUP BY {dimensions}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_sql(source), [last_id])
+        return cursor.rowcount
+
+
+def upsert_deltas(rows):
+    """
+    Rollup deltas for an upsert_rows() batch, computed before the batch is
+    written: new rows are added, rows whose row_hash changed have their old
+    values subtracted and new values added, unchanged rows contribute nothing.
+    """
+    rows = encode_dimensions(rows)
+    old = {}
+    keys = [row[_NATURAL_KEY] for row in rows]
+    for start in range(0, len(keys), 500):
+        old.update(
+            (found[0], found[1:])
+            for found in Sale.objects.filter(natural_key__in=keys[start:start + 500]).values_list(
+                "natural_key", "row_hash", *ROLLUP_DIMENSIONS,
+                "quantity", "total_amount", "final_amount", "discount_percentage",
+            )
+        )
+
+    dimensions = len(ROLLUP_DIMENSIONS)
+    deltas = defaultdict(_new_delta)
+    for row in rows:
+        previous = old.get(row[_NATURAL_KEY])
+        if previous is not None:
+            if previous[0] == row[_ROW_HASH]:
+                continue
+            _add_row(deltas, tuple(previous[1:1 + dimensions]), previous[1 + dimensions:], -1)
+        _add_row(
+            deltas,
+            tuple(row[i] for i in _DIMENSION_POSITIONS),
+            [row[i] for i in _MEASURE_POSITIONS],
+            1,
+        )
+    return deltas
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Adds {dimension tuple: [count, quantity, total, final, discount, discounted rows]} deltas
+    onto the rollups and drops groups whose count falls to zero.
+    Call inside the transaction that writes the rows.
+    """
+    rows = [key + tuple(delta) for key, delta in deltas.items() if any(delta)]
+    if not rows:
+        return 0
+    placeholders = ", ".join(["%s"] * (len(ROLLUP_DIMENSIONS) + len(ROLLUP_MEASURES)))
+    with connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(f"VALUES ({placeholders})"), rows)
+
+    # only groups that lost rows can have emptied; the date narrows the lookup to the key index
+    shrunk = sorted({key[0] for key, delta in deltas.items() if delta[0] < 0})
+    for start in range(0, len(shrunk), 500):
+        DailySalesRollup.objects.filter(date__in=shrunk[start:start + 500], row_count=0).delete()
+    return len(rows)
+
+
+# ------------------------------------------------------
+# Query API
+# ------------------------------------------------------
+def rollup_compatible(filters, search_query=""):
+    """
+    True when parse_filters() output only restricts rollup dimensions
+    (region, category, payment method, date range), so the rollups give
+    exactly the same answer as aggregating Sale.
+    """
+    if search_query:
+        return False
+    for key, value in filters.items():
+        if key in ROLLUP_FILTERS or key in ("date_from", "date_to"):
+            continue
+        if value not in (None, []):
+            return False
+    return True
+
+
+def _restrict_rollups(queryset, filters):
+    for key, field in ROLLUP_FILTERS.items():
+        if filters[key]:
+            ids = dimension_ids(field, filters[key])
+            if not ids:
+                return queryset.none()
+            queryset = queryset.filter(**{in_lookup(field): sorted(ids.values())})
+    if filters["date_from"]:
+        queryset = queryset.filter(date__gte=filters["date_from"])
+    if filters["date_to"]:
+        queryset = queryset.filter(date__lte=filters["date_to"])
+    return queryset
+
+
+def _average(minor_sum, count):
+    return (minor_to_decimal(minor_sum or 0) / count).quantize(_CENT) if count else None
+
+
+def _summary(row):
+    """
+    Aggregated minor-unit sums -> Decimal totals and averages; the only
+    place money leaves integer arithmetic.
+    """
+    count = row["agg_row_count"] or 0
+    total_amount = minor_to_decimal(row["agg_total_amount_sum"] or 0)
+    final_amount = minor_to_decimal(row["agg_final_amount_sum"] or 0)
+    return {
+        "count": count,
+        "quantity": row["agg_quantity_sum"] or 0,
+        "total_amount": total_amount,
+        "final_amount": final_amount,
+        "discount": total_amount - final_amount,
+        # missing discounts are left out of the average, as Avg("discount_percentage") does
+        "avg_discount_percentage": _average(row["agg_discount_sum"], row["agg_discount_count"] or 0),
+        "avg_order_value": _average(row["agg_final_amount_sum"], count),
+    }
+
+
+def summarize(params, search_query="", group_by=None, queryset=None):
+    """
+    Totals, averages and counts for the sales matching request params:
+    {"source": "rollup" | "columnar" | "sales", "totals": {...}, "groups": [...]}.
+
+    group_by is an optional ROLLUP_DIMENSIONS entry; each group carries the
+    same measures as totals plus the dimension value under its own name.
+    queryset, when given, is the already searched + filtered Sale queryset
+    for these params and is reused instead of being built again.
+    """
+    if group_by is not None and group_by not in ROLLUP_DIMENSIONS:
+        raise ValueError(f"Cannot group by {group_by!r}; choose one of {ROLLUP_DIMENSIONS}")
+
+    filters = parse_filters(params)
+    if rollup_compatible(filters, search_query):
+        source = "rollup"
+        queryset = _restrict_rollups(DailySalesRollup.objects.all(), filters)
+        measures = {f"agg_{field}": Sum(field) for field in ROLLUP_MEASURES}
+    else:
+        matches = columnar_matches(params, search_query) if group_by is None else None
+        if matches is not None:
+            return {"source": "columnar", "totals": _summary(matches.snapshot.totals(matches)), "groups": []}
+        source = "sales"
+        if queryset is None:
+            queryset = apply_filters(apply_search(Sale.objects.all(), search_query), params)
+        queryset = queryset.order_by()
+        measures = {f"agg_{field}": aggregate for field, aggregate in ROLLUP_MEASURES.items()}
+
+    result = {"source": source, "totals": _summary(queryset.aggregate(**measures)), "groups": []}
+    if group_by:
+        rows = queryset.order_by().values(group_by).annotate(**measures).order_by(group_by)
+        result["groups"] = [{group_by: row[group_by], **_summary(row)} for row in rows]
+        if group_by in DIMENSION_FIELDS:
+            labels = dimension_labels(group[group_by] for group in result["groups"])
+            for group in result["groups"]:
+                group[group_by] = labels.get(group[group_by])
+            result["groups"].sort(key=lambda group: group[group_by] or "")
+    return result
@@ -1,10 +1,13 @@
-from django.db.models import Q
+from .search_backends import get_search_backend
 
 
 def apply_search(queryset, query: str):
     """
-    Full-text search on customer name and phone number.
+    Search on customer name and phone number.
     Case-insensitive and safe to call with empty query.
+    Matching runs through the configured index-backed backend
+    (see search_backends): substring matching, plus digits-only phone
+    matching for queries with 3+ digits.
     """
     if not query:
         return queryset
@@ -13,7 +16,4 @@ def apply_search(queryset, query: str):
     if not query:
         return queryset
 
-    return queryset.filter(
-        Q(customer_name__icontains=query)
-        | Q(phone_number__icontains=query)
-    )
+    return get_search_backend().apply(queryset, query)
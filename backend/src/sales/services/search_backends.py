@@ -0,0 +1,179 @@
+"""
+Index-backed search backends for customer name / phone lookups.
+
+- sqlite:   FTS5 table `sales_sale_fts` (trigram tokenizer), kept in sync
+            with sales_sale by triggers (see migration 0003)
+- postgres: pg_trgm GIN indexes on UPPER(customer_name), UPPER(phone_number)
+            and the digits-only phone number (see migration 0003)
+- icontains: plain ORM fallback
+
+Every backend matches the same rows:
+  - substring match on name / phone, case-insensitive; 1-2 character
+    queries are too short for trigrams and scan instead
+  - digits-only phone match whenever the query has 3+ digits
+    ("98765 43210" and "9876543210" both find "+91-98765-43210")
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Func, Q, Value
+from django.db.models.functions import Replace
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "sales_sale_fts"
+MIN_TRIGRAM_LENGTH = 3
+
+# SQLite has no regexp_replace; strip the separators phone numbers actually use
+PHONE_SEPARATORS = (" ", "-", "+", "(", ")", ".")
+SQLITE_DIGITS_SQL = (
+    "replace(replace(replace(replace(replace(replace("
+    "{col}, ' ', ''), '-', ''), '+', ''), '(', ''), ')', ''), '.', '')"
+)
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def phone_digits(value):
+    return _NON_DIGITS.sub("", value or "")
+
+
+def _substring(query):
+    return Q(customer_name__icontains=query) | Q(phone_number__icontains=query)
+
+
+def _stripped_phone():
+    """
+    phone_number without PHONE_SEPARATORS, in portable SQL (what the FTS
+    table's phone_digits column holds).
+    """
+    expression = F("phone_number")
+    for separator in PHONE_SEPARATORS:
+        expression = Replace(expression, Value(separator), Value(""))
+    return expression
+
+
+class IcontainsSearchBackend:
+    name = "icontains"
+
+    def apply(self, queryset, query):
+        q = _substring(query)
+        digits = phone_digits(query)
+        if len(digits) >= MIN_TRIGRAM_LENGTH:
+            queryset = queryset.alias(phone_digits=_stripped_phone())
+            q |= Q(phone_digits__contains=digits)
+        return queryset.filter(q)
+
+
+class SqliteFtsSearchBackend:
+    name = "sqlite_fts"
+
+    @staticmethod
+    def _phrase(text):
+        return '"' + text.replace('"', '""') + '"'
+
+    def apply(self, queryset, query):
+        if len(query) < MIN_TRIGRAM_LENGTH:
+            # no trigram to look up
+            return queryset.filter(_substring(query))
+
+        expression = "{customer_name phone_number} : " + self._phrase(query)
+        digits = phone_digits(query)
+        if len(digits) >= MIN_TRIGRAM_LENGTH:
+            expression += " OR phone_digits : " + self._phrase(digits)
+
+        matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (expression,))
+        return queryset.filter(id__in=matches)
+
+
+class PhoneDigits(Func):
+    """
+    regexp_replace(phone, '\\D', '', 'g') with the pattern written into the
+    SQL: sales_sale_phone_digits_trgm indexes exactly this expression, and
+    with server-side binding (SALES_DB_PREPARED) patterns passed as Value()
+    would become $2, $3, $4, which the planner cannot match to the index.
+    """
+    function = "regexp_replace"
+    template = r"%(function)s(%(expressions)s, '\D', '', 'g')"
+    arity = 1
+
+
+class PostgresTrigramSearchBackend(IcontainsSearchBackend):
+    """
+    icontains compiles to UPPER(col::text) LIKE UPPER(%s), which the
+    pg_trgm GIN indexes on the same expressions serve directly.
+    """
+    name = "pg_trgm"
+
+    def apply(self, queryset, query):
+        q = _substring(query)
+        digits = phone_digits(query)
+        if len(digits) >= MIN_TRIGRAM_LENGTH:
+            queryset = queryset.alias(phone_digits=PhoneDigits("phone_number"))
+            q |= Q(phone_digits__contains=digits)
+        return queryset.filter(q)
+
+
+def _sqlite_fts_available():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+_backend_cache = {}
+
+
+def get_search_backend():
+    """
+    Picks the backend from SALES_SEARCH_BACKEND ("auto", "sqlite_fts",
+    "pg_trgm" or "icontains"). "auto" follows the database vendor.
+    """
+    choice = getattr(settings, "SALES_SEARCH_BACKEND", "auto")
+    cache_key = (choice, connection.vendor, connection.settings_dict.get("NAME"))
+    if cache_key in _backend_cache:
+        return _backend_cache[cache_key]
+
+    if choice == "auto":
+        if connection.vendor == "sqlite" and _sqlite_fts_available():
+            choice = SqliteFtsSearchBackend.name
+        elif connection.vendor == "postgresql":
+            choice = PostgresTrigramSearchBackend.name
+        else:
+            choice = IcontainsSearchBackend.name
+
+    backend = {
+        SqliteFtsSearchBackend.name: SqliteFtsSearchBackend,
+        PostgresTrigramSearchBackend.name: PostgresTrigramSearchBackend,
+    }.get(choice, IcontainsSearchBackend)()
+    _backend_cache[cache_key] = backend
+    return backend
+
+
+def index_search_after(last_id):
+    """
+    Adds FTS rows for every sale with id > last_id in one INSERT ... SELECT.
+    Used by bulk loads that suspend the sync triggers. No-op on other
+    backends, whose indexes are native.
+    """
+    if connection.vendor != "sqlite" or not _sqlite_fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid > %s", [last_id])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, customer_name, phone_number, phone_digits) "
+            f"SELECT id, customer_name, phone_number, {SQLITE_DIGITS_SQL.format(col='phone_number')} "
+            "FROM sales_sale WHERE id > %s",
+            [last_id],
+        )
+
+
+def rebuild_search_index():
+    """
+    Refills the sqlite FTS table from sales_sale (the triggers keep it in
+    sync afterwards).
+    """
+    if connection.vendor != "sqlite" or not _sqlite_fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    index_search_after(0)
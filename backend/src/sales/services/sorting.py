@@ -1,11 +1,33 @@
 from django.db.models import Case, When, Value, IntegerField
 
+DEFAULT_SORT = "date_desc"
+
+# sort option -> primary ordering column
+SORT_FIELDS = {
+    "date_desc": "-date",
+    "name_asc": "customer_name",
+    "quantity_desc": "-quantity",
+}
+
+
+def sort_keys(sort_by, search_query=None):
+    """
+    Full ordering tuple for a sort option. Ends with "id" so the order is
+    total, which keyset pagination relies on. exact_match_priority only
+    matters (and is only included) when a search query is active.
+    """
+    primary = SORT_FIELDS.get(sort_by, SORT_FIELDS[DEFAULT_SORT])
+    if search_query:
+        return ("exact_match_priority", primary, "id")
+    return (primary, "id")
+
 
 def apply_sorting(qs, sort_by, search_query=None):
     """
     Apply sorting with priority:
       1. Exact match first (customer_name == search_query)
       2. Then normal sorting rules
+      3. Then id, as a stable tie-breaker
     """
 
     # Add priority so that exact matches appear first
@@ -23,16 +45,5 @@ def apply_sorting(qs, sort_by, search_query=None):
             exact_match_priority=Value(1),
         )
 
-    # Apply normal sorting but always prioritize exact matches first
-    if sort_by == "date_desc":
-        return qs.order_by("exact_match_priority", "-date")
-
-    elif sort_by == "name_asc":
-        return qs.order_by("exact_match_priority", "customer_name")
-
-    elif sort_by == "quantity_desc":
-        return qs.order_by("exact_match_priority", "-quantity")
-
-    else:
-        # Default fallback
-        return qs.order_by("exact_match_priority", "-date")
+    # Unknown options fall back to date_desc (see sort_keys)
+    return qs.order_by(*sort_keys(sort_by, search_query))
@@ -0,0 +1,100 @@
+"""
+SQLite storage profile.
+
+configure_connection() runs on every new SQLite connection (apps.py hooks
+it to connection_created): WAL journaling, so readers keep reading the last
+committed state while an import writes; a memory-mapped file and a larger
+page cache, so hot pages are served without a read() per page; and sorts /
+temp b-trees in memory. bulk_load() relaxes synchronous to NORMAL while an
+import runs (a crash can lose the last commits, never corrupt the file),
+and optimize_database() refreshes the planner statistics afterwards.
+Other database vendors are left untouched.
+"""
+import contextlib
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def is_read_only(connection):
+    """
+    True for the "readonly" alias core/settings.py opens with ?mode=ro.
+    """
+    return "mode=ro" in str(connection.settings_dict.get("NAME", ""))
+
+
+def connection_pragmas(read_only=False):
+    """
+    The PRAGMAs applied to a new connection (empty with SALES_SQLITE_TUNING off).
+    """
+    if not getattr(settings, "SALES_SQLITE_TUNING", True):
+        return []
+    pragmas = [
+        f"PRAGMA mmap_size = {getattr(settings, 'SALES_SQLITE_MMAP_MB', 256) * 1024 * 1024}",
+        # negative: KiB rather than pages
+        f"PRAGMA cache_size = -{getattr(settings, 'SALES_SQLITE_CACHE_MB', 64) * 1024}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if not read_only:
+        # persistent in the file; a no-op once the database is in WAL mode
+        pragmas.insert(0, "PRAGMA journal_mode = WAL")
+    return pragmas
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    connection_created receiver. Runs on the raw DB-API connection, so the
+    PRAGMAs are not counted as queries of the request that opened it.
+    """
+    if connection.vendor != "sqlite":
+        return
+    raw = connection.connection
+    for pragma in connection_pragmas(read_only=is_read_only(connection)):
+        try:
+            raw.execute(pragma).fetchall()
+        except connection.Database.OperationalError as exc:
+            # switching to WAL needs a moment without other writers; the next connection retries
+            logger.warning("%s failed: %s", pragma, exc)
+
+
+@contextlib.contextmanager
+def bulk_load():
+    """
+    synchronous=NORMAL for the duration of an import: commits stop waiting
+    for an fsync of the WAL, checkpoints still sync. Restores the previous
+    level afterwards.
+    """
+    if connection.vendor != "sqlite" or not getattr(settings, "SALES_SQLITE_TUNING", True):
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        previous = cursor.fetchone()[0]
+        cursor.execute("PRAGMA synchronous = NORMAL")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA synchronous = {int(previous)}")
+
+
+def optimize_database(full=False):
+    """
+    Refreshes the planner statistics: ANALYZE (full=True, after an import
+    reshaped the data) or PRAGMA optimize (cheap, re-analyzes only tables
+    whose statistics have drifted), then folds the WAL back into the
+    database file. Returns the statements run.
+    """
+    if connection.vendor == "postgresql":
+        statements = ["ANALYZE"]
+    elif connection.vendor == "sqlite":
+        statements = ["ANALYZE" if full else "PRAGMA optimize", "PRAGMA wal_checkpoint(TRUNCATE)"]
+    else:
+        return []
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    return statements
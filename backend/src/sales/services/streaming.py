@@ -0,0 +1,243 @@
+"""
+Streaming download -> parse -> write pipeline for load_sales_data --url.
+
+    fetch thread  --(bytes, bounded queue)-->  parse thread  --(row batches, bounded queue)-->  caller
+
+The caller (the management command) does the DB writes on its own thread,
+so the network, CSV parsing and inserts overlap, and memory stays bounded
+by the two queue sizes no matter how large the export is. Plain, gzip and
+(single-member) zip payloads are recognised by their magic bytes.
+"""
+import csv
+import io
+import queue
+import struct
+import threading
+import zlib
+
+import requests
+
+from .ingest import NaturalKeys, row_to_values
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZIP_MAGIC = b"PK\x03\x04"
+
+_DONE = object()
+
+
+class DownloadError(Exception):
+    pass
+
+
+def _gunzip(chunks):
+    # 16 + MAX_WBITS: expect a gzip header; loop for multi-member files
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        while chunk:
+            yield decompressor.decompress(chunk)
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                chunk = b""
+    yield decompressor.flush()
+
+
+def _prepend(first, rest):
+    if first:
+        yield first
+    yield from rest
+
+
+def _unzip_first_member(chunks):
+    """
+    Streams the first member of a zip archive from its local file header,
+    without the central directory (which sits at the end of the file).
+    """
+    buffer = b""
+    chunks = iter(chunks)
+    while len(buffer) < 30:
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise DownloadError("Truncated zip download")
+        buffer += chunk
+    (_, _, flags, method, _, _, _, compressed_size, _, name_len, extra_len) = struct.unpack(
+        "<IHHHHHIIIHH", buffer[:30]
+    )
+    header_len = 30 + name_len + extra_len
+    while len(buffer) < header_len:
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise DownloadError("Truncated zip download")
+        buffer += chunk
+    data = _prepend(buffer[header_len:], chunks)
+
+    if method == 0 and not flags & 0x08:
+        # stored: size is in the header
+        remaining = compressed_size
+        for chunk in data:
+            yield chunk[:remaining]
+            remaining -= len(chunk)
+            if remaining <= 0:
+                return
+        return
+    if method != 8:
+        raise DownloadError(f"Unsupported zip member (compression method {method})")
+
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    for chunk in data:
+        yield decompressor.decompress(chunk)
+        if decompressor.eof:
+            return
+    yield decompressor.flush()
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    File-like view over an iterator of byte chunks, so the standard
+    TextIOWrapper / csv machinery can consume a download as it arrives.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = chunk
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def open_text(chunks):
+    """
+    Raw response chunks -> text stream for csv.reader, transparently
+    decompressing gzip / zip payloads (detected by their magic bytes).
+    """
+    chunks = iter(chunks)
+    first = b""
+    for first in chunks:
+        if first:
+            break
+    payload = _prepend(first, chunks)
+
+    if first.startswith(GZIP_MAGIC):
+        payload = _gunzip(payload)
+    elif first.startswith(ZIP_MAGIC):
+        payload = _unzip_first_member(payload)
+    else:
+        head = first.lstrip()[:15].lower()
+        if head.startswith(b"<!doctype html") or head.startswith(b"<html"):
+            raise DownloadError(
+                "ERROR: The downloaded content is HTML, not CSV. The link is NOT a direct CSV download URL."
+            )
+
+    raw = io.BufferedReader(_ChunkReader(payload), buffer_size=256 * 1024)
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+
+
+class CsvStream:
+    """
+    Opens the URL (headers only) and, when iterated, runs the fetch and
+    parse threads and yields batches of ingest rows (NaturalKeys applied).
+    """
+
+    def __init__(self, url, batch_size=2000, queue_size=8, chunk_size=256 * 1024, timeout=60):
+        self.url = url
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.response = requests.get(url, allow_redirects=True, timeout=timeout, stream=True)
+        if self.response.status_code != 200:
+            self.response.close()
+            raise DownloadError(f"Download failed. Status code: {self.response.status_code}")
+        self._raw = queue.Queue(maxsize=queue_size)
+        self._batches = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+
+    @property
+    def fingerprint(self):
+        """
+        Identifies this version of the remote file from its validators,
+        or None when the server sends none (then runs cannot be resumed).
+        """
+        headers = self.response.headers
+        validator = headers.get("ETag") or headers.get("Last-Modified")
+        if not validator:
+            return None
+        return f"{validator}|{headers.get('Content-Length', '')}"[:64]
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch(self):
+        try:
+            for chunk in self.response.iter_content(chunk_size=self.chunk_size):
+                if not self._put(self._raw, chunk):
+                    return
+            self._put(self._raw, _DONE)
+        except Exception as exc:
+            self._put(self._raw, exc)
+        finally:
+            self.response.close()
+
+    def _chunks(self):
+        while not self._stop.is_set():
+            try:
+                item = self._raw.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _parse(self):
+        try:
+            keys = NaturalKeys()
+            batch = []
+            for row in csv.DictReader(open_text(self._chunks())):
+                batch.append(keys.finish(row_to_values(row)))
+                if len(batch) >= self.batch_size:
+                    if not self._put(self._batches, batch):
+                        return
+                    batch = []
+            if batch:
+                self._put(self._batches, batch)
+            self._put(self._batches, _DONE)
+        except Exception as exc:
+            self._put(self._batches, exc)
+
+    def __iter__(self):
+        threads = [
+            threading.Thread(target=self._fetch, name="sales-fetch", daemon=True),
+            threading.Thread(target=self._parse, name="sales-parse", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self._batches.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
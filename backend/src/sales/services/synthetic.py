@@ -0,0 +1,208 @@
+"""
+Synthetic sales data in the import CSV format, for benchmarks.
+
+Values follow the shapes of the real export rather than uniform noise:
+skewed region and category mixes, repeat customers, Zipf-like product and
+tag popularity (each category has its own tag vocabulary plus a few shared
+tags), seasonal dates and long-tailed prices. Output is deterministic for
+a given seed.
+"""
+import csv
+import datetime
+import itertools
+import random
+
+from .ingest import SALE_COLUMNS
+
+HEADERS = ["Transaction ID"] + [header for _, header, _ in SALE_COLUMNS]
+
+REGIONS = {"North": 28, "South": 24, "West": 20, "East": 16, "Central": 12}
+CATEGORIES = {"Electronics": 38, "Clothing": 34, "Beauty": 28}
+BRANDS = {
+    "Electronics": ["VoltEdge", "Nexora", "Pixelon", "AudioNest", "Circuitry"],
+    "Clothing": ["UrbanWeave", "ThreadCo", "Looma", "Cottonique", "StreetLane"],
+    "Beauty": ["GlowLab", "PureBloom", "Lumiere", "Auraveda", "Velvetine"],
+}
+CATEGORY_TAGS = {
+    "Electronics": ["wireless", "smart", "portable", "gadgets", "bluetooth", "gaming", "fast-charging", "4k"],
+    "Clothing": ["fashion", "casual", "cotton", "formal", "unisex", "winter", "streetwear", "summer"],
+    "Beauty": ["skincare", "organic", "makeup", "fragrance-free", "vegan", "haircare", "herbal", "spf"],
+}
+SHARED_TAGS = ["premium", "bestseller", "eco", "limited-edition", "gift"]
+TAG_COUNTS = {1: 35, 2: 40, 3: 20, 4: 5}
+
+GENDERS = {"Female": 51, "Male": 47, "Other": 2}
+CUSTOMER_TYPES = {"New": 30, "Returning": 45, "Loyal": 25}
+PAYMENT_METHODS = {"UPI": 30, "Credit Card": 22, "Debit Card": 18, "Cash": 12, "Wallet": 10, "Net Banking": 8}
+ORDER_STATUSES = {"Completed": 80, "Pending": 8, "Cancelled": 6, "Returned": 6}
+DELIVERY_TYPES = {"Standard": 60, "Express": 25, "Store Pickup": 15}
+DISCOUNTS = {0: 40, 5: 15, 10: 18, 15: 10, 20: 10, 25: 4, 30: 3}
+QUANTITIES = {q: 12 - q for q in range(1, 11)}
+# median unit price per category; prices are log-normal around it
+PRICE_MEDIANS = {"Electronics": 2500.0, "Clothing": 900.0, "Beauty": 450.0}
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Arjun", "Sai", "Reyansh", "Ishaan", "Kabir", "Rohan", "Karan",
+    "Ananya", "Diya", "Aadhya", "Saanvi", "Priya", "Neha", "Kavya", "Isha", "Meera", "Riya",
+    "Rahul", "Amit", "Vikram", "Sanjay", "Pooja", "Sneha", "Anjali", "Nisha", "Deepak", "Manish",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Gupta", "Singh", "Kumar", "Patel", "Shah", "Mehta", "Reddy", "Nair",
+    "Iyer", "Rao", "Das", "Khan", "Joshi", "Chopra", "Malhotra", "Bose", "Sen", "Pillai",
+]
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Hyderabad", "Chennai", "Kolkata", "Pune", "Ahmedabad", "Jaipur", "Lucknow"]
+
+START_DATE = datetime.date(2021, 1, 1)
+END_DATE = datetime.date(2023, 12, 31)
+
+
+def _weighted(options):
+    """
+    {value: weight} -> (values, cumulative weights) for random.choices.
+    """
+    values = list(options)
+    return values, list(itertools.accumulate(options.values()))
+
+
+def _zipf(values, exponent=1.0):
+    return values, list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(len(values))))
+
+
+def _date_weights():
+    days = []
+    weights = []
+    day = START_DATE
+    while day <= END_DATE:
+        weight = 1.0
+        if day.weekday() >= 5:
+            weight *= 1.4  # weekends
+        if day.month in (10, 11):
+            weight *= 1.6  # festive season
+        elif day.month == 12:
+            weight *= 1.3
+        days.append(day.isoformat())
+        weights.append(weight)
+        day += datetime.timedelta(days=1)
+    return days, list(itertools.accumulate(weights))
+
+
+class SalesGenerator:
+    """
+    Iterates synthetic CSV rows (lists in HEADERS order).
+    """
+
+    def __init__(self, rows, seed=42):
+        self.rows = rows
+        self.rng = random.Random(seed)
+        rng = self.rng
+
+        self.regions = _weighted(REGIONS)
+        self.categories = _weighted(CATEGORIES)
+        self.payment_methods = _weighted(PAYMENT_METHODS)
+        self.order_statuses = _weighted(ORDER_STATUSES)
+        self.delivery_types = _weighted(DELIVERY_TYPES)
+        self.discounts = _weighted(DISCOUNTS)
+        self.quantities = _weighted(QUANTITIES)
+        self.tag_counts = _weighted(TAG_COUNTS)
+        self.dates = _date_weights()
+
+        # repeat customers: about one customer per five sales, attributes fixed per customer
+        genders = _weighted(GENDERS)
+        types = _weighted(CUSTOMER_TYPES)
+        self.customers = [
+            (
+                f"CUST-{i:07d}",
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                f"+91 {rng.randint(6000000000, 9999999999)}",
+                rng.choices(genders[0], cum_weights=genders[1])[0],
+                str(min(75, max(18, int(rng.gauss(36, 11))))),
+                rng.choices(self.regions[0], cum_weights=self.regions[1])[0],
+                rng.choices(types[0], cum_weights=types[1])[0],
+            )
+            for i in range(min(max(rows // 5, 100), 500000))
+        ]
+        self.customer_popularity = _zipf(list(range(len(self.customers))), 0.6)
+
+        # products: Zipf popularity inside each category
+        self.products = {}
+        for category_index, category in enumerate(CATEGORIES):
+            catalog = [
+                (
+                    f"PROD-{category_index + 1}{i:04d}",
+                    f"{category} Item {i + 1}",
+                    rng.choice(BRANDS[category]),
+                    PRICE_MEDIANS[category] * rng.lognormvariate(0, 0.6),
+                )
+                for i in range(400)
+            ]
+            self.products[category] = _zipf(catalog, 0.9)
+        self.tags = {category: _zipf(tags + SHARED_TAGS, 0.8) for category, tags in CATEGORY_TAGS.items()}
+
+        # stores belong to a city; salespeople to a store
+        self.stores = [(f"ST-{i + 1:03d}", CITIES[i % len(CITIES)]) for i in range(60)]
+        self.salespeople = [
+            (f"EMP-{i + 1:04d}", f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}")
+            for i in range(240)
+        ]
+
+    def _pick(self, weighted):
+        return self.rng.choices(weighted[0], cum_weights=weighted[1])[0]
+
+    def _tags(self, category):
+        values, weights = self.tags[category]
+        wanted = self._pick(self.tag_counts)
+        chosen = []
+        while len(chosen) < wanted:
+            tag = self.rng.choices(values, cum_weights=weights)[0]
+            if tag not in chosen:
+                chosen.append(tag)
+        return ",".join(chosen)
+
+    def __iter__(self):
+        rng = self.rng
+        for transaction in range(1, self.rows + 1):
+            customer = self.customers[self._pick(self.customer_popularity)]
+            category = self._pick(self.categories)
+            product_id, product_name, brand, price = self._pick(self.products[category])
+            price = round(price * rng.uniform(0.95, 1.05), 2)
+            quantity = self._pick(self.quantities)
+            discount = self._pick(self.discounts)
+            total = round(price * quantity, 2)
+            final = round(total * (100 - discount) / 100, 2)
+            store_index = rng.randrange(len(self.stores))
+            store_id, store_location = self.stores[store_index]
+            salesperson_id, employee_name = self.salespeople[store_index * 4 + rng.randrange(4)]
+
+            yield [
+                transaction,
+                *customer,
+                product_id,
+                product_name,
+                brand,
+                category,
+                self._tags(category),
+                quantity,
+                f"{price:.2f}",
+                discount,
+                f"{total:.2f}",
+                f"{final:.2f}",
+                self._pick(self.dates),
+                self._pick(self.payment_methods),
+                self._pick(self.order_statuses),
+                self._pick(self.delivery_types),
+                store_id,
+                store_location,
+                salesperson_id,
+                employee_name,
+            ]
+
+
+def write_csv(path, rows, seed=42):
+    """
+    Writes `rows` synthetic sales to path in the import format.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        writer.writerows(SalesGenerator(rows, seed))
+    return rows
@@ -0,0 +1,139 @@
+from django.db import connection, transaction
+from django.db.models import Count
+
+from ..models import Sale, SaleTag, Tag
+from .postgres import in_lookup
+
+TAG_MODE_ANY = "any"
+TAG_MODE_ALL = "all"
+
+
+def normalize_tag(label):
+    """
+    Tags are case-insensitive: Tag.name and every lookup use this form.
+    """
+    return label.strip().lower()
+
+
+def split_tags(tag_string):
+    """
+    "eco, Organic,,ECO" -> ["eco", "organic"] (normalized, order kept,
+    duplicates dropped).
+    """
+    if not tag_string:
+        return []
+    result = []
+    for part in tag_string.split(","):
+        label = normalize_tag(part)
+        if label and label not in result:
+            result.append(label)
+    return result
+
+
+def _tag_ids_for(names, create=False):
+    """
+    Maps (normalized) tag names to Tag ids. With create=True unknown names
+    are inserted.
+    """
+    names = {normalize_tag(name) for name in names}
+    if not names:
+        return {}
+    ids = dict(Tag.objects.filter(name__in=names).values_list("name", "id"))
+    missing = names - ids.keys()
+    if create and missing:
+        Tag.objects.bulk_create([Tag(name=n) for n in missing], ignore_conflicts=True)
+        ids.update(Tag.objects.filter(name__in=missing).values_list("name", "id"))
+    return ids
+
+
+def index_sale_tags(rows):
+    """
+    Adds posting-list entries for (sale_id, tags_string) pairs.
+    Used by load_sales_data right after each bulk insert.
+    """
+    rows = [(sale_id, split_tags(tag_string)) for sale_id, tag_string in rows]
+    ids = _tag_ids_for({t for _, names in rows for t in names}, create=True)
+    links = [(ids[name], sale_id) for sale_id, names in rows for name in names]
+    if links:
+        # raw executemany: posting rows are too small to be worth model instances
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SaleTag._meta.db_table} (tag_id, sale_id) VALUES (%s, %s) "
+                "ON CONFLICT DO NOTHING",
+                links,
+            )
+    return len(links)
+
+
+def reindex_sale_tags(rows):
+    """
+    Replaces the postings of already-indexed sales, e.g. rows an
+    incremental import has just updated. rows are (sale_id, tags_string).
+    """
+    rows = list(rows)
+    ids = [sale_id for sale_id, _ in rows]
+    for start in range(0, len(ids), 500):
+        SaleTag.objects.filter(sale_id__in=ids[start:start + 500]).delete()
+    return index_sale_tags(rows)
+
+
+def index_tags_after(last_id, chunk_size=20000):
+    """
+    Indexes tags for every sale with id > last_id. Used after raw bulk
+    loads, where the new ids are not known up front.
+    """
+    total = 0
+    while True:
+        chunk = list(
+            Sale.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "tags")[:chunk_size]
+        )
+        if not chunk:
+            break
+        total += index_sale_tags(chunk)
+        last_id = chunk[-1][0]
+    return total
+
+
+def rebuild_tag_index():
+    """
+    Recreates the whole tag index from Sale.tags.
+    """
+    SaleTag.objects.all().delete()
+    total = index_tags_after(0)
+    Tag.objects.filter(sale_links__isnull=True).delete()
+    return total
+
+
+def filter_by_tags(queryset, tag_values, mode=TAG_MODE_ANY):
+    """
+    Restricts queryset to sales carrying the given tags, as a semi-join
+    against the (tag, sale) index:
+      - "any": at least one of the tags
+      - "all": every one of the tags
+    Tags are matched whole and case-insensitively, so "vip" matches "VIP"
+    but "eco" does not match "ecommerce".
+    """
+    if not tag_values:
+        return queryset
+
+    ids = _tag_ids_for(tag_values)
+    wanted = {normalize_tag(value) for value in tag_values}
+
+    if mode == TAG_MODE_ALL:
+        if len(ids) < len(wanted):
+            return queryset.none()
+        postings = (
+            SaleTag.objects.filter(**{in_lookup("tag_id"): sorted(ids.values())})
+            .values("sale_id")
+            .annotate(matched=Count("tag_id"))
+            .filter(matched=len(ids))
+            .values("sale_id")
+        )
+    else:
+        if not ids:
+            return queryset.none()
+        postings = SaleTag.objects.filter(**{in_lookup("tag_id"): sorted(ids.values())}).values("sale_id")
+
+    return queryset.filter(id__in=postings)
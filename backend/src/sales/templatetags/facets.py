@@ -0,0 +1,20 @@
+from django import template
+
+from ..services.fragments import render_options
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def facet_options(context, facet):
+    """
+    {% facet_options "regions" %} -> the checkbox rows of that filter panel,
+    checked from context["selected"], with context["facet_counts"] when on.
+    """
+    counts = context.get("facet_counts")
+    return render_options(
+        context["catalog"],
+        facet,
+        context["selected"][facet],
+        counts[facet] if counts else None,
+    )
@@ -0,0 +1,13 @@
+from django import template
+
+from ..services.money import format_minor
+
+register = template.Library()
+
+
+@register.filter
+def money(value):
+    """
+    Minor units -> "594.84" ("" for None).
+    """
+    return format_minor(value)
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = "sales"
 
 urlpatterns = [
-    path("", views.sales_list, name="sales_list"),
+    # SALES_ASYNC_LIST: concurrent rows / count / summary / facet counts (best served through core.asgi)
+    path(
+        "",
+        views.sales_list_async if getattr(settings, "SALES_ASYNC_LIST", False) else views.sales_list,
+        name="sales_list",
+    ),
+    path("export/", views.sales_export, name="sales_export"),
+    path("metrics/", views.sales_metrics, name="sales_metrics"),
+    path("api/v1/sales/", api.sales_api, name="api_sales"),
 ]
\ No newline at end of file
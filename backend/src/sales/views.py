@@ -1,112 +1,332 @@
-from django.core.paginator import Paginator
+import asyncio
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Page
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from .models import Sale
 from .services.search import apply_search
-from .services.filters import apply_filters
-from .services.sorting import apply_sorting
+from .services.filters import apply_filters, filter_signature, parse_filters
+from .services.sorting import apply_sorting, sort_keys
+from .services.pagination import CountedPaginator, KeysetPage, keyset_page
+from .services.counts import ResultCount, count_results
+from .services.facets import facet_counts, get_facet_catalog
+from .services.fragments import FILTER_PANELS
+from .services.kpis import sales_kpis
+from .services.export import EXPORT_FORMATS, FORMAT_CSV, stream_export
+from .services.page_cache import cache_page, cached_rows, get_cached_page, page_cache_key, page_entry
+from .services.query_shapes import record_query_shape
+from .services.profiling import metrics_snapshot, phase
+from .services.postgres import database_stats
+from .services.dimensions import attach_dimensions
+from .services.columnar import columnar_matches
+from .services.concurrency import run_optional, run_sync
+
+
+def _listing_request(request):
+    """
+    (search query, sort, filter signature, keyset?, page number, page cache
+    key) for a sales_list request.
+    """
+    search_query = request.GET.get("q", "").strip()
+    sort_by = request.GET.get("sort", "date_desc")
+    signature = filter_signature(request.GET, search_query)
+
+    # keyset mode seeks by cursor (no COUNT / OFFSET); offset mode is the fallback
+    pagination_mode = request.GET.get("paginate") or getattr(settings, "SALES_PAGINATION_MODE", "offset")
+    use_keyset = bool(request.GET.get("cursor")) or pagination_mode == "keyset"
+    page_number = None
+    if use_keyset:
+        position = ("cursor", request.GET.get("cursor", ""))
+    else:
+        page_number = request.GET.get("page", 1)
+        position = ("page", str(page_number).strip())
+    cache_key = page_cache_key(signature, sort_by, position, 10)
+    return search_query, sort_by, signature, use_keyset, page_number, cache_key
 
 
 def sales_list(request):
-    qs = Sale.objects.all()
+    search_query, sort_by, signature, use_keyset, page_number, cache_key = _listing_request(request)
 
-    # --- search ---
-    search_query = request.GET.get("q", "").strip()
-    qs = apply_search(qs, search_query)
+    # --- page cache: hot search/filter/sort combinations skip the queries below ---
+    entry = get_cached_page(cache_key)
+    filtered = None
+    rows = None
 
-    # --- filters ---
-    qs = apply_filters(qs, request.GET)
+    if entry is None:
+        record_query_shape(request.GET, search_query, sort_by)
+        qs = Sale.objects.all()
 
-    # --- sorting ---
-    sort_by = request.GET.get("sort", "date_desc")
-    qs = apply_sorting(qs, sort_by, search_query)
-
-    # --- pagination ---
-    paginator = Paginator(qs, 10)
-    page_number = request.GET.get("page", 1)
-    page_obj = paginator.get_page(page_number)
-
-    # ---------- filter options from DB ----------
-    # Distinct regions
-    regions_qs = (
-        Sale.objects.order_by()
-        .values_list("customer_region", flat=True)
-        .exclude(customer_region__isnull=True)
-        .exclude(customer_region="")
-        .distinct()
-    )
-    available_regions = sorted(set(regions_qs))
-
-    # Distinct genders
-    genders_qs = (
-        Sale.objects.order_by()
-        .values_list("gender", flat=True)
-        .exclude(gender__isnull=True)
-        .exclude(gender="")
-        .distinct()
-    )
-    available_genders = sorted(set(genders_qs))
-
-    # Distinct categories
-    categories_qs = (
-        Sale.objects.order_by()
-        .values_list("product_category", flat=True)
-        .exclude(product_category__isnull=True)
-        .exclude(product_category="")
-        .distinct()
-    )
-    available_categories = sorted(set(categories_qs))
-
-    # Distinct payment methods
-    payment_qs = (
-        Sale.objects.order_by()
-        .values_list("payment_method", flat=True)
-        .exclude(payment_method__isnull=True)
-        .exclude(payment_method="")
-        .distinct()
-    )
-    available_payment_methods = sorted(set(payment_qs))
-
-    # Distinct tags (split comma-separated values into individual tags)
-    raw_tags_qs = (
-        Sale.objects.order_by()
-        .values_list("tags", flat=True)
-        .exclude(tags__isnull=True)
-        .exclude(tags="")
-        .distinct()
+        # --- columnar engine (SALES_COLUMNAR): filters, sort and page ids from memory ---
+        with phase("filters"):
+            matches = columnar_matches(request.GET, search_query)
+        if use_keyset and matches is not None:
+            with phase("paginate"):
+                page_obj = matches.keyset_page(sort_by, request.GET.get("cursor"), 10)
+            if page_obj is None:
+                matches = None
+
+        if matches is None:
+            # --- search ---
+            with phase("search"):
+                qs = apply_search(qs, search_query)
+
+            # --- filters ---
+            with phase("filters"):
+                qs = apply_filters(qs, request.GET)
+            filtered = qs
+
+            # --- sorting ---
+            with phase("sort"):
+                qs = apply_sorting(qs, sort_by, search_query)
+
+        # --- pagination ---
+        if use_keyset:
+            with phase("paginate"):
+                if matches is None:
+                    page_obj = keyset_page(
+                        qs, sort_by, sort_keys(sort_by, search_query), request.GET.get("cursor"), 10
+                    )
+                rows = attach_dimensions(page_obj.object_list)
+            entry = page_entry(rows, next_cursor=page_obj.next_cursor, previous_cursor=page_obj.previous_cursor)
+        else:
+            with phase("count"):
+                result_count = matches.count() if matches is not None else count_results(qs, signature)
+            with phase("paginate"):
+                ordered = matches.sorted_by(sort_by) if matches is not None else qs
+                paginator = CountedPaginator(ordered, 10, result_count.value, open_ended=result_count.capped)
+                page_obj = paginator.get_page(page_number)
+                result_count = _paged_count(result_count, paginator)
+                rows = attach_dimensions(page_obj.object_list)
+            entry = page_entry(rows, number=page_obj.number, result_count=result_count)
+        cache_page(cache_key, entry)
+    else:
+        with phase("page_cache"):
+            rows = cached_rows(entry)
+
+    if use_keyset:
+        page_obj = KeysetPage(rows, entry["next_cursor"], entry["previous_cursor"])
+        result_count = None
+    else:
+        result_count = entry["result_count"]
+        page_obj = Page(rows, entry["number"], CountedPaginator([], 10, result_count.value))
+
+    # --- summary panel (one aggregate over the same filtered queryset, or the rollups) ---
+    with phase("kpis"):
+        kpis = sales_kpis(filtered, request.GET, search_query, signature)
+
+    # ---------- filter options (cached facet catalog) and their counts under the current filters ----------
+    with phase("facets"):
+        catalog = get_facet_catalog()
+        counts = None
+        if getattr(settings, "SALES_FACET_COUNTS", True):
+            counts = facet_counts(request.GET, search_query, signature)
+
+    context = _listing_context(request, page_obj, use_keyset, result_count, kpis, catalog, counts)
+    with phase("render"):
+        return render(request, "sales/sales_list.html", context)
+
+
+# ------------------------------------------------------
+# Async listing (ASGI)
+# ------------------------------------------------------
+def _keyset_entry(params, search_query, sort_by, matches):
+    """
+    (rows, page cache entry) for a keyset page.
+    """
+    page_obj = None
+    if matches is not None:
+        page_obj = matches.keyset_page(sort_by, params.get("cursor"), 10)
+    if page_obj is None:
+        qs = apply_sorting(apply_filters(apply_search(Sale.objects.all(), search_query), params), sort_by, search_query)
+        page_obj = keyset_page(qs, sort_by, sort_keys(sort_by, search_query), params.get("cursor"), 10)
+    rows = attach_dimensions(page_obj.object_list)
+    return rows, page_entry(rows, next_cursor=page_obj.next_cursor, previous_cursor=page_obj.previous_cursor)
+
+
+def _ordered(params, search_query, sort_by, matches):
+    if matches is not None:
+        return matches.sorted_by(sort_by)
+    return apply_sorting(apply_filters(apply_search(Sale.objects.all(), search_query), params), sort_by, search_query)
+
+
+def _result_count(params, search_query, signature, matches):
+    if matches is not None:
+        return matches.count()
+    return count_results(apply_filters(apply_search(Sale.objects.all(), search_query), params), signature)
+
+
+def _paged_count(result_count, paginator):
+    # a capped count grows with the rows paging past the cap has seen
+    if result_count.capped and paginator.count > result_count.value:
+        return ResultCount(paginator.count, exact=False, capped=True)
+    return result_count
+
+
+def _rows(ordered, start, stop):
+    return attach_dimensions(ordered[start:stop])
+
+
+def _requested_page(page_number):
+    # what Paginator.get_page() will settle on, as far as it is known before the count
+    try:
+        number = int(page_number)
+    except (TypeError, ValueError):
+        return 1
+    return number if number >= 1 else None
+
+
+async def sales_list_async(request):
+    """
+    sales_list for ASGI, rendering the same page. The page rows, result
+    count, summary panel and facet counts do not depend on each other, so
+    they run concurrently on the bounded query pool (services/concurrency)
+    and the response waits for the slowest of them instead of their sum.
+    Count, summary and facet counts each get SALES_ASYNC_TIMEOUT_MS; a
+    part that misses it is left out ("Page N" without a total, "–" in the
+    summary, no option counts) and such pages are not cached. The rows
+    have no deadline: they are the page.
+    """
+    search_query, sort_by, signature, use_keyset, page_number, cache_key = _listing_request(request)
+    params = request.GET
+    timeout = getattr(settings, "SALES_ASYNC_TIMEOUT_MS", 1000) / 1000
+
+    catalog = asyncio.create_task(run_sync("facets", get_facet_catalog))
+    kpis = asyncio.create_task(
+        run_optional("kpis", sales_kpis, None, params, search_query, signature, timeout=timeout)
     )
-    tag_set = set()
-    for tag_string in raw_tags_qs:
-        for part in tag_string.split(","):
-            label = part.strip()
-            if label:
-                tag_set.add(label)
-    available_tags = sorted(tag_set)
+    counts = None
+    if getattr(settings, "SALES_FACET_COUNTS", True):
+        counts = asyncio.create_task(
+            run_optional("facet_counts", facet_counts, params, search_query, signature, timeout=timeout)
+        )
+
+    entry = await run_sync("page_cache", get_cached_page, cache_key)
+    shape = None
+    if entry is not None:
+        rows = await run_sync("page_cache", cached_rows, entry)
+    else:
+        shape = asyncio.create_task(run_sync("filters", record_query_shape, params, search_query, sort_by))
+        matches = await run_sync("filters", columnar_matches, params, search_query)
+        if use_keyset:
+            rows, entry = await run_sync("paginate", _keyset_entry, params, search_query, sort_by, matches)
+            await run_sync("page_cache", cache_page, cache_key, entry)
+        else:
+            count = asyncio.create_task(
+                run_optional("count", _result_count, params, search_query, signature, matches, timeout=timeout)
+            )
+            ordered = await run_sync("sort", _ordered, params, search_query, sort_by, matches)
+            number = _requested_page(page_number)
+            rows = None
+            if number is not None:
+                # fetched alongside the count, one row past the page to tell whether a next one exists
+                rows = await run_sync("paginate", _rows, ordered, (number - 1) * 10, number * 10 + 1)
+            result_count = await count
+            if result_count is not None:
+                paginator = CountedPaginator(ordered, 10, result_count.value, open_ended=result_count.capped)
+                page_obj = paginator.get_page(page_number)
+                result_count = _paged_count(result_count, paginator)
+                if page_obj.number != number:
+                    # out of range: Paginator moved to the last page
+                    start = (page_obj.number - 1) * 10
+                    rows = await run_sync("paginate", _rows, ordered, start, start + 10)
+                rows = rows[:10]
+                entry = page_entry(rows, number=page_obj.number, result_count=result_count)
+                await run_sync("page_cache", cache_page, cache_key, entry)
+            else:
+                if rows is None:
+                    number, rows = 1, await run_sync("paginate", _rows, ordered, 0, 11)
+                # without a total, as far as the rows show: this page, plus one more if it is full
+                entry = {"number": number, "result_count": None, "seen": (number - 1) * 10 + len(rows)}
+                rows = rows[:10]
+
+    if use_keyset:
+        page_obj = KeysetPage(rows, entry["next_cursor"], entry["previous_cursor"])
+        result_count = None
+    else:
+        result_count = entry["result_count"]
+        seen = result_count.value if result_count is not None else entry["seen"]
+        page_obj = Page(rows, entry["number"], CountedPaginator([], 10, seen))
+
+    if shape is not None:
+        await shape
+    counts = await counts if counts is not None else None
+    context = _listing_context(request, page_obj, use_keyset, result_count, await kpis, await catalog, counts)
+    return await run_sync("render", render, request, "sales/sales_list.html", context)
+
+
+def _page_query(params, use_keyset):
+    """
+    Canonical query string for the pager links: the listing's parameters
+    without its position (page / cursor) or empty values, sorted by name,
+    so every link to the same listing state is the same URL.
+    """
+    params = params.copy()
+    params.pop("page", None)
+    params.pop("cursor", None)
+    if use_keyset:
+        params.setlist("paginate", ["keyset"])
+    return urlencode([(key, value) for key, values in sorted(params.lists()) for value in values if value != ""])
+
+
+def _listing_context(request, page_obj, use_keyset, result_count, kpis, catalog, counts):
+    search_query = request.GET.get("q", "").strip()
 
     # ---------- which filters are currently selected (for checked boxes + labels) ----------
-    selected_regions = request.GET.getlist("region")
-    selected_genders = request.GET.getlist("gender")
-    selected_categories = request.GET.getlist("category")
-    selected_payment_methods = request.GET.getlist("payment_method")
-    selected_tags = request.GET.getlist("tags")
+    filters = parse_filters(request.GET)
 
-    context = {
+    return {
         "page_obj": page_obj,
+        "use_keyset": use_keyset,
+        "result_count": result_count,
+        "kpis": kpis,
+        "page_query": _page_query(request.GET, use_keyset),
+        "export_query": request.GET.urlencode(),
         "search_query": search_query,
-        "sort_by": sort_by,
+        "sort_by": request.GET.get("sort", "date_desc"),
         "request": request,  # for reading GET params in template
 
-        # dropdown options
-        "available_regions": available_regions,
-        "available_genders": available_genders,
-        "available_categories": available_categories,
-        "available_payment_methods": available_payment_methods,
-        "available_tags": available_tags,
-
-        # selected values
-        "selected_regions": selected_regions,
-        "selected_genders": selected_genders,
-        "selected_categories": selected_categories,
-        "selected_payment_methods": selected_payment_methods,
-        "selected_tags": selected_tags,
+        # filter panel options (see the facet_options tag) and their counts
+        "catalog": catalog,
+        "facet_counts": counts,
+
+        # selected values: sets for the checkboxes, lists (in request order) for the panel labels
+        "selected": {facet: frozenset(filters[facet]) for facet in FILTER_PANELS},
+        "selected_regions": filters["regions"],
+        "selected_genders": filters["genders"],
+        "selected_categories": filters["categories"],
+        "selected_payment_methods": filters["payment_methods"],
+        "selected_tags": filters["tags"],
     }
-    return render(request, "sales/sales_list.html", context)
+
+
+def sales_export(request):
+    """
+    Every row matching the current search + filters + sort, streamed as
+    CSV (default) or NDJSON (?format=ndjson).
+    """
+    export_format = request.GET.get("format", FORMAT_CSV)
+    if export_format not in EXPORT_FORMATS:
+        export_format = FORMAT_CSV
+
+    response = StreamingHttpResponse(
+        stream_export(request.GET, export_format),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="sales-export.{export_format}"'
+    return response
+
+
+@staff_member_required
+def sales_metrics(request):
+    """
+    This process's request latency histograms (total, SQL and per phase)
+    and most recent slow queries, plus the Postgres pool and prepared-statement
+    counters, as JSON. Staff only (others are sent to the admin login);
+    404 unless SALES_PROFILING is on.
+    """
+    if not getattr(settings, "SALES_PROFILING", False):
+        raise Http404("Profiling is disabled")
+    return JsonResponse({**metrics_snapshot(), "database": database_stats()})